@@ -0,0 +1,244 @@
+"""
+Street Fighter Game
+
+Asset pipeline that decodes sprite sheets and images in a worker pool.
+
+Workers decode, scale, trim and mirror the frames of each sheet and pack
+both facings into an atlas page without a display. They hand raw pixel
+buffers back to the main process, along with the frame profiles the
+collision boxes are made from. The main thread only wraps those buffers
+with pygame.image.frombuffer and converts them to the display pixel
+format.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import pygame
+
+import atlas
+import frame_cache
+import hitboxes
+
+decode_count = 0
+
+
+def get_frame(sheet, frame_index, frame_size):
+    """
+    Cut a specific frame out of a decoded sprite sheet.
+
+    Args:
+        sheet (pygame.Surface): Decoded sprite sheet.
+        frame_index (int): Index of the frame to be cut out.
+        frame_size (tuple):
+        Size of each frame in the sprite sheet (width, height).
+
+    Returns:
+        pygame.Surface: Frame as a subsurface of the sheet.
+    """
+    frame_x = frame_index * frame_size[0]
+    frame_y = 0
+    return sheet.subsurface(
+                            pygame.Rect(
+                                        frame_x, frame_y,
+                                        frame_size[0],
+                                        frame_size[1]))
+
+
+def trim_frame(frame, scale, draw_offset):
+    """
+    Crop a frame to its opaque pixels, resize it and compute its anchor.
+
+    Cropping happens before scaling, so only opaque pixels are scaled.
+
+    Args:
+        frame (pygame.Surface): Unscaled frame with transparent padding.
+        scale (int): Scaling factor for resizing the frame.
+        draw_offset (tuple): Offset (x, y) of the full-size scaled frame
+        relative to the top-left corner of the player rectangle.
+
+    Returns:
+        tuple: The cropped and resized Pygame surface and its anchor,
+        the offset (x, y) of that surface relative to the player rectangle.
+    """
+    bounds = frame.get_bounding_rect()
+    trimmed_frame = pygame.transform.scale(
+                                           frame.subsurface(bounds),
+                                           (bounds.width*scale,
+                                            bounds.height*scale)
+                                           )
+    anchor = (
+              draw_offset[0] + bounds.x*scale,
+              draw_offset[1] + bounds.y*scale
+              )
+    return trimmed_frame, anchor
+
+
+def decode_sheet(sheet_path, num_frames, frame_size, scale, draw_offset):
+    """
+    Decode a sprite sheet and cut it into scaled, trimmed raw frames.
+
+    Runs without a display, so it can be used inside worker processes.
+
+    Args:
+        sheet_path (str): Path to the sprite sheet.
+        num_frames (int): Number of frames in the sprite sheet.
+        frame_size (tuple):
+        Size of each frame in the sprite sheet (width, height).
+        scale (int): Scaling factor for resizing frames.
+        draw_offset (tuple): Offset (x, y) of the full-size frame
+        relative to the top-left corner of the player rectangle.
+
+    Returns:
+        tuple: List of (RGBA bytes, size, anchor) raw frames and list of
+        their profiles, see hitboxes.frame_profile.
+    """
+    sheet = pygame.image.load(sheet_path)
+    raw_frames = []
+    profiles = []
+    for frame_index in range(num_frames):
+        frame = get_frame(sheet, frame_index, frame_size)
+        profiles.append(hitboxes.frame_profile(frame))
+        frame, anchor = trim_frame(frame, scale, draw_offset)
+        raw_frames.append((
+                           pygame.image.tobytes(frame, 'RGBA'),
+                           frame.get_size(), anchor
+                           ))
+    return raw_frames, profiles
+
+
+def decode_image(image_path):
+    """
+    Decode an opaque image such as the stage background.
+
+    Args:
+        image_path (str): Path to the image.
+
+    Returns:
+        tuple: RGB bytes and size (width, height) of the image.
+    """
+    image = pygame.image.load(image_path)
+    return pygame.image.tobytes(image, 'RGB'), image.get_size()
+
+
+def decode_atlas(sheet_path, num_frames, frame_size, scale, draw_offset):
+    """
+    Decode a sprite sheet and pack its scaled, trimmed frames, facing both
+    ways, into an atlas page.
+
+    The frames facing left are mirrored copies whose anchors are mirrored
+    across the full-size frame like the collision boxes, see
+    hitboxes.mirror_box.
+
+    Runs without a display, so it can be used inside worker processes.
+
+    Args:
+        sheet_path (str): Path to the sprite sheet.
+        num_frames (int): Number of frames in the sprite sheet.
+        frame_size (tuple):
+        Size of each frame in the sprite sheet (width, height).
+        scale (int): Scaling factor for resizing frames.
+        draw_offset (tuple): Offset (x, y) of the full-size frame
+        relative to the top-left corner of the player rectangle.
+
+    Returns:
+        tuple: Raw atlas page, see atlas.pack_frames, and list of the
+        profiles of the frames.
+    """
+    raw_frames, profiles = decode_sheet(
+                                        sheet_path, num_frames, frame_size,
+                                        scale, draw_offset
+                                        )
+    mirrored_anchors = [
+                        hitboxes.mirror_box(
+                                            anchor + size,
+                                            frame_size[0]*scale, draw_offset
+                                            )[:2]
+                        for pixels, size, anchor in raw_frames
+                        ]
+    return atlas.mirror_page(
+                             atlas.pack_frames(raw_frames), mirrored_anchors
+                             ), profiles
+
+
+def run_jobs(jobs, workers=None):
+    """
+    Run decode jobs, in a process pool when more than one worker is used.
+
+    Args:
+        jobs (list): List of (function, args) pairs.
+        workers (int): Number of worker processes, one per core if None.
+
+    Returns:
+        list: Results of the jobs in the same order.
+    """
+    global decode_count
+    decode_count += len(jobs)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = min(workers, len(jobs))
+    if workers <= 1:
+        return [function(*args) for function, args in jobs]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(function, *args) for function, args in jobs]
+        return [future.result() for future in futures]
+
+
+def load_assets(sheets, image_paths=(), workers=None, profile_sheets=()):
+    """
+    Load sprite sheets and images, decoding everything not cached in parallel.
+
+    Sheets listed in profile_sheets only have their frame profiles loaded.
+    When they are not cached they are decoded in the same batch and their
+    frames stored in the frame cache, but not kept.
+
+    Args:
+        sheets (list): List of (sheet_path, num_frames, frame_size, scale,
+        draw_offset) tuples.
+        image_paths (list): Paths of opaque images to load.
+        workers (int): Number of worker processes, one per core if None.
+        profile_sheets (list): Sheets, as in sheets, to load the frame
+        profiles of.
+
+    Returns:
+        tuple: List of (page, anchor, area) frame lists, one per sheet,
+        each sharing one atlas page and holding the frames facing right
+        followed by those facing left, list of image surfaces, one per
+        image path, and list of frame profile lists, one per profile sheet.
+    """
+    keys = {
+            sheet: frame_cache.cache_key(*sheet)
+            for sheet in list(sheets) + list(profile_sheets)
+            }
+    sheet_frames = [
+                    frame_cache.load_cached_atlas(sheet, keys[sheet])
+                    for sheet in sheets
+                    ]
+    profiles = [
+                frame_cache.load_cached_profiles(sheet, keys[sheet])
+                for sheet in profile_sheets
+                ]
+    misses = [
+              sheet for sheet, frames in zip(sheets, sheet_frames)
+              if frames is None
+              ]
+    misses += [
+               sheet for sheet, sheet_profiles in zip(profile_sheets, profiles)
+               if sheet_profiles is None and sheet not in misses
+               ]
+    jobs = [(decode_atlas, sheet) for sheet in misses]
+    jobs += [(decode_image, (image_path,)) for image_path in image_paths]
+    results = run_jobs(jobs, workers)
+    decoded = dict(zip(misses, results))
+    for sheet, (raw_atlas, sheet_profiles) in decoded.items():
+        frame_cache.store_atlas(sheet, keys[sheet], raw_atlas, sheet_profiles)
+    for index, sheet in enumerate(sheets):
+        if sheet_frames[index] is None:
+            sheet_frames[index] = atlas.frames_from_atlas(decoded[sheet][0])
+    for index, sheet in enumerate(profile_sheets):
+        if profiles[index] is None:
+            profiles[index] = decoded[sheet][1]
+    images = [
+              pygame.image.frombuffer(pixels, size, 'RGB')
+              for pixels, size in results[len(misses):]
+              ]
+    return sheet_frames, images, profiles
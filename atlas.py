@@ -0,0 +1,237 @@
+"""
+Street Fighter Game
+
+Texture atlases of fighter frames.
+
+The trimmed frames of a sprite sheet, facing right and mirrored to face
+left, are packed into one atlas page, a single surface, instead of each
+frame being a surface of its own. A frame is then the page, its anchor
+and its area on the page, drawn with window.blit(page, position, area).
+Frames are packed with a skyline packer, which places each frame as low on
+the page as it fits, with the page width chosen to waste the least space.
+
+The frames facing left are not packed again: the packed page is flipped
+as a whole, which mirrors the area of every frame on it, and the copy is
+stacked below the original.
+
+Packing works on raw pixel buffers without a display, so it runs in the
+decode workers, and the packed page is what the frame cache stores.
+Actions are loaded on first use, see functions.LazyActionMap, so each sheet
+gets a page of its own rather than one page holding a whole character.
+"""
+import pygame
+
+
+def place_on_skyline(skyline, width, page_width):
+    """
+    Find the lowest position for a rectangle resting on a skyline.
+
+    Args:
+        skyline (list): (x, y, width) segments of the top edge of the
+        rectangles placed so far, left to right across the page.
+        width (int): Width of the rectangle.
+        page_width (int): Width of the page.
+
+    Returns:
+        tuple: Position (x, y) of the rectangle, the leftmost of the
+        lowest ones.
+    """
+    best = None
+    for start, (x, y, segment_width) in enumerate(skyline):
+        if x + width > page_width:
+            break
+        top = y
+        end = start
+        while skyline[end][0] + skyline[end][2] < x + width:
+            end += 1
+            top = max(top, skyline[end][1])
+        if best is None or top < best[1]:
+            best = (x, top)
+    return best
+
+
+def raise_skyline(skyline, x, y, width):
+    """
+    Raise a skyline over a rectangle placed on it.
+
+    Args:
+        skyline (list): (x, y, width) segments of the skyline.
+        x (int): Left edge of the rectangle.
+        y (int): Bottom edge of the rectangle, its top edge on the page.
+        width (int): Width of the rectangle.
+
+    Returns:
+        list: The new skyline segments.
+    """
+    segments = [(x, y, width)]
+    for segment_x, segment_y, segment_width in skyline:
+        segment_end = segment_x + segment_width
+        if segment_x < x:
+            segments.append((
+                             segment_x, segment_y,
+                             min(segment_end, x) - segment_x
+                             ))
+        if segment_end > x + width:
+            left = max(segment_x, x + width)
+            segments.append((left, segment_y, segment_end - left))
+    segments.sort()
+    merged = [segments[0]]
+    for segment in segments[1:]:
+        last_x, last_y, last_width = merged[-1]
+        if segment[1] == last_y:
+            merged[-1] = (last_x, last_y, last_width + segment[2])
+        else:
+            merged.append(segment)
+    return merged
+
+
+def pack_skyline(sizes, order, page_width):
+    """
+    Place rectangles on a page of a given width, each as low as it fits.
+
+    Empty rectangles, like the frames of fully transparent sprites, take
+    no room and all go at the origin.
+
+    Args:
+        sizes (list): (width, height) of each rectangle.
+        order (list): Indexes of the rectangles in the order to place them.
+        page_width (int): Width of the page, at least that of the widest
+        rectangle.
+
+    Returns:
+        tuple: List of (x, y) positions, one per rectangle, and the
+        (width, height) of the page they cover.
+    """
+    skyline = [(0, 0, page_width)]
+    positions = [None] * len(sizes)
+    used_width = used_height = 1
+    for index in order:
+        width, height = sizes[index]
+        if width == 0 or height == 0:
+            positions[index] = (0, 0)
+            continue
+        x, y = place_on_skyline(skyline, width, page_width)
+        positions[index] = (x, y)
+        skyline = raise_skyline(skyline, x, y + height, width)
+        used_width = max(used_width, x + width)
+        used_height = max(used_height, y + height)
+    return positions, (used_width, used_height)
+
+
+def pack_rects(sizes):
+    """
+    Pack rectangles on the smallest page found.
+
+    Rectangles are placed by decreasing height, width or area on pages of
+    every width at which a row of them would wrap, and the smallest page
+    is kept.
+
+    Args:
+        sizes (list): (width, height) of each rectangle.
+
+    Returns:
+        tuple: List of (x, y) positions, one per rectangle, and the
+        (width, height) of the page.
+    """
+    widest = max([width for width, height in sizes] + [1])
+    best = None
+    for sort_key in (
+                     lambda size: (size[1], size[0]),
+                     lambda size: (size[0], size[1]),
+                     lambda size: size[0] * size[1]
+                     ):
+        order = sorted(
+                       range(len(sizes)),
+                       key=lambda index: sort_key(sizes[index]),
+                       reverse=True
+                       )
+        page_widths = {widest}
+        row_width = 0
+        for index in order:
+            row_width += sizes[index][0]
+            page_widths.add(max(row_width, widest))
+        for page_width in sorted(page_widths):
+            positions, (width, height) = pack_skyline(
+                sizes, order, page_width)
+            if best is None or width * height < best[1][0] * best[1][1]:
+                best = (positions, (width, height))
+    return best
+
+
+def pack_frames(raw_frames):
+    """
+    Pack raw frames into a raw atlas page.
+
+    Args:
+        raw_frames (list): List of (RGBA bytes, size, anchor) raw frames.
+
+    Returns:
+        tuple: RGBA bytes and size (width, height) of the page, and a list
+        of ((x, y, width, height), anchor) placements, one per frame.
+    """
+    positions, (page_width, page_height) = pack_rects(
+        [size for pixels, size, anchor in raw_frames])
+    page = bytearray(page_width * page_height * 4)
+    placements = []
+    for (pixels, (width, height), anchor), (x, y) in zip(
+            raw_frames, positions):
+        row_bytes = width * 4
+        for row in range(height):
+            start = ((y + row) * page_width + x) * 4
+            page[start:start + row_bytes] = \
+                pixels[row * row_bytes:(row + 1) * row_bytes]
+        placements.append(((x, y, width, height), anchor))
+    return bytes(page), (page_width, page_height), placements
+
+
+def mirror_page(raw_atlas, mirrored_anchors):
+    """
+    Add mirrored copies of the frames of a raw atlas page to it.
+
+    Args:
+        raw_atlas (tuple): Page bytes, page size and placements, as
+        returned by pack_frames.
+        mirrored_anchors (list): Anchor of the mirrored copy of each frame.
+
+    Returns:
+        tuple: Raw atlas page twice as high, with the placements of the
+        frames followed by those of their mirrored copies.
+    """
+    pixels, (page_width, page_height), placements = raw_atlas
+    flipped = pygame.transform.flip(
+        pygame.image.frombuffer(pixels, (page_width, page_height), 'RGBA'),
+        True, False)
+    mirrored_placements = [
+                           (
+                            (page_width - x - width, page_height + y,
+                             width, height),
+                            anchor
+                            )
+                           for ((x, y, width, height), _), anchor in zip(
+                               placements, mirrored_anchors)
+                           ]
+    return (
+            pixels + pygame.image.tobytes(flipped, 'RGBA'),
+            (page_width, page_height * 2),
+            placements + mirrored_placements
+            )
+
+
+def frames_from_atlas(raw_atlas):
+    """
+    Wrap a raw atlas page as a surface in the display pixel format.
+
+    Args:
+        raw_atlas (tuple): Page bytes, page size and placements, as
+        returned by pack_frames.
+
+    Returns:
+        list: List of (page, anchor, area) frames sharing one page.
+    """
+    pixels, size, placements = raw_atlas
+    page = pygame.image.frombuffer(pixels, size, 'RGBA').convert_alpha()
+    return [
+            (page, anchor, pygame.Rect(area))
+            for area, anchor in placements
+            ]
+
@@ -0,0 +1,130 @@
+"""
+Street Fighter Game
+
+Low-latency sound effects on reserved mixer channels.
+
+The mixer is opened with a small buffer, since a sound started with play
+only reaches the speakers once the buffers queued before it have been
+played out. Every fighter gets a mixer channel of its own that pygame
+never hands out to other sounds, so an attack sound can always start at
+once; a sound only cuts off a sound of the same or a lower priority on
+that channel. Effects are loaded after the mixer is open, so they are
+converted to the mixer's sample format once at load time and play back
+without any conversion.
+
+In measurement mode every effect played records its latency, the time
+from reading the input that caused it to the estimated start of playback.
+"""
+import time
+
+import pygame
+
+from profiler import latency_summary
+
+MIXER_FREQUENCY = 44100
+MIXER_SIZE = -16
+MIXER_CHANNELS = 2
+MIXER_BUFFER = 256
+MIXER_NUM_CHANNELS = 8
+
+
+def init_mixer(buffer=MIXER_BUFFER):
+    """
+    Open the mixer in the format of the sound effects.
+
+    A mixer already opened with the defaults, as pygame.init does, is
+    closed first, since pygame.mixer.init keeps an open mixer as it is.
+
+    Args:
+        buffer (int): Samples per mixer buffer, a power of two. Smaller
+        buffers lower the latency but may crackle on slow machines.
+
+    Returns:
+        tuple: Frequency, size and channels the mixer actually opened with.
+    """
+    pygame.mixer.quit()
+    pygame.mixer.init(MIXER_FREQUENCY, MIXER_SIZE, MIXER_CHANNELS, buffer)
+    pygame.mixer.set_num_channels(MIXER_NUM_CHANNELS)
+    return pygame.mixer.get_init()
+
+
+def buffer_latency_ms(buffer):
+    """
+    Args:
+        buffer (int): Samples per mixer buffer.
+
+    Returns:
+        float: Time one mixer buffer takes to play in ms.
+    """
+    frequency = pygame.mixer.get_init()[0]
+    return buffer * 1000 / frequency
+
+
+class SoundEffects:
+    """
+    Plays sound effects on one reserved mixer channel per source.
+
+    Attributes:
+        channels (dict): Reserved pygame.mixer.Channel of each source.
+        priorities (dict): Priority of the sound last started on each
+        source's channel.
+        measure (bool): Whether to record the latency of every effect.
+        latencies (list): Recorded latencies in ms.
+    """
+
+    def __init__(self, sources, buffer=MIXER_BUFFER, measure=False):
+        """
+        Args:
+            sources (list): Names of the sources, like the fighters, each
+            of which gets a reserved channel.
+            buffer (int): Samples per mixer buffer the mixer was opened
+            with.
+            measure (bool): Whether to record the latency of every effect.
+        """
+        pygame.mixer.set_reserved(len(sources))
+        self.channels = {
+                         source: pygame.mixer.Channel(index)
+                         for index, source in enumerate(sources)
+                         }
+        self.priorities = {source: 0 for source in sources}
+        self.output_latency = buffer_latency_ms(buffer)
+        self.measure = measure
+        self.latencies = []
+
+    def play(self, source, sound, priority=0, input_time=None):
+        """
+        Start a sound on a source's channel.
+
+        Args:
+            source (str): Name of the source.
+            sound (pygame.mixer.Sound): Sound to play.
+            priority (int): Sounds of a higher priority playing on the
+            channel are not cut off.
+            input_time (float): time.perf_counter() when the input that
+            caused the sound was read, for the latency measurement.
+
+        Returns:
+            bool: Whether the sound was started.
+        """
+        channel = self.channels[source]
+        if channel.get_busy() and self.priorities[source] > priority:
+            return False
+        channel.play(sound)
+        self.priorities[source] = priority
+        if self.measure and input_time is not None:
+            self.latencies.append(
+                (time.perf_counter() - input_time) * 1000 +
+                self.output_latency)
+        return True
+
+    def latency_report(self):
+        """
+        Summarise the measured latencies.
+
+        Playback is taken to start one mixer buffer after play is called,
+        when the buffer being played out has finished.
+
+        Returns:
+            str: Number of effects and their p50, p99 and largest latency.
+        """
+        return "sound latency: " + latency_summary(self.latencies, 'effects')
@@ -0,0 +1,521 @@
+"""
+Street Fighter Game
+
+Vectorised simulation of many matches at once.
+
+BatchState keeps N matches as structure-of-arrays NumPy state and
+batch_step advances all of them by one tick with the rules of engine.step,
+so balance sweeps can play thousands of matches in the time the scalar
+engine plays a handful. Each balance constant can be given per match.
+With collision boxes from box_table attacks hit by their hitboxes like in
+the scalar engine, and attack_distance is then unused.
+"""
+import numpy as np
+
+from engine import (
+                    PLAYER_WIDTH, ARENA_LEFT, ARENA_RIGHT, GROUND_Y,
+                    PLAYER1_START_X, PLAYER2_START_X, JUMP_HEIGHT, GRAVITY,
+                    PLAYERSPEED, ATTACK_DISTANCE, ATTACK_DAMAGE, JUMPSPEED,
+                    MAX_HEALTH, MATCH_ROUNDS, animation_cooldown,
+                    dead_animation_duration, TICK_MS,
+                    INPUT_LEFT, INPUT_RIGHT, INPUT_JUMP, INPUT_ATTACK,
+                    EVENT_P1_ATTACK, EVENT_P2_ATTACK, EVENT_P1_WINS_ROUND,
+                    EVENT_P2_WINS_ROUND, EVENT_MATCH_DECIDED,
+                    EVENT_MATCH_OVER, GameState
+                    )
+
+ACTIONS = ('idle', 'run', 'jump', 'fall', 'attack', 'take_hit', 'dead')
+IDLE, RUN, JUMP, FALL, ATTACK, TAKE_HIT, DEAD = range(len(ACTIONS))
+DIRECTIONS = (1, -1)
+PLAYER1 = 0
+PLAYER2 = 1
+NO_LOSER = -1
+MATCH_FIELDS = (
+                'x', 'y', 'health', 'is_jumping', 'is_falling',
+                'is_attacking', 'jump_count', 'got_hit', 'action', 'frame',
+                'rounds_won', 'last_update', 'current_round', 'round_over',
+                'loser', 'dead_animation_start_time',
+                'dead_animation_frame_counter', 'dead_animation_last_update',
+                'events'
+                )
+
+
+class BatchState:
+    """
+    State of N matches stored as arrays.
+
+    Fighter arrays have shape (2, N), row PLAYER1 for Player 1's fighter
+    and row PLAYER2 for Player 2's; match arrays have shape (N,).
+
+    Attributes:
+        tick (int): Number of ticks simulated, shared by all matches.
+        x, y, health, jump_count, frame, rounds_won (numpy.ndarray):
+        Integer fighter state.
+        is_jumping, is_falling, is_attacking, got_hit (numpy.ndarray):
+        Boolean fighter state.
+        action (numpy.ndarray): Index of each fighter's action in ACTIONS.
+        last_update, current_round, dead_animation_start_time,
+        dead_animation_frame_counter, dead_animation_last_update
+        (numpy.ndarray): Integer match state.
+        round_over (numpy.ndarray): Whether the last tick ended the round.
+        loser (numpy.ndarray): PLAYER1 or PLAYER2 once the match is decided,
+        NO_LOSER before.
+        events (numpy.ndarray): EVENT_* flags raised by the last tick.
+        attack_damage, attack_distance, player_speed, jump_height
+        (numpy.ndarray): Balance constants of each match.
+    """
+
+    def __init__(
+                 self, matches, attack_damage=ATTACK_DAMAGE,
+                 attack_distance=ATTACK_DISTANCE, player_speed=PLAYERSPEED,
+                 jump_height=JUMP_HEIGHT
+                 ):
+        """
+        Args:
+            matches (int): Number of matches.
+            attack_damage (int or numpy.ndarray): Health lost per hit.
+            attack_distance (int or numpy.ndarray): Reach of an attack.
+            player_speed (int or numpy.ndarray): Run speed per tick.
+            jump_height (int or numpy.ndarray): Height of a jump.
+        """
+        fighters = (2, matches)
+        self.tick = 0
+        self.x = np.empty(fighters, np.int32)
+        self.x[PLAYER1] = PLAYER1_START_X
+        self.x[PLAYER2] = PLAYER2_START_X
+        self.y = np.full(fighters, GROUND_Y, np.int32)
+        self.health = np.full(fighters, MAX_HEALTH, np.int32)
+        self.is_jumping = np.zeros(fighters, bool)
+        self.is_falling = np.zeros(fighters, bool)
+        self.is_attacking = np.zeros(fighters, bool)
+        self.jump_count = np.zeros(fighters, np.int32)
+        self.got_hit = np.zeros(fighters, bool)
+        self.action = np.full(fighters, IDLE, np.int8)
+        self.frame = np.zeros(fighters, np.int32)
+        self.rounds_won = np.zeros(fighters, np.int32)
+        self.last_update = np.zeros(matches, np.int64)
+        self.current_round = np.zeros(matches, np.int32)
+        self.round_over = np.zeros(matches, bool)
+        self.loser = np.full(matches, NO_LOSER, np.int8)
+        self.dead_animation_start_time = np.zeros(matches, np.int64)
+        self.dead_animation_frame_counter = np.zeros(matches, np.int32)
+        self.dead_animation_last_update = np.zeros(matches, np.int64)
+        self.events = np.zeros(matches, np.int32)
+        self.attack_damage = np.broadcast_to(
+            np.asarray(attack_damage, np.int32), (matches,))
+        self.attack_distance = np.broadcast_to(
+            np.asarray(attack_distance, np.int32), (matches,))
+        self.player_speed = np.broadcast_to(
+            np.asarray(player_speed, np.int32), (matches,))
+        self.jump_height = np.broadcast_to(
+            np.asarray(jump_height, np.int32), (matches,))
+
+    def restart(self, matches):
+        """
+        Start the given matches over from their first round.
+
+        The restarted matches keep their balance constants and play exactly
+        like new matches started at the current tick, so finished lanes of
+        a sweep can be reused while the others are still running.
+
+        Args:
+            matches (numpy.ndarray): Matches to restart.
+        """
+        fresh = BatchState(1)
+        fresh.last_update[:] = self.time
+        for name in MATCH_FIELDS:
+            np.copyto(getattr(self, name), getattr(fresh, name), where=matches)
+
+    def __len__(self):
+        return self.round_over.shape[0]
+
+    @property
+    def time(self):
+        """
+        int: Simulated time in ms.
+        """
+        return self.tick * TICK_MS
+
+    @property
+    def finished(self):
+        """
+        numpy.ndarray: Whether each match has played its dead animation.
+        """
+        return (self.events & EVENT_MATCH_OVER) != 0
+
+    def game_state(self, index):
+        """
+        Copy one match out as a scalar engine state.
+
+        Args:
+            index (int): Index of the match.
+
+        Returns:
+            engine.GameState: State of the match.
+        """
+        state = GameState()
+        state.tick = self.tick
+        for row, fighter in ((PLAYER1, state.player1),
+                             (PLAYER2, state.player2)):
+            fighter.x = int(self.x[row, index])
+            fighter.y = int(self.y[row, index])
+            fighter.health = int(self.health[row, index])
+            fighter.is_jumping = bool(self.is_jumping[row, index])
+            fighter.is_falling = bool(self.is_falling[row, index])
+            fighter.is_attacking = bool(self.is_attacking[row, index])
+            fighter.jump_count = int(self.jump_count[row, index])
+            fighter.got_hit = bool(self.got_hit[row, index])
+            fighter.action = ACTIONS[self.action[row, index]]
+            fighter.frame = int(self.frame[row, index])
+            fighter.rounds_won = int(self.rounds_won[row, index])
+        state.last_update = int(self.last_update[index])
+        state.current_round = int(self.current_round[index])
+        state.round_over = bool(self.round_over[index])
+        loser = self.loser[index]
+        state.loser = None if loser == NO_LOSER else \
+            ('player1', 'player2')[loser]
+        state.dead_animation_start_time = int(
+            self.dead_animation_start_time[index])
+        state.dead_animation_frame_counter = int(
+            self.dead_animation_frame_counter[index])
+        state.dead_animation_last_update = int(
+            self.dead_animation_last_update[index])
+        state.events = int(self.events[index])
+        return state
+
+
+def frame_table(frames):
+    """
+    Turn a table of animation lengths into an array indexed like ACTIONS.
+
+    Args:
+        frames (dict): Frame count of each action, see engine.frame_counts.
+
+    Returns:
+        numpy.ndarray: Frame count of each action.
+    """
+    return np.array([frames[action] for action in ACTIONS], np.int32)
+
+
+def box_table(frames):
+    """
+    Turn the collision boxes of a frame table into arrays indexed like
+    ACTIONS, DIRECTIONS and frame.
+
+    Args:
+        frames (engine.FrameTable): Frame counts with collision boxes.
+
+    Returns:
+        tuple: Hurtbox and hitbox arrays of shape (actions, directions,
+        frames, 4) holding (x, y, width, height), zero where a frame has
+        no such box, or None if the table has no boxes.
+    """
+    if frames.boxes is None:
+        return None
+    longest = max(frames.values())
+    tables = np.zeros((2, len(ACTIONS), len(DIRECTIONS), longest, 4), np.int32)
+    for action_index, action in enumerate(ACTIONS):
+        for direction_index, direction in enumerate(DIRECTIONS):
+            for frame, pair in enumerate(frames.boxes[action][direction]):
+                for kind, box in enumerate(pair):
+                    if box is not None:
+                        tables[kind, action_index, direction_index,
+                               frame] = box
+    return tables[0], tables[1]
+
+
+def wrap_frames(state, row, active, frames):
+    """
+    Restart the animation of one fighter where it ran past its last frame.
+
+    Args:
+        state (BatchState): Matches to update.
+        row (int): PLAYER1 or PLAYER2.
+        active (numpy.ndarray): Matches to update.
+        frames (numpy.ndarray): Frame counts from frame_table.
+    """
+    frame = state.frame[row]
+    frame *= ~(active & (frame >= frames[state.action[row]]))
+
+
+def jump(state, row, active):
+    """
+    Advance the jump and fall of one fighter in every active match.
+
+    Args:
+        state (BatchState): Matches to update.
+        row (int): PLAYER1 or PLAYER2.
+        active (numpy.ndarray): Matches to update.
+    """
+    y = state.y[row]
+    jump_count = state.jump_count[row]
+    is_jumping = state.is_jumping[row]
+    is_falling = state.is_falling[row]
+    jumping = active & is_jumping
+    rising = jumping & (jump_count < state.jump_height)
+    y -= JUMPSPEED * rising
+    jump_count += JUMPSPEED * rising
+    peaked = jumping & ~rising
+    is_jumping &= ~peaked
+    is_falling |= peaked
+
+    grounded = active & ~is_jumping
+    falling = grounded & (y < GROUND_Y)
+    y += GRAVITY * falling
+    landed = grounded & ~falling
+    jump_count *= ~landed
+    is_falling &= ~landed
+
+
+def handle_player_input(
+                        state, row, inputs, active, attack_frames,
+                        distance_hits=True
+                        ):
+    """
+    Apply one tick of input to one fighter in every active match.
+
+    The masks follow the elif chain of engine.handle_player_input: each
+    match takes the first branch whose condition holds.
+
+    Args:
+        state (BatchState): Matches to update.
+        row (int): PLAYER1 or PLAYER2.
+        inputs (numpy.ndarray): INPUT_* flags held in each match.
+        active (numpy.ndarray): Matches that take input.
+        attack_frames (int): Length of the fighter's attack animation.
+        distance_hits (bool): Whether an attack hits when it starts within
+        the attack distance, instead of by its hitboxes.
+
+    Returns:
+        numpy.ndarray: Matches in which the fighter started an attack.
+    """
+    other = 1 - row
+    is_attacking = state.is_attacking[row]
+    is_jumping = state.is_jumping[row]
+    is_falling = state.is_falling[row]
+    action = state.action[row]
+    jump_held = (inputs & INPUT_JUMP) != 0
+    attack_held = (inputs & INPUT_ATTACK) != 0
+
+    remaining = active & ~is_attacking
+    left = remaining & ((inputs & INPUT_LEFT) != 0)
+    remaining ^= left
+    right = remaining & ((inputs & INPUT_RIGHT) != 0)
+    remaining ^= right
+    jumps = remaining & jump_held & ~is_jumping
+    remaining ^= jumps
+    attacks = remaining & attack_held & ~is_falling & ~is_jumping
+    remaining ^= attacks
+    hit = remaining & state.got_hit[row]
+    remaining ^= hit
+    falls = remaining & ~jump_held & is_falling
+    remaining ^= falls
+    idles = remaining & ~jump_held & ~attack_held & ~is_jumping
+    finished = active & is_attacking & \
+        (state.frame[row] >= attack_frames - 1)
+
+    x = state.x[row]
+    x += (right.astype(np.int32) - left) * state.player_speed
+    np.clip(x, ARENA_LEFT, ARENA_RIGHT - PLAYER_WIDTH, out=x)
+    np.copyto(action, RUN, where=left | right)
+    is_jumping |= jumps
+    np.copyto(action, JUMP, where=jumps)
+    is_attacking |= attacks
+    state.frame[row] *= ~attacks
+    np.copyto(action, ATTACK, where=attacks)
+    if distance_hits:
+        landed = attacks & \
+            (np.abs(x - state.x[other]) < state.attack_distance) & \
+            ~state.is_jumping[other] & ~state.is_falling[other]
+        state.got_hit[other] |= landed
+        state.health[other] -= state.attack_damage * landed
+    np.copyto(action, TAKE_HIT, where=hit)
+    np.copyto(action, FALL, where=falls)
+    np.copyto(action, IDLE, where=idles | finished)
+    is_attacking &= ~finished
+    state.got_hit[other] &= ~finished
+    return attacks
+
+
+def attack_lands(state, row, active, boxes, opponent_boxes):
+    """
+    Find the matches in which a fighter's attack hits this tick, like
+    engine.attack_lands.
+
+    Args:
+        state (BatchState): Matches to look at.
+        row (int): PLAYER1 or PLAYER2.
+        active (numpy.ndarray): Matches still being played.
+        boxes (tuple): Hurtbox and hitbox arrays of the fighter.
+        opponent_boxes (tuple): Hurtbox and hitbox arrays of the opponent.
+
+    Returns:
+        numpy.ndarray: Matches in which the attack hits.
+    """
+    other = 1 - row
+    x = state.x[row]
+    other_x = state.x[other]
+    hitbox = boxes[1][
+                      state.action[row], (x >= other_x).view(np.int8),
+                      state.frame[row]
+                      ]
+    hurtbox = opponent_boxes[0][
+                                state.action[other],
+                                (other_x >= x).view(np.int8),
+                                state.frame[other]
+                                ]
+    left = x + hitbox[:, 0]
+    top = state.y[row] + hitbox[:, 1]
+    other_left = other_x + hurtbox[:, 0]
+    other_top = state.y[other] + hurtbox[:, 1]
+    return active & state.is_attacking[row] & ~state.got_hit[other] & \
+        (hitbox[:, 2] > 0) & (hurtbox[:, 2] > 0) & \
+        (left < other_left + hurtbox[:, 2]) & \
+        (other_left < left + hitbox[:, 2]) & \
+        (top < other_top + hurtbox[:, 3]) & \
+        (other_top < top + hitbox[:, 3])
+
+
+def handle_hits(state, active, player1_boxes, player2_boxes):
+    """
+    Apply the damage of the attacks whose hitboxes reach the opponent.
+
+    Args:
+        state (BatchState): Matches to update.
+        active (numpy.ndarray): Matches still being played.
+        player1_boxes (tuple): Player 1's boxes from box_table.
+        player2_boxes (tuple): Player 2's boxes from box_table.
+    """
+    player1_hits = attack_lands(
+                                state, PLAYER1, active, player1_boxes,
+                                player2_boxes
+                                )
+    player2_hits = attack_lands(
+                                state, PLAYER2, active, player2_boxes,
+                                player1_boxes
+                                )
+    state.got_hit[PLAYER2] |= player1_hits
+    state.health[PLAYER2] -= state.attack_damage * player1_hits
+    state.got_hit[PLAYER1] |= player2_hits
+    state.health[PLAYER1] -= state.attack_damage * player2_hits
+
+
+def reset_round(state, matches):
+    """
+    Put both fighters back to their starting positions for a new round.
+
+    Args:
+        state (BatchState): Matches to update.
+        matches (numpy.ndarray): Matches to reset.
+    """
+    np.copyto(state.x[PLAYER1], PLAYER1_START_X, where=matches)
+    np.copyto(state.x[PLAYER2], PLAYER2_START_X, where=matches)
+    np.copyto(state.health, MAX_HEALTH, where=matches)
+    np.copyto(state.action, IDLE, where=matches)
+    state.got_hit &= ~matches
+    state.current_round += matches
+    state.round_over &= ~matches
+
+
+def handle_round_end(state, active):
+    """
+    End the round in every active match where a fighter ran out of health.
+
+    Args:
+        state (BatchState): Matches to update.
+        active (numpy.ndarray): Matches still being played.
+    """
+    player1_down = active & (state.health[PLAYER1] <= 0)
+    player2_down = active & ~player1_down & (state.health[PLAYER2] <= 0)
+    state.rounds_won[PLAYER2] += player1_down
+    state.rounds_won[PLAYER1] += player2_down
+    state.round_over |= player1_down | player2_down
+    state.events |= EVENT_P2_WINS_ROUND * player1_down
+    state.events |= EVENT_P1_WINS_ROUND * player2_down
+
+
+def handle_match_end(state):
+    """
+    Decide finished matches and run their dead animations.
+
+    Args:
+        state (BatchState): Matches to update.
+    """
+    now = state.time
+    decided = (state.loser == NO_LOSER) & (state.current_round >= MATCH_ROUNDS)
+    np.copyto(
+              state.loser,
+              np.where(
+                       state.rounds_won[PLAYER1] > state.rounds_won[PLAYER2],
+                       PLAYER2, PLAYER1
+                       ),
+              where=decided
+              )
+    np.copyto(state.dead_animation_start_time, now, where=decided)
+    np.copyto(state.dead_animation_last_update, now, where=decided)
+    state.events |= EVENT_MATCH_DECIDED * decided
+
+    dying = state.loser != NO_LOSER
+    playing = dying & \
+        (now - state.dead_animation_start_time < dead_animation_duration)
+    advance = playing & \
+        (now - state.dead_animation_last_update >= animation_cooldown)
+    state.dead_animation_frame_counter += advance
+    np.copyto(state.dead_animation_last_update, now, where=advance)
+    state.events |= EVENT_MATCH_OVER * (dying & ~playing)
+
+
+def batch_step(
+               state, player1_inputs, player2_inputs,
+               player1_frames, player2_frames, player1_boxes=None,
+               player2_boxes=None
+               ):
+    """
+    Advance every match by one tick.
+
+    Args:
+        state (BatchState): Matches to advance.
+        player1_inputs (numpy.ndarray): INPUT_* flags of Player 1 in each
+        match.
+        player2_inputs (numpy.ndarray): INPUT_* flags of Player 2 in each
+        match.
+        player1_frames (numpy.ndarray): Player 1's frame counts from
+        frame_table.
+        player2_frames (numpy.ndarray): Player 2's frame counts from
+        frame_table.
+        player1_boxes (tuple): Player 1's boxes from box_table, or None.
+        player2_boxes (tuple): Player 2's boxes from box_table, or None;
+        attacks hit by distance unless both fighters have boxes.
+
+    Returns:
+        BatchState: The updated state.
+    """
+    state.tick += 1
+    state.events[:] = 0
+    reset_round(state, state.round_over.copy())
+    active = state.loser == NO_LOSER
+    now = state.time
+    distance_hits = player1_boxes is None or player2_boxes is None
+
+    attacks = handle_player_input(
+                                  state, PLAYER1, player1_inputs, active,
+                                  player1_frames[ATTACK], distance_hits
+                                  )
+    state.events |= EVENT_P1_ATTACK * attacks
+    advance = active & (now - state.last_update >= animation_cooldown)
+    state.frame += advance
+    np.copyto(state.last_update, now, where=advance)
+    wrap_frames(state, PLAYER1, active, player1_frames)
+    jump(state, PLAYER1, active)
+    attacks = handle_player_input(
+                                  state, PLAYER2, player2_inputs, active,
+                                  player2_frames[ATTACK], distance_hits
+                                  )
+    state.events |= EVENT_P2_ATTACK * attacks
+    wrap_frames(state, PLAYER2, active, player2_frames)
+    jump(state, PLAYER2, active)
+    if not distance_hits:
+        handle_hits(state, active, player1_boxes, player2_boxes)
+    handle_round_end(state, active)
+    handle_match_end(state)
+    return state
@@ -0,0 +1,815 @@
+"""
+Street Fighter Game
+
+Headless benchmark suite for the game.
+
+Runs with the SDL dummy video and audio drivers so it works on machines
+without a display or sound card. Every measurement uses fixed seeds and
+scripted inputs, and the results can be saved as JSON and compared against
+a saved baseline; metrics that got worse by more than the tolerance are
+reported as regressions and make the run exit with status 1. The parity
+checks, of the batch engine and of rollback against plain simulation, fail
+the run on their own whenever they find a difference, baseline or not.
+
+Usage:
+    python benchmarks.py [--quick] [--json PATH] [--baseline PATH]
+                         [--tolerance FRACTION]
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+BENCHMARK_FRAME_BUDGET = 8 * 1024 * 1024
+
+
+def measure_startup(workers=None, cold=False):
+    """
+    Measure the wall time and decode count of initialize_game.
+
+    A warm start first runs initialize_game once untimed, so the frame
+    cache holds every startup asset however the last run left it. The
+    collision boxes made by earlier runs are dropped, so both starts make
+    them like a fresh launch does.
+
+    Args:
+        workers (int): Number of decode worker processes, one per core
+        if None.
+        cold (bool): Whether to start from an empty frame cache.
+
+    Returns:
+        dict: 'seconds' spent in initialize_game and the number of
+        sheet and image 'decodes' it performed.
+    """
+    import asset_pipeline
+    import frame_cache
+    import functions
+
+    cache_dir = frame_cache.CACHE_DIR
+    if not cold:
+        functions.box_registry.clear()
+        functions.initialize_game(
+            workers, fighters=functions.DEFAULT_FIGHTERS)
+    decodes_before = asset_pipeline.decode_count
+    with tempfile.TemporaryDirectory() as empty_cache_dir:
+        if cold:
+            frame_cache.CACHE_DIR = empty_cache_dir
+        try:
+            functions.box_registry.clear()
+            start = time.perf_counter()
+            functions.initialize_game(
+                workers, fighters=functions.DEFAULT_FIGHTERS)
+            seconds = time.perf_counter() - start
+        finally:
+            frame_cache.CACHE_DIR = cache_dir
+    return {
+            'seconds': seconds,
+            'decodes': asset_pipeline.decode_count - decodes_before
+            }
+
+
+def measure_import(module='functions'):
+    """
+    Measure the cost of importing a game module in a fresh interpreter.
+
+    Args:
+        module (str): Name of the module to import.
+
+    Returns:
+        dict: 'seconds' spent on the import and the peak resident
+        memory 'rss_kb' of the interpreter afterwards.
+    """
+    script = (
+              "import resource, time\n"
+              "start = time.perf_counter()\n"
+              "import {}\n"
+              "print(time.perf_counter() - start, "
+              "resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)"
+              ).format(module)
+    output = subprocess.run(
+                            [sys.executable, "-c", script],
+                            capture_output=True, text=True, check=True
+                            ).stdout.split()
+    return {'seconds': float(output[-2]), 'rss_kb': int(output[-1])}
+
+
+def measure_audio_memory():
+    """
+    Measure how much resident memory init_audio and the default fighters'
+    sound effects add in a fresh interpreter.
+
+    Returns:
+        dict: Resident memory 'before_kb' and 'after_kb' loading them.
+    """
+    script = (
+              "import functions\n"
+              "def rss():\n"
+              "    with open('/proc/self/status') as status:\n"
+              "        for line in status:\n"
+              "            if line.startswith('VmRSS:'):\n"
+              "                return int(line.split()[1])\n"
+              "before = rss()\n"
+              "functions.init_audio()\n"
+              "functions.choose_fighters(*functions.DEFAULT_FIGHTERS)\n"
+              "print(before, rss())"
+              )
+    output = subprocess.run(
+                            [sys.executable, "-c", script],
+                            capture_output=True, text=True, check=True
+                            ).stdout.split()
+    return {'before_kb': int(output[-2]), 'after_kb': int(output[-1])}
+
+
+def random_inputs(rng, inputs, change=0.05):
+    """
+    Let random players press new key combinations now and then.
+
+    Args:
+        rng (random.Random): Random number generator.
+        inputs (list): INPUT_* flags held in each match, updated in place.
+        change (float): Chance per tick that a player changes keys.
+
+    Returns:
+        list: The updated inputs.
+    """
+    for index in range(len(inputs)):
+        if rng.random() < change:
+            inputs[index] = rng.randrange(16)
+    return inputs
+
+
+def measure_batch_parity(
+                         matches=16, ticks=30000, seed=0,
+                         collision_boxes=True
+                         ):
+    """
+    Play random matches with engine.step and batch_engine.batch_step side by
+    side and compare their states after every tick.
+
+    Args:
+        matches (int): Number of matches.
+        ticks (int): Number of ticks to play.
+        seed (int): Seed of the random inputs.
+        collision_boxes (bool): Whether attacks hit by collision boxes, or
+        by distance.
+
+    Returns:
+        dict: Number of 'ticks' compared per match and of 'mismatches',
+        matches whose states differed at some tick.
+    """
+    import numpy as np
+
+    import batch_engine
+    import engine
+    import functions
+
+    player1_frames, player2_frames = functions.match_frame_counts(
+        collision_boxes)
+    rng = random.Random(seed)
+    player1_inputs = [0] * matches
+    player2_inputs = [0] * matches
+    states = [engine.GameState() for _ in range(matches)]
+    batch = batch_engine.BatchState(matches)
+    player1_table = batch_engine.frame_table(player1_frames)
+    player2_table = batch_engine.frame_table(player2_frames)
+    player1_boxes = batch_engine.box_table(player1_frames)
+    player2_boxes = batch_engine.box_table(player2_frames)
+    mismatched = set()
+    for _ in range(ticks):
+        random_inputs(rng, player1_inputs)
+        random_inputs(rng, player2_inputs)
+        for index, state in enumerate(states):
+            engine.step(
+                        state, player1_inputs[index], player2_inputs[index],
+                        player1_frames, player2_frames
+                        )
+        batch_engine.batch_step(
+                                batch, np.array(player1_inputs),
+                                np.array(player2_inputs),
+                                player1_table, player2_table,
+                                player1_boxes, player2_boxes
+                                )
+        for index, state in enumerate(states):
+            if index not in mismatched and \
+                    not states_equal(state, batch.game_state(index)):
+                mismatched.add(index)
+    return {'ticks': ticks, 'mismatches': len(mismatched)}
+
+
+def states_equal(state, other):
+    """
+    Compare two engine states field by field.
+
+    Args:
+        state (engine.GameState): First state.
+        other (engine.GameState): Second state.
+
+    Returns:
+        bool: Whether every field of the match and both fighters matches.
+    """
+    for name in state.__slots__:
+        if name in ('player1', 'player2'):
+            fighter = getattr(state, name)
+            other_fighter = getattr(other, name)
+            if any(
+                   getattr(fighter, field) != getattr(other_fighter, field)
+                   for field in fighter.__slots__
+                   ):
+                return False
+        elif getattr(state, name) != getattr(other, name):
+            return False
+    return True
+
+
+def measure_engine_throughput(matches=8, seed=0):
+    """
+    Measure how many random matches per second engine.step plays.
+
+    Args:
+        matches (int): Number of matches to play one after another.
+        seed (int): Seed of the random inputs.
+
+    Returns:
+        dict: 'matches_per_second' and 'ticks_per_second'.
+    """
+    import engine
+    import functions
+
+    player1_frames, player2_frames = functions.match_frame_counts()
+    rng = random.Random(seed)
+    inputs = [0, 0]
+    ticks = 0
+    start = time.perf_counter()
+    for _ in range(matches):
+        state = engine.GameState()
+        while not state.events & engine.EVENT_MATCH_OVER:
+            random_inputs(rng, inputs)
+            engine.step(
+                        state, inputs[0], inputs[1],
+                        player1_frames, player2_frames
+                        )
+        ticks += state.tick
+    seconds = time.perf_counter() - start
+    return {
+            'matches_per_second': matches / seconds,
+            'ticks_per_second': ticks / seconds
+            }
+
+
+def measure_batch_throughput(matches=4096, ticks=20000, seed=0):
+    """
+    Measure how many random matches per second batch_step plays.
+
+    Finished matches are restarted at once, as a balance sweep would, so
+    every lane keeps playing for the whole run.
+
+    Args:
+        matches (int): Number of matches played together.
+        ticks (int): Number of ticks to play.
+        seed (int): Seed of the random inputs.
+
+    Returns:
+        dict: 'matches_per_second' finished and 'ticks_per_second',
+        counting one tick of every match as a tick.
+    """
+    import numpy as np
+
+    import batch_engine
+    import functions
+
+    player1_frames, player2_frames = functions.match_frame_counts()
+    player1_table = batch_engine.frame_table(player1_frames)
+    player2_table = batch_engine.frame_table(player2_frames)
+    player1_boxes = batch_engine.box_table(player1_frames)
+    player2_boxes = batch_engine.box_table(player2_frames)
+    rng = np.random.default_rng(seed)
+    inputs = np.zeros((2, matches), np.int32)
+    batch = batch_engine.BatchState(matches)
+    finished = 0
+    start = time.perf_counter()
+    for _ in range(ticks):
+        changed = rng.random(inputs.shape) < 0.05
+        inputs[changed] = rng.integers(0, 16, changed.sum())
+        batch_engine.batch_step(
+                                batch, inputs[0], inputs[1],
+                                player1_table, player2_table,
+                                player1_boxes, player2_boxes
+                                )
+        over = batch.finished
+        if over.any():
+            finished += int(over.sum())
+            batch.restart(over)
+    seconds = time.perf_counter() - start
+    return {
+            'matches_per_second': finished / seconds,
+            'ticks_per_second': ticks * matches / seconds
+            }
+
+
+def measure_snapshots(repeat=100000):
+    """
+    Measure the cost of snapshotting and restoring a match state.
+
+    Args:
+        repeat (int): Number of snapshots and restores to time.
+
+    Returns:
+        dict: Microseconds per 'copy_us' and per 'restore_us'.
+    """
+    import engine
+
+    state = engine.GameState()
+    snapshot = state.copy()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        state.copy()
+    copied = time.perf_counter()
+    for _ in range(repeat):
+        state.restore(snapshot)
+    restored = time.perf_counter()
+    return {
+            'copy_us': (copied - start) / repeat * 1e6,
+            'restore_us': (restored - copied) / repeat * 1e6
+            }
+
+
+def measure_rollback(
+                     ticks=6000, latency_ms=40, jitter_ms=15, loss=0.05,
+                     seed=0
+                     ):
+    """
+    Play a match between two rollback sessions over a simulated link and
+    check both peers against a local simulation of the same inputs, both
+    the state they end in and the round and match events they reported
+    along the way.
+
+    Time is simulated, one tick per TICK_MS, so the link conditions are
+    reproducible; the cost of each advance call is real wall time.
+
+    Args:
+        ticks (int): Number of ticks each peer plays.
+        latency_ms (float): Average one-way delay in ms.
+        jitter_ms (float): Largest random deviation from the latency.
+        loss (float): Chance that a packet is dropped.
+        seed (int): Seed of the inputs and the link.
+
+    Returns:
+        dict: 'rollbacks', 'resimulated_ticks' and 'stalls' of both peers,
+        the slowest advance call 'worst_advance_ms', 'desyncs', the
+        number of peers whose confirmed state differs from the local
+        simulation, and 'event_desyncs', the number of peers that reported
+        other round winners than it, or did not report the end of the
+        match the same way.
+    """
+    import engine
+    import functions
+    import netcode
+
+    player1_frames, player2_frames = functions.match_frame_counts()
+    rng = random.Random(seed)
+    held = [0, 0]
+    scripts = [[], []]
+    for _ in range(ticks):
+        random_inputs(rng, held)
+        scripts[0].append(held[0])
+        scripts[1].append(held[1])
+
+    now = [0.0]
+    links = netcode.loopback_pair(
+                                  latency_ms, jitter_ms, loss, seed,
+                                  clock=lambda: now[0]
+                                  )
+    peers = [
+             netcode.RollbackSession(
+                                     side, link, player1_frames,
+                                     player2_frames
+                                     )
+             for side, link in zip((1, 2), links)
+             ]
+    round_events = engine.EVENT_P1_WINS_ROUND | engine.EVENT_P2_WINS_ROUND
+    reported = [([], set()), ([], set())]
+
+    def report(outcome, events):
+        if events & round_events:
+            outcome[0].append(events & round_events)
+        outcome[1].update([events & engine.EVENT_MATCH_OVER])
+
+    worst = 0
+    while min(peer.state.tick for peer in peers) < ticks:
+        now[0] += engine.TICK_MS
+        for peer, script, outcome in zip(peers, scripts, reported):
+            if peer.state.tick < ticks:
+                start = time.perf_counter()
+                peer.advance(script[peer.state.tick])
+                worst = max(worst, time.perf_counter() - start)
+                report(outcome, peer.events)
+    for _ in range(100):
+        now[0] += engine.TICK_MS
+        for peer, outcome in zip(peers, reported):
+            peer.events = 0
+            peer.send()
+            peer.poll()
+            peer.report_confirmed_events()
+            report(outcome, peer.events)
+
+    reference = engine.GameState()
+    raised = ([], set())
+    while reference.tick < ticks:
+        engine.step(
+                    reference, scripts[0][reference.tick],
+                    scripts[1][reference.tick],
+                    player1_frames, player2_frames
+                    )
+        report(raised, reference.events)
+    desyncs = 0
+    for peer in peers:
+        if peer.confirmed_state().tick != ticks or \
+                not states_equal(reference, peer.confirmed_state()) or \
+                not states_equal(reference, peer.state):
+            desyncs += 1
+    return {
+            'rollbacks': sum(peer.rollbacks for peer in peers),
+            'resimulated_ticks': sum(
+                                     peer.resimulated_ticks
+                                     for peer in peers
+                                     ),
+            'stalls': sum(peer.stalls for peer in peers),
+            'worst_advance_ms': worst * 1000,
+            'desyncs': desyncs,
+            'event_desyncs': sum(outcome != raised for outcome in reported)
+            }
+
+
+def surface_bytes(surfaces):
+    """
+    Add up the pixel memory of distinct surfaces.
+
+    Args:
+        surfaces (iterable): Pygame surfaces, possibly repeated.
+
+    Returns:
+        int: Bytes of pixel data.
+    """
+    distinct = {id(surface): surface for surface in surfaces}
+    return sum(
+               surface.get_pitch() * surface.get_height()
+               for surface in distinct.values()
+               )
+
+
+def action_map_surfaces(action_map):
+    """
+    List the surfaces of every loaded action of an action map.
+
+    Args:
+        action_map (dict): Dictionary mapping actions to frames.
+
+    Returns:
+        list: Surfaces of both directions of every loaded action.
+    """
+    return [
+            surface
+            for directions in dict.values(action_map)
+            for frames in directions.values()
+            for surface, anchor, area in frames
+            ]
+
+
+def measure_memory():
+    """
+    Measure the memory held by both action maps and the sound effects.
+
+    Returns:
+        dict: Pixel memory of both action maps right after startup
+        'action_maps_startup_kb' and with every action loaded
+        'action_maps_full_kb', the number of distinct surfaces holding
+        those frames 'action_maps_surfaces', and the decoded sound effects
+        'sounds_kb'.
+    """
+    import functions
+
+    window, arena, backGround, backGroundRec, player1ActionFramesMap, \
+        player2ActionFramesMap = functions.initialize_game(
+            fighters=functions.DEFAULT_FIGHTERS)
+    action_maps = [player1ActionFramesMap, player2ActionFramesMap]
+    startup = sum(
+                  surface_bytes(action_map_surfaces(action_map))
+                  for action_map in action_maps
+                  )
+    for action_map in action_maps:
+        for action in action_map.sources:
+            action_map.load(action)
+    full = sum(
+               surface_bytes(action_map_surfaces(action_map))
+               for action_map in action_maps
+               )
+    surfaces = len({
+                    id(surface)
+                    for action_map in action_maps
+                    for surface in action_map_surfaces(action_map)
+                    })
+    sounds = sum(
+                 len(sound.get_raw())
+                 for sound in functions.sound_registry.values()
+                 )
+    return {
+            'action_maps_startup_kb': startup // 1024,
+            'action_maps_full_kb': full // 1024,
+            'action_maps_surfaces': surfaces,
+            'sounds_kb': sounds // 1024
+            }
+
+
+def measure_frame_cost(
+                       frames=600, warmup=120, dirty_rects=False, seed=0,
+                       frame_budget=None
+                       ):
+    """
+    Measure the steady-state cost of one gameLoop frame.
+
+    The loop runs uncapped on a scripted replay, so no keyboard is needed
+    and every run sees the same inputs, with a FrameProfiler timing every
+    phase. The warmup frames, which also cover the two seconds of the
+    title scene, are left out.
+
+    Args:
+        frames (int): Number of frames to measure.
+        warmup (int): Number of frames to run first.
+        dirty_rects (bool): Whether to present only the changed areas.
+        seed (int): Seed of the scripted inputs.
+        frame_budget (int): Byte budget of on-demand scaled frames, see
+        initialize_game, or None for preloaded frames.
+
+    Returns:
+        dict: Frame time percentiles 'p50_ms' and 'p99_ms'. With a frame
+        budget also the frame cache 'hit_rate', 'evictions' and the
+        'resident_kb' of unscaled and cached scaled frames.
+    """
+    import functions
+    import profiler
+    import replay
+
+    rng = random.Random(seed)
+    held = [0, 0]
+    inputs = bytearray()
+    for _ in range(100000):
+        random_inputs(rng, held)
+        inputs.append(replay.pack_inputs(*held))
+    playback = replay.Replay(*functions.match_frame_counts(), inputs=inputs)
+    frame_profiler = profiler.FrameProfiler(
+                                            functions.PROFILE_PHASES, frames,
+                                            idle_phase='wait'
+                                            )
+    game = functions.initialize_game(
+        frame_budget=frame_budget, fighters=functions.DEFAULT_FIGHTERS)
+    functions.gameLoop(
+                       *game, dirty_rects=dirty_rects, render_fps=0,
+                       playback=playback, profiler=frame_profiler,
+                       max_frames=warmup + frames
+                       )
+    p50, p99 = frame_profiler.percentiles()
+    result = {'p50_ms': p50, 'p99_ms': p99}
+    if frame_budget is not None:
+        action_maps = game[4:6]
+        stats = action_maps[0].frame_cache.stats()
+        sources = surface_bytes(
+                                surface
+                                for action_map in action_maps
+                                for directions in dict.values(action_map)
+                                for surface, anchor, area in
+                                directions[1].sources
+                                )
+        result['hit_rate'] = stats['hits'] / max(
+            stats['hits'] + stats['misses'], 1)
+        result['evictions'] = stats['evictions']
+        result['resident_kb'] = (sources + stats['size']) // 1024
+    return result
+
+
+METRICS = {
+           'import_seconds': False,
+           'import_rss_kb': False,
+           'audio_rss_kb': False,
+           'startup_seconds': False,
+           'startup_decodes': False,
+           'cold_start_serial_seconds': False,
+           'cold_start_parallel_seconds': False,
+           'action_maps_startup_kb': False,
+           'action_maps_full_kb': False,
+           'action_maps_surfaces': False,
+           'sounds_kb': False,
+           'frame_p50_ms': False,
+           'frame_p99_ms': False,
+           'dirty_frame_p50_ms': False,
+           'dirty_frame_p99_ms': False,
+           'budget_frame_p50_ms': False,
+           'budget_frame_p99_ms': False,
+           'budget_frame_hit_rate': True,
+           'budget_frame_resident_kb': False,
+           'engine_ticks_per_second': True,
+           'engine_matches_per_second': True,
+           'batch_ticks_per_second': True,
+           'batch_matches_per_second': True,
+           'batch_mismatches': False,
+           'batch_distance_mismatches': False,
+           'snapshot_us': False,
+           'restore_us': False,
+           'rollback_desyncs': False,
+           'rollback_event_desyncs': False
+           }
+PARITY_METRICS = [
+                  'batch_mismatches', 'batch_distance_mismatches',
+                  'rollback_desyncs', 'rollback_event_desyncs'
+                  ]
+
+
+def run_suite(quick=False):
+    """
+    Run every benchmark.
+
+    Args:
+        quick (bool): Whether to use smaller workloads, for a fast check.
+
+    Returns:
+        dict: Value of every metric in METRICS.
+    """
+    results = {}
+    imported = measure_import()
+    results['import_seconds'] = imported['seconds']
+    results['import_rss_kb'] = imported['rss_kb']
+    audio = measure_audio_memory()
+    results['audio_rss_kb'] = audio['after_kb'] - audio['before_kb']
+
+    startup = measure_startup()
+    results['startup_seconds'] = startup['seconds']
+    results['startup_decodes'] = startup['decodes']
+    results['cold_start_serial_seconds'] = measure_startup(
+        workers=1, cold=True)['seconds']
+    results['cold_start_parallel_seconds'] = measure_startup(
+        cold=True)['seconds']
+
+    results.update(measure_memory())
+    frames = 200 if quick else 600
+    for prefix, dirty_rects in (('frame', False), ('dirty_frame', True)):
+        cost = measure_frame_cost(frames, dirty_rects=dirty_rects)
+        results[prefix + '_p50_ms'] = cost['p50_ms']
+        results[prefix + '_p99_ms'] = cost['p99_ms']
+    cost = measure_frame_cost(frames, frame_budget=BENCHMARK_FRAME_BUDGET)
+    results['budget_frame_p50_ms'] = cost['p50_ms']
+    results['budget_frame_p99_ms'] = cost['p99_ms']
+    results['budget_frame_hit_rate'] = cost['hit_rate']
+    results['budget_frame_resident_kb'] = cost['resident_kb']
+
+    engine_speed = measure_engine_throughput(2 if quick else 8)
+    results['engine_ticks_per_second'] = engine_speed['ticks_per_second']
+    results['engine_matches_per_second'] = \
+        engine_speed['matches_per_second']
+    batch_speed = measure_batch_throughput(
+                                           1024 if quick else 4096,
+                                           12000 if quick else 20000
+                                           )
+    results['batch_ticks_per_second'] = batch_speed['ticks_per_second']
+    results['batch_matches_per_second'] = batch_speed['matches_per_second']
+    results['batch_mismatches'] = measure_batch_parity(
+        4 if quick else 16, 10000 if quick else 30000)['mismatches']
+    results['batch_distance_mismatches'] = measure_batch_parity(
+        4 if quick else 16, 10000 if quick else 30000,
+        collision_boxes=False)['mismatches']
+
+    snapshots = measure_snapshots()
+    results['snapshot_us'] = snapshots['copy_us']
+    results['restore_us'] = snapshots['restore_us']
+    rollbacks = [
+                 measure_rollback(6000 if quick else 20000, seed=seed)
+                 for seed in range(2 if quick else 4)
+                 ]
+    results['rollback_desyncs'] = sum(
+                                      rollback['desyncs']
+                                      for rollback in rollbacks
+                                      )
+    results['rollback_event_desyncs'] = sum(
+                                            rollback['event_desyncs']
+                                            for rollback in rollbacks
+                                            )
+    return results
+
+
+def environment():
+    """
+    Describe the machine the suite ran on.
+
+    Returns:
+        dict: Python, Pygame and platform versions and the CPU count.
+    """
+    import pygame
+
+    return {
+            'python': platform.python_version(),
+            'pygame': pygame.version.ver,
+            'platform': platform.platform(),
+            'cpus': os.cpu_count()
+            }
+
+
+def compare_results(results, baseline, tolerance=0.15):
+    """
+    Find the metrics that got worse than in a baseline.
+
+    Args:
+        results (dict): Metrics of this run.
+        baseline (dict): Metrics of the baseline run.
+        tolerance (float): Allowed relative change in the bad direction.
+
+    Returns:
+        list: (name, baseline value, value, relative change) of every
+        regressed metric.
+    """
+    regressions = []
+    for name, higher_is_better in METRICS.items():
+        if name not in results or name not in baseline:
+            continue
+        old = baseline[name]
+        new = results[name]
+        worse = old - new if higher_is_better else new - old
+        if old:
+            change = worse / abs(old)
+        else:
+            change = float('inf') if worse > 0 else 0.0
+        if change > tolerance:
+            regressions.append((name, old, new, change))
+    return regressions
+
+
+def parity_failures(results):
+    """
+    Find the parity checks that found a difference.
+
+    Args:
+        results (dict): Metrics of this run.
+
+    Returns:
+        list: (name, value) of every nonzero metric in PARITY_METRICS.
+    """
+    return [
+            (name, results[name])
+            for name in PARITY_METRICS
+            if results.get(name)
+            ]
+
+
+def main(argv=None):
+    """
+    Run the suite, print the results and compare them with a baseline.
+
+    Args:
+        argv (list): Command line arguments, sys.argv[1:] if None.
+
+    Returns:
+        int: Exit status, 1 if any parity check failed or any metric
+        regressed.
+    """
+    parser = argparse.ArgumentParser(description="Street Fighter benchmarks")
+    parser.add_argument("--quick", action="store_true",
+                        help="use smaller workloads")
+    parser.add_argument("--json", help="write the results to this file")
+    parser.add_argument("--baseline",
+                        help="compare against results saved with --json")
+    parser.add_argument("--tolerance", type=float, default=0.15,
+                        help="allowed relative slowdown, default 0.15")
+    args = parser.parse_args(argv)
+
+    results = run_suite(args.quick)
+    for name, value in results.items():
+        print("{:30} {:>14.3f}".format(name, value))
+    if args.json:
+        with open(args.json, 'w') as json_file:
+            json.dump(
+                      {'environment': environment(), 'metrics': results},
+                      json_file, indent=2, sort_keys=True
+                      )
+    failures = parity_failures(results)
+    for name, value in failures:
+        print("FAILED {}: {:.0f}".format(name, value))
+    if not args.baseline:
+        return 1 if failures else 0
+    with open(args.baseline) as baseline_file:
+        baseline = json.load(baseline_file)['metrics']
+    regressions = compare_results(results, baseline, args.tolerance)
+    for name, old, new, change in regressions:
+        print("REGRESSION {}: {:.3f} -> {:.3f} ({:+.0%})".format(
+            name, old, new, change))
+    if not regressions:
+        print("no regressions against {}".format(args.baseline))
+    return 1 if regressions or failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,149 @@
+"""
+Street Fighter Game
+
+Registry of the playable characters, each described by a manifest file.
+
+A manifest is a JSON file in the character directory, named after the
+character, with the sprite sheet and frame count of every action, the size
+of the frames in the sheets, the scale they are drawn at, the offset of
+the drawn frame from the player rectangle and the sound effects:
+
+    {
+        "display_name": "Warrior",
+        "frame_size": [162, 162],
+        "scale": 5,
+        "draw_offset": [-350, -300],
+        "actions": {
+            "run": {"sheet": "warriorSprites/Run.png", "frames": 8},
+            ...
+        },
+        "sounds": {"attack": "sword.wav"}
+    }
+
+The registry only lists the file names until a character is asked for, and
+reading a manifest loads none of its sheets or sounds, so the roster can
+grow without adding to the startup time or memory of a match.
+"""
+import json
+import os
+
+CHARACTER_DIR = 'characters'
+MANIFEST_SUFFIX = '.json'
+
+
+class Character:
+    """
+    A playable character, as described by its manifest.
+
+    Attributes:
+        name (str): Name of the manifest file without its suffix.
+        display_name (str): Name shown to the players.
+        sheet_paths (list): Path of the sprite sheet of each action.
+        frames_per_action (list): Number of frames of each action.
+        frame_size (tuple): Size (width, height) of a frame in the sheets.
+        scale (int): Scaling factor the frames are drawn at.
+        draw_offset (tuple): Offset (x, y) of the full-size frame
+        relative to the top-left corner of the player rectangle.
+        sounds (dict): Path of the sound effect of each sound name.
+    """
+
+    def __init__(self, name, manifest, actions):
+        """
+        Args:
+            name (str): Name of the character.
+            manifest (dict): Contents of the manifest file.
+            actions (list): Actions every character must have, in the
+            order sheet_paths and frames_per_action follow.
+
+        Raises:
+            ValueError: If the manifest misses a field or an action.
+        """
+        try:
+            self.display_name = manifest.get('display_name', name)
+            self.frame_size = tuple(manifest['frame_size'])
+            self.scale = manifest['scale']
+            self.draw_offset = tuple(manifest['draw_offset'])
+            sheets = [manifest['actions'][action] for action in actions]
+            self.sheet_paths = [sheet['sheet'] for sheet in sheets]
+            self.frames_per_action = [sheet['frames'] for sheet in sheets]
+        except KeyError as error:
+            raise ValueError("character {} has no {}".format(name, error))
+        self.name = name
+        self.sounds = manifest.get('sounds', {})
+
+    def sheets(self):
+        """
+        Returns:
+            list: (sheet_path, num_frames, frame_size, scale, draw_offset)
+            of each action, as taken by load_frames.
+        """
+        return [
+                (
+                 sheet_path, num_frames, self.frame_size, self.scale,
+                 self.draw_offset
+                 )
+                for sheet_path, num_frames in zip(
+                    self.sheet_paths, self.frames_per_action)
+                ]
+
+
+class CharacterRegistry:
+    """
+    The characters of a character directory, read on first use.
+
+    Attributes:
+        actions (list): Actions every character must have.
+        directory (str): Directory of the manifest files.
+        characters (dict): Characters read so far, by name.
+    """
+
+    def __init__(self, actions, directory=CHARACTER_DIR):
+        """
+        Args:
+            actions (list): Actions every character must have.
+            directory (str): Directory of the manifest files.
+        """
+        self.actions = actions
+        self.directory = directory
+        self.characters = {}
+
+    def names(self):
+        """
+        Returns:
+            list: Sorted names of the characters in the directory.
+        """
+        return sorted(
+                      file_name[:-len(MANIFEST_SUFFIX)]
+                      for file_name in os.listdir(self.directory)
+                      if file_name.endswith(MANIFEST_SUFFIX)
+                      )
+
+    def get(self, name):
+        """
+        Get a character, reading its manifest on first use.
+
+        Args:
+            name (str): Name of the character.
+
+        Returns:
+            Character: The character.
+
+        Raises:
+            ValueError: If there is no such character or its manifest is
+            invalid.
+        """
+        character = self.characters.get(name)
+        if character is None:
+            path = os.path.join(self.directory, name + MANIFEST_SUFFIX)
+            try:
+                with open(path) as manifest_file:
+                    manifest = json.load(manifest_file)
+            except OSError:
+                raise ValueError("there is no character {}".format(name))
+            except ValueError:
+                raise ValueError(
+                    "the manifest of character {} is not valid JSON".format(
+                        name))
+            character = Character(name, manifest, self.actions)
+            self.characters[name] = character
+        return character
@@ -0,0 +1,612 @@
+"""
+Street Fighter Game
+
+Headless simulation core of the game.
+
+The whole match lives in a GameState and advances one tick at a time from a
+bitmask of the keys each player holds. Nothing in here talks to SDL, so
+matches can be stepped as fast as the CPU allows for testing, AI and
+replays, while gameLoop only reads the keyboard and draws the state.
+"""
+PLAYER_WIDTH = 100
+PLAYER_HIGHT = 200
+ARENA_LEFT = 0
+ARENA_RIGHT = 1300
+GROUND_Y = 330
+PLAYER1_START_X = 200
+PLAYER2_START_X = 900
+JUMP_HEIGHT = 200
+GRAVITY = 10
+PLAYERSPEED = 3
+ATTACK_DISTANCE = 170
+ATTACK_DAMAGE = 20
+JUMPSPEED = 10
+MAX_HEALTH = 100
+MATCH_ROUNDS = 3
+animation_cooldown = 60
+dead_animation_duration = 2000
+TICK_MS = 10
+MAX_CATCH_UP_TICKS = 25
+
+INPUT_LEFT = 1
+INPUT_RIGHT = 2
+INPUT_JUMP = 4
+INPUT_ATTACK = 8
+
+EVENT_P1_ATTACK = 1
+EVENT_P2_ATTACK = 2
+EVENT_P1_WINS_ROUND = 4
+EVENT_P2_WINS_ROUND = 8
+EVENT_MATCH_DECIDED = 16
+EVENT_MATCH_OVER = 32
+
+
+class FighterState:
+    """
+    State of one fighter.
+
+    Attributes:
+        x (int): Left edge of the fighter.
+        y (int): Top edge of the fighter.
+        health (int): Remaining health.
+        is_jumping (bool): Whether the fighter is rising in a jump.
+        is_falling (bool): Whether the fighter is falling from a jump.
+        is_attacking (bool): Whether an attack animation is playing.
+        jump_count (int): Height gained in the current jump.
+        got_hit (bool): Whether the opponent's attack landed on the fighter.
+        action (str): Current animation action.
+        frame (int): Frame index within the current action.
+        rounds_won (int): Number of rounds won.
+    """
+
+    __slots__ = (
+                 'x', 'y', 'health', 'is_jumping', 'is_falling',
+                 'is_attacking', 'jump_count', 'got_hit', 'action', 'frame',
+                 'rounds_won'
+                 )
+
+    def __init__(self, x):
+        self.x = x
+        self.y = GROUND_Y
+        self.health = MAX_HEALTH
+        self.is_jumping = False
+        self.is_falling = False
+        self.is_attacking = False
+        self.jump_count = 0
+        self.got_hit = False
+        self.action = 'idle'
+        self.frame = 0
+        self.rounds_won = 0
+
+    def copy(self):
+        """
+        Returns:
+            FighterState: Independent copy of the fighter.
+        """
+        fighter = FighterState.__new__(FighterState)
+        for name in FighterState.__slots__:
+            setattr(fighter, name, getattr(self, name))
+        return fighter
+
+
+class GameState:
+    """
+    State of a whole match.
+
+    Attributes:
+        tick (int): Number of ticks simulated.
+        player1 (FighterState): Player 1's fighter.
+        player2 (FighterState): Player 2's fighter.
+        last_update (int): Time of the last animation frame advance in ms.
+        current_round (int): Current game round.
+        round_over (bool): Whether the last tick ended the round; the
+        fighters are reset at the start of the next tick, so the finishing
+        blow can still be shown.
+        loser (str): 'player1' or 'player2' once the match is decided.
+        dead_animation_start_time (int): Time the match was decided in ms.
+        dead_animation_frame_counter (int): Frame of the dead animation.
+        dead_animation_last_update (int): Time of the last dead animation
+        frame advance in ms.
+        events (int): EVENT_* flags raised by the last tick.
+    """
+
+    __slots__ = (
+                 'tick', 'player1', 'player2', 'last_update',
+                 'current_round', 'round_over', 'loser',
+                 'dead_animation_start_time', 'dead_animation_frame_counter',
+                 'dead_animation_last_update', 'events'
+                 )
+
+    def __init__(self):
+        self.tick = 0
+        self.player1 = FighterState(PLAYER1_START_X)
+        self.player2 = FighterState(PLAYER2_START_X)
+        self.last_update = 0
+        self.current_round = 0
+        self.round_over = False
+        self.loser = None
+        self.dead_animation_start_time = 0
+        self.dead_animation_frame_counter = 0
+        self.dead_animation_last_update = 0
+        self.events = 0
+
+    @property
+    def time(self):
+        """
+        int: Simulated time in ms.
+        """
+        return self.tick * TICK_MS
+
+    @property
+    def dead_animation_triggered(self):
+        """
+        bool: Whether the match is decided and the loser is dying.
+        """
+        return self.loser is not None
+
+    def copy(self):
+        """
+        Returns:
+            GameState: Independent copy of the match, usable as a snapshot.
+        """
+        state = GameState.__new__(GameState)
+        for name in GameState.__slots__:
+            setattr(state, name, getattr(self, name))
+        state.player1 = self.player1.copy()
+        state.player2 = self.player2.copy()
+        return state
+
+    def restore(self, snapshot):
+        """
+        Reset the match in place to a snapshot taken with copy.
+
+        The snapshot itself is left untouched, so it can be restored again.
+
+        Args:
+            snapshot (GameState): State to go back to.
+        """
+        for name in GameState.__slots__:
+            setattr(self, name, getattr(snapshot, name))
+        self.player1 = snapshot.player1.copy()
+        self.player2 = snapshot.player2.copy()
+
+
+class FixedTimestep:
+    """
+    Turns variable frame times into a whole number of fixed logic ticks.
+
+    Frame time is collected in an accumulator and spent in steps of
+    tick_ms, so the simulation runs at the same speed however fast frames
+    are drawn. After a long stall at most max_ticks are run in one frame
+    and the rest of the backlog is dropped, so a hitch slows the game down
+    for a moment instead of freezing it while it catches up.
+
+    Attributes:
+        tick_ms (int): Length of a logic tick in ms.
+        max_ticks (int): Most ticks run for a single frame.
+        accumulator (float): Frame time not yet spent on ticks in ms.
+        dropped_ticks (int): Ticks skipped because of the catch-up cap.
+    """
+
+    __slots__ = ('tick_ms', 'max_ticks', 'accumulator', 'dropped_ticks')
+
+    def __init__(self, tick_ms=TICK_MS, max_ticks=MAX_CATCH_UP_TICKS):
+        self.tick_ms = tick_ms
+        self.max_ticks = max_ticks
+        self.accumulator = 0
+        self.dropped_ticks = 0
+
+    def advance(self, elapsed_ms):
+        """
+        Add the time of the last frame.
+
+        Args:
+            elapsed_ms (float): Time since the previous frame in ms.
+
+        Returns:
+            int: Number of ticks to simulate before drawing.
+        """
+        self.accumulator += elapsed_ms
+        ticks = int(self.accumulator // self.tick_ms)
+        self.accumulator -= self.tick_ms * ticks
+        if ticks > self.max_ticks:
+            self.dropped_ticks += ticks - self.max_ticks
+            ticks = self.max_ticks
+        return ticks
+
+    def reset(self):
+        """
+        Drop the time collected so far, e.g. after a pause.
+        """
+        self.accumulator = 0
+
+    @property
+    def alpha(self):
+        """
+        float: How far the display time is between the last two ticks,
+        from 0 to 1.
+        """
+        return self.accumulator / self.tick_ms
+
+
+class FrameTable(dict):
+    """
+    Dictionary mapping a fighter's action names to frame counts, with the
+    collision boxes of every frame when they are known.
+
+    Attributes:
+        boxes (dict): Dictionary mapping action to direction to list of
+        (hurtbox, hitbox) pairs, see the hitboxes module, or None to let
+        an attack hit by distance when it starts.
+    """
+
+    def __init__(self, counts, boxes=None):
+        """
+        Args:
+            counts (dict): Dictionary mapping action names to frame counts.
+            boxes (dict): Collision boxes of every frame, or None.
+        """
+        super().__init__(counts)
+        self.boxes = boxes
+
+
+def frame_counts(actions, frames_per_action, boxes=None):
+    """
+    Build the table of animation lengths the simulation needs.
+
+    Args:
+        actions (list): List of action names.
+        frames_per_action (list): Number of frames for each action.
+        boxes (dict): Collision boxes of every frame, or None.
+
+    Returns:
+        FrameTable: Dictionary mapping action names to frame counts.
+    """
+    return FrameTable(zip(actions, frames_per_action), boxes)
+
+
+def move_player(fighter, direction):
+    """
+    Move a fighter horizontally and keep it inside the arena.
+
+    Args:
+        fighter (FighterState): Fighter to move.
+        direction (int): 1 to move right, -1 to move left.
+    """
+    fighter.x += direction * PLAYERSPEED
+    if fighter.x + PLAYER_WIDTH > ARENA_RIGHT:
+        fighter.x = ARENA_RIGHT - PLAYER_WIDTH
+    elif fighter.x < ARENA_LEFT:
+        fighter.x = ARENA_LEFT
+
+
+def jump(fighter):
+    """
+    Advance a fighter's jump and fall by one tick.
+
+    Args:
+        fighter (FighterState): Fighter to update.
+    """
+    if fighter.is_jumping:
+        if fighter.jump_count < JUMP_HEIGHT:
+            fighter.y -= JUMPSPEED
+            fighter.jump_count += JUMPSPEED
+        else:
+            fighter.is_jumping = False
+            fighter.is_falling = True
+
+    if not fighter.is_jumping and fighter.y < GROUND_Y:
+        fighter.y += GRAVITY
+    elif not fighter.is_jumping:
+        fighter.jump_count = 0
+        fighter.is_falling = False
+
+
+def handle_player_input(
+                        fighter, opponent, inputs, attack_frames,
+                        distance_hits=True
+                        ):
+    """
+    Apply one tick of a player's input to their fighter.
+
+    Args:
+        fighter (FighterState): Fighter controlled by the player.
+        opponent (FighterState): The other fighter.
+        inputs (int): INPUT_* flags of the keys the player holds.
+        attack_frames (int): Length of the fighter's attack animation.
+        distance_hits (bool): Whether an attack hits when it starts with
+        the opponent within ATTACK_DISTANCE, instead of by its hitboxes.
+
+    Returns:
+        bool: Whether the fighter started an attack this tick.
+    """
+    if inputs & INPUT_LEFT and not fighter.is_attacking:
+        move_player(fighter, -1)
+        fighter.action = 'run'
+    elif inputs & INPUT_RIGHT and not fighter.is_attacking:
+        move_player(fighter, 1)
+        fighter.action = 'run'
+    elif inputs & INPUT_JUMP and not fighter.is_jumping and \
+            not fighter.is_attacking:
+        fighter.is_jumping = True
+        fighter.action = 'jump'
+    elif inputs & INPUT_ATTACK and not fighter.is_attacking and \
+            not fighter.is_falling and not fighter.is_jumping:
+        fighter.is_attacking = True
+        fighter.frame = 0
+        fighter.action = 'attack'
+        if distance_hits and \
+                abs(fighter.x - opponent.x) < ATTACK_DISTANCE and \
+                not opponent.is_jumping and not opponent.is_falling:
+            opponent.got_hit = True
+            opponent.health -= ATTACK_DAMAGE
+        return True
+    elif fighter.got_hit and not fighter.is_attacking:
+        fighter.action = 'take_hit'
+    elif not inputs & INPUT_JUMP and fighter.is_falling and \
+            not fighter.is_attacking:
+        fighter.action = 'fall'
+    elif not inputs & (INPUT_JUMP | INPUT_ATTACK) and \
+            not fighter.is_jumping and not fighter.is_attacking:
+        fighter.action = 'idle'
+    elif fighter.is_attacking and fighter.frame >= attack_frames - 1:
+        fighter.is_attacking = False
+        fighter.action = 'idle'
+        opponent.got_hit = False
+    return False
+
+
+def started_commands(before, after):
+    """
+    Find the commands a fighter started in one tick.
+
+    Args:
+        before (FighterState): Fighter before the tick.
+        after (FighterState): Fighter after the tick.
+
+    Returns:
+        int: INPUT_JUMP and INPUT_ATTACK flags of the commands started.
+    """
+    commands = 0
+    if after.is_jumping and not before.is_jumping:
+        commands |= INPUT_JUMP
+    if after.is_attacking and not before.is_attacking:
+        commands |= INPUT_ATTACK
+    return commands
+
+
+def facing(fighter, opponent):
+    """
+    Args:
+        fighter (FighterState): Fighter to look at.
+        opponent (FighterState): The other fighter.
+
+    Returns:
+        int: 1 if the fighter faces right, -1 if it faces left.
+    """
+    return 1 if fighter.x < opponent.x else -1
+
+
+def boxes_overlap(first, first_x, first_y, second, second_x, second_y):
+    """
+    Test whether two boxes placed at two positions overlap.
+
+    Args:
+        first (tuple): (x, y, width, height) box, or None.
+        first_x (int): X position the first box is relative to.
+        first_y (int): Y position the first box is relative to.
+        second (tuple): (x, y, width, height) box, or None.
+        second_x (int): X position the second box is relative to.
+        second_y (int): Y position the second box is relative to.
+
+    Returns:
+        bool: Whether both boxes exist and overlap.
+    """
+    if first is None or second is None:
+        return False
+    left = first_x + first[0]
+    top = first_y + first[1]
+    other_left = second_x + second[0]
+    other_top = second_y + second[1]
+    return left < other_left + second[2] and \
+        other_left < left + first[2] and \
+        top < other_top + second[3] and \
+        other_top < top + first[3]
+
+
+def attack_lands(fighter, opponent, fighter_boxes, opponent_boxes):
+    """
+    Test whether a fighter's attack hits the opponent this tick.
+
+    An attack hits once, on the first tick the hitbox of its current frame
+    overlaps the opponent's hurtbox.
+
+    Args:
+        fighter (FighterState): Attacking fighter.
+        opponent (FighterState): The other fighter.
+        fighter_boxes (dict): Collision boxes of the fighter's frames.
+        opponent_boxes (dict): Collision boxes of the opponent's frames.
+
+    Returns:
+        bool: Whether the attack hits.
+    """
+    if not fighter.is_attacking or opponent.got_hit:
+        return False
+    hitbox = fighter_boxes[fighter.action][facing(fighter, opponent)][
+        fighter.frame][1]
+    hurtbox = opponent_boxes[opponent.action][facing(opponent, fighter)][
+        opponent.frame][0]
+    return boxes_overlap(
+                         hitbox, fighter.x, fighter.y,
+                         hurtbox, opponent.x, opponent.y
+                         )
+
+
+def handle_hits(state, player1_boxes, player2_boxes):
+    """
+    Apply the damage of the attacks whose hitboxes reach the opponent.
+
+    Args:
+        state (GameState): Match to update.
+        player1_boxes (dict): Collision boxes of Player 1's frames.
+        player2_boxes (dict): Collision boxes of Player 2's frames.
+    """
+    player1 = state.player1
+    player2 = state.player2
+    player1_hits = attack_lands(player1, player2, player1_boxes, player2_boxes)
+    player2_hits = attack_lands(player2, player1, player2_boxes, player1_boxes)
+    if player1_hits:
+        player2.got_hit = True
+        player2.health -= ATTACK_DAMAGE
+    if player2_hits:
+        player1.got_hit = True
+        player1.health -= ATTACK_DAMAGE
+
+
+def reset_round(state):
+    """
+    Put both fighters back to their starting positions for a new round.
+
+    Args:
+        state (GameState): Match to update.
+    """
+    for fighter, start_x in (
+                             (state.player1, PLAYER1_START_X),
+                             (state.player2, PLAYER2_START_X)
+                             ):
+        fighter.x = start_x
+        fighter.health = MAX_HEALTH
+        fighter.action = 'idle'
+        fighter.got_hit = False
+    state.current_round += 1
+    state.round_over = False
+
+
+def handle_round_end(state):
+    """
+    End the round if a fighter ran out of health.
+
+    Args:
+        state (GameState): Match to update.
+    """
+    if state.player1.health <= 0:
+        state.player2.rounds_won += 1
+        state.round_over = True
+        state.events |= EVENT_P2_WINS_ROUND
+    elif state.player2.health <= 0:
+        state.player1.rounds_won += 1
+        state.round_over = True
+        state.events |= EVENT_P1_WINS_ROUND
+
+
+def handle_match_end(state):
+    """
+    Decide the match after the last round and run the dead animation.
+
+    Args:
+        state (GameState): Match to update.
+    """
+    now = state.time
+    if state.loser is None:
+        if state.current_round < MATCH_ROUNDS:
+            return
+        if state.player1.rounds_won > state.player2.rounds_won:
+            state.loser = 'player2'
+        else:
+            state.loser = 'player1'
+        state.dead_animation_start_time = now
+        state.dead_animation_last_update = now
+        state.events |= EVENT_MATCH_DECIDED
+    if now - state.dead_animation_start_time < dead_animation_duration:
+        if now - state.dead_animation_last_update >= animation_cooldown:
+            state.dead_animation_frame_counter += 1
+            state.dead_animation_last_update = now
+    else:
+        state.events |= EVENT_MATCH_OVER
+
+
+def step(state, player1_input, player2_input, player1_frames, player2_frames):
+    """
+    Advance a match by one tick.
+
+    The state is updated in place; use GameState.copy to keep snapshots.
+    Once the match is decided the fighters stop taking input and only the
+    dead animation keeps running. When both frame tables carry collision
+    boxes an attack hits when its hitbox reaches the opponent's hurtbox,
+    otherwise when it starts within ATTACK_DISTANCE.
+
+    Args:
+        state (GameState): Match to advance.
+        player1_input (int): INPUT_* flags held by Player 1.
+        player2_input (int): INPUT_* flags held by Player 2.
+        player1_frames (FrameTable): Frame count of each action of
+        Player 1's character.
+        player2_frames (FrameTable): Frame count of each action of
+        Player 2's character.
+
+    Returns:
+        GameState: The updated state.
+    """
+    state.tick += 1
+    state.events = 0
+    if state.round_over:
+        reset_round(state)
+    player1 = state.player1
+    player2 = state.player2
+    player1_boxes = player1_frames.boxes
+    player2_boxes = player2_frames.boxes
+    distance_hits = player1_boxes is None or player2_boxes is None
+    if state.loser is None:
+        if handle_player_input(
+                               player1, player2, player1_input,
+                               player1_frames['attack'], distance_hits
+                               ):
+            state.events |= EVENT_P1_ATTACK
+        if state.time - state.last_update >= animation_cooldown:
+            player1.frame += 1
+            player2.frame += 1
+            state.last_update = state.time
+        if player1.frame >= player1_frames[player1.action]:
+            player1.frame = 0
+        jump(player1)
+        if handle_player_input(
+                               player2, player1, player2_input,
+                               player2_frames['attack'], distance_hits
+                               ):
+            state.events |= EVENT_P2_ATTACK
+        if player2.frame >= player2_frames[player2.action]:
+            player2.frame = 0
+        jump(player2)
+        if not distance_hits:
+            handle_hits(state, player1_boxes, player2_boxes)
+        handle_round_end(state)
+    handle_match_end(state)
+    return state
+
+
+def interpolate(previous, current, alpha):
+    """
+    Blend the fighter positions of two consecutive ticks for drawing.
+
+    Only the positions are blended; actions, frames and health are those of
+    the current tick. Across a round reset the current state is used as is,
+    so fighters do not slide back to their starting positions.
+
+    Args:
+        previous (GameState): State before the last tick.
+        current (GameState): State after the last tick.
+        alpha (float): Position between the two ticks, from 0 to 1.
+
+    Returns:
+        GameState: Copy of the current state with blended positions.
+    """
+    state = current.copy()
+    if previous.current_round != current.current_round:
+        return state
+    for fighter, before in (
+                            (state.player1, previous.player1),
+                            (state.player2, previous.player2)
+                            ):
+        fighter.x = round(before.x + (fighter.x - before.x) * alpha)
+        fighter.y = round(before.y + (fighter.y - before.y) * alpha)
+    return state
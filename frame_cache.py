@@ -0,0 +1,250 @@
+"""
+Street Fighter Game
+
+On-disk cache of preprocessed fighter frames.
+
+The scaled and trimmed frames of every sprite sheet, facing both ways, are
+written once as a packed atlas page of raw RGBA pixels, with the area and
+anchor of every frame on it and the profiles the collision boxes are made
+from. Later launches memory-map that file and wrap the page with
+pygame.image.frombuffer instead of decoding, scaling and packing the sheet
+again.
+A cache file is keyed by the sheet contents and every loading parameter, so
+editing a sheet or a scale constant simply produces a new key and the old
+file for that sheet is removed. Files of the same sheet loaded at another
+scale or offset, like the unscaled frames of a frame budget, have a file
+name prefix of their own and are kept alongside.
+"""
+import hashlib
+import mmap
+import os
+import struct
+
+import atlas
+
+CACHE_DIR = '.frame_cache'
+CACHE_VERSION = 5
+CACHE_MAGIC = b'SFFC'
+HEADER_FORMAT = '<4sIIIIII'
+FRAME_FORMAT = '<IIIIii'
+PROFILE_FORMAT = '<{}h'
+
+
+def cache_key(sheet_path, num_frames, frame_size, scale, draw_offset):
+    """
+    Compute the cache key of a sprite sheet and its loading parameters.
+
+    Args:
+        sheet_path (str): Path to the sprite sheet.
+        num_frames (int): Number of frames in the sprite sheet.
+        frame_size (tuple):
+        Size of each frame in the sprite sheet (width, height).
+        scale (int): Scaling factor for resizing frames.
+        draw_offset (tuple): Offset (x, y) of the full-size frame
+        relative to the top-left corner of the player rectangle.
+
+    Returns:
+        str: Hexadecimal digest identifying the preprocessed frames.
+    """
+    digest = hashlib.sha1()
+    with open(sheet_path, 'rb') as sheet_file:
+        digest.update(sheet_file.read())
+    digest.update(repr((
+                        CACHE_VERSION, sheet_path, num_frames,
+                        tuple(frame_size), scale, tuple(draw_offset)
+                        )).encode())
+    return digest.hexdigest()
+
+
+def cache_prefix(sheet_path, scale, draw_offset):
+    """
+    Build the file name prefix shared by every cache file of a sheet
+    loaded at one scale and offset.
+
+    Args:
+        sheet_path (str): Path to the sprite sheet.
+        scale (int): Scaling factor for resizing frames.
+        draw_offset (tuple): Offset (x, y) of the full-size frame
+        relative to the top-left corner of the player rectangle.
+
+    Returns:
+        str: File name prefix without the key.
+    """
+    return os.path.splitext(sheet_path)[0].replace('/', '_').replace(
+        '\\', '_') + '-{}x{}_{}-'.format(scale, *draw_offset)
+
+
+def cache_path(sheet, key):
+    """
+    Build the path of the cache file for a sheet.
+
+    Args:
+        sheet (tuple): (sheet_path, num_frames, frame_size, scale,
+        draw_offset) of the sheet.
+        key (str): Key returned by cache_key.
+
+    Returns:
+        str: Path of the cache file.
+    """
+    sheet_path, num_frames, frame_size, scale, draw_offset = sheet
+    return os.path.join(
+                        CACHE_DIR,
+                        cache_prefix(sheet_path, scale, draw_offset) +
+                        key + '.frames'
+                        )
+
+
+def read_index(data):
+    """
+    Read the header, frame placements and frame profiles of a cache file.
+
+    Args:
+        data (mmap.mmap): Contents of the cache file.
+
+    Returns:
+        tuple: List of ((x, y, width, height), anchor) placements, list of
+        frame profiles, size (width, height) of the atlas page and offset
+        of its pixels, or None when the file is not a cache file of this
+        version.
+
+    Raises:
+        struct.error: If the file is cut short.
+    """
+    magic, version, num_placements, num_profiles, columns, page_width, \
+        page_height = struct.unpack_from(HEADER_FORMAT, data)
+    if magic != CACHE_MAGIC or version != CACHE_VERSION:
+        return None
+    offset = struct.calcsize(HEADER_FORMAT)
+    placements = []
+    for _ in range(num_placements):
+        x, y, width, height, anchor_x, anchor_y = struct.unpack_from(
+            FRAME_FORMAT, data, offset)
+        offset += struct.calcsize(FRAME_FORMAT)
+        placements.append(((x, y, width, height), (anchor_x, anchor_y)))
+    profile_format = PROFILE_FORMAT.format(2 * columns)
+    profiles = []
+    for _ in range(num_profiles):
+        rows = struct.unpack_from(profile_format, data, offset)
+        offset += struct.calcsize(profile_format)
+        profiles.append(tuple(zip(rows[::2], rows[1::2])))
+    return placements, profiles, (page_width, page_height), offset
+
+
+def load_cached_atlas(sheet, key):
+    """
+    Load the preprocessed frames of a sheet from the cache.
+
+    Args:
+        sheet (tuple): (sheet_path, num_frames, frame_size, scale,
+        draw_offset) of the sheet.
+        key (str): Key returned by cache_key.
+
+    Returns:
+        list: List of (page, anchor, area) frames sharing one atlas page,
+        or None when there is no valid cache file.
+    """
+    try:
+        with open(cache_path(sheet, key), 'rb') as cache_file:
+            mapped = mmap.mmap(cache_file.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+    pixels = memoryview(mapped)
+    try:
+        index = read_index(mapped)
+        if index is None:
+            return None
+        placements, profiles, (page_width, page_height), offset = index
+        size = page_width * page_height * 4
+        if len(mapped) - offset < size:
+            return None
+        return atlas.frames_from_atlas((
+                                        pixels[offset:offset + size],
+                                        (page_width, page_height),
+                                        placements
+                                        ))
+    except (struct.error, ValueError):
+        return None
+    finally:
+        pixels.release()
+        mapped.close()
+
+
+def load_cached_profiles(sheet, key):
+    """
+    Load the frame profiles of a sheet from the cache, without its frames.
+
+    Args:
+        sheet (tuple): (sheet_path, num_frames, frame_size, scale,
+        draw_offset) of the sheet.
+        key (str): Key returned by cache_key.
+
+    Returns:
+        list: Profile of each frame, see hitboxes.frame_profile, or None
+        when there is no valid cache file.
+    """
+    try:
+        with open(cache_path(sheet, key), 'rb') as cache_file:
+            mapped = mmap.mmap(cache_file.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+    try:
+        index = read_index(mapped)
+        return None if index is None else index[1]
+    except struct.error:
+        return None
+    finally:
+        mapped.close()
+
+
+def store_atlas(sheet, key, raw_atlas, profiles):
+    """
+    Write the preprocessed frames of a sheet to the cache.
+
+    Older cache files of the same sheet at the same scale and offset are
+    removed. Failures to write are ignored, the game then simply loads
+    from the sheet again next time.
+
+    Args:
+        sheet (tuple): (sheet_path, num_frames, frame_size, scale,
+        draw_offset) of the sheet.
+        key (str): Key returned by cache_key.
+        raw_atlas (tuple): Page bytes, page size and placements, as
+        returned by atlas.pack_frames.
+        profiles (list): Profile of each frame, see hitboxes.frame_profile.
+    """
+    pixels, (page_width, page_height), placements = raw_atlas
+    columns = len(profiles[0]) if profiles else 0
+    path = cache_path(sheet, key)
+    temporary_path = path + '.tmp'
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        with open(temporary_path, 'wb') as cache_file:
+            cache_file.write(struct.pack(
+                                         HEADER_FORMAT, CACHE_MAGIC,
+                                         CACHE_VERSION, len(placements),
+                                         len(profiles), columns, page_width,
+                                         page_height
+                                         ))
+            for (x, y, width, height), (anchor_x, anchor_y) in placements:
+                cache_file.write(struct.pack(
+                                             FRAME_FORMAT, x, y, width,
+                                             height, anchor_x, anchor_y
+                                             ))
+            for profile in profiles:
+                cache_file.write(struct.pack(
+                                             PROFILE_FORMAT.format(
+                                                 2 * columns),
+                                             *[
+                                               row for column in profile
+                                               for row in column
+                                               ]
+                                             ))
+            cache_file.write(pixels)
+        os.replace(temporary_path, path)
+        prefix = cache_prefix(sheet[0], sheet[3], sheet[4])
+        for name in os.listdir(CACHE_DIR):
+            stale_path = os.path.join(CACHE_DIR, name)
+            if name.startswith(prefix) and stale_path != path:
+                os.remove(stale_path)
+    except OSError:
+        return
@@ -0,0 +1,150 @@
+"""
+Street Fighter Game
+
+Frames scaled on demand, within a memory budget.
+
+Instead of keeping every frame resident at its on-screen size, only the
+small unscaled frames of both facings are kept and each scaled variant is
+built the first time it is drawn. Built variants live in one LRU cache
+shared by all fighters that drops the least recently drawn variants once
+their pixels exceed a byte budget, trading memory for the CPU time of
+scaling them again.
+"""
+from collections import OrderedDict
+
+import pygame
+
+
+def surface_size(surface):
+    """
+    Args:
+        surface (pygame.Surface): Surface to measure.
+
+    Returns:
+        int: Bytes of pixel data held by the surface.
+    """
+    return surface.get_pitch() * surface.get_height()
+
+
+class FrameCache:
+    """
+    LRU cache of built frame variants bounded by their pixel memory.
+
+    Attributes:
+        budget (int): Largest number of pixel bytes kept.
+        size (int): Pixel bytes currently kept.
+        hits (int): Lookups served from the cache.
+        misses (int): Lookups that had to build the variant.
+        evictions (int): Variants dropped to stay within the budget.
+    """
+
+    def __init__(self, budget):
+        """
+        Args:
+            budget (int): Largest number of pixel bytes to keep. The most
+            recent variant is always kept, even if it alone is larger.
+        """
+        self.budget = budget
+        self.entries = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, build):
+        """
+        Look up a variant, building and caching it if needed.
+
+        Args:
+            key (tuple): Key identifying the variant.
+            build (callable): Returns the (surface, anchor, area) variant.
+
+        Returns:
+            tuple: The (surface, anchor, area) variant.
+        """
+        frame = self.entries.get(key)
+        if frame is not None:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return frame
+        self.misses += 1
+        frame = build()
+        self.entries[key] = frame
+        self.size += surface_size(frame[0])
+        while self.size > self.budget and len(self.entries) > 1:
+            _, (surface, _, _) = self.entries.popitem(last=False)
+            self.size -= surface_size(surface)
+            self.evictions += 1
+        return frame
+
+    def stats(self):
+        """
+        Returns:
+            dict: 'hits', 'misses', 'evictions', 'entries' and 'size' in
+            bytes.
+        """
+        return {
+                'hits': self.hits, 'misses': self.misses,
+                'evictions': self.evictions, 'entries': len(self.entries),
+                'size': self.size
+                }
+
+
+class ScaledFrames:
+    """
+    Frames of one action facing one way, scaled when first drawn.
+
+    Indexing returns the same (surface, anchor, area) frames as a
+    preloaded action map, so it can stand in for a list of frames. Each
+    scaled frame is a surface of its own, since the cache drops frames one
+    by one.
+    """
+
+    def __init__(self, frame_cache, key, sources, scale, draw_offset):
+        """
+        Args:
+            frame_cache (FrameCache): Cache of built variants.
+            key (tuple): Key unique to this action and direction.
+            sources (list): Unscaled, trimmed (page, anchor, area) frames
+            facing this direction on an atlas page, the anchor being the
+            position of the trimmed area in the frame.
+            scale (int): Scaling factor for resizing frames.
+            draw_offset (tuple): Offset (x, y) of the full-size scaled
+            frame relative to the top-left corner of the player rectangle.
+        """
+        self.frame_cache = frame_cache
+        self.key = key
+        self.sources = sources
+        self.scale = scale
+        self.draw_offset = draw_offset
+
+    def __len__(self):
+        return len(self.sources)
+
+    def __getitem__(self, index):
+        source = self.sources[index]
+        return self.frame_cache.get(
+                                    self.key + (index,),
+                                    lambda: self.build(source)
+                                    )
+
+    def build(self, source):
+        """
+        Scale one source frame.
+
+        Args:
+            source (tuple): Unscaled (page, anchor, area) frame.
+
+        Returns:
+            tuple: The (surface, anchor, area) frame as drawn, area being
+            None as the frame has a surface of its own.
+        """
+        page, (bounds_x, bounds_y), area = source
+        surface = pygame.transform.scale(
+                                         page.subsurface(area),
+                                         (area.width*self.scale,
+                                          area.height*self.scale)
+                                         )
+        anchor_x = self.draw_offset[0] + bounds_x*self.scale
+        anchor_y = self.draw_offset[1] + bounds_y*self.scale
+        return surface, (anchor_x, anchor_y), None
@@ -10,6 +10,29 @@ This file contains all the function for the game .
 import os
 import pygame
 import sys
+import threading
+import time
+from collections import OrderedDict, deque
+from functools import partial
+import asset_pipeline
+import hitboxes
+from audio import MIXER_BUFFER, SoundEffects, init_mixer
+from characters import CharacterRegistry
+from engine import (
+                    INPUT_LEFT, INPUT_RIGHT, INPUT_JUMP, INPUT_ATTACK,
+                    EVENT_P1_ATTACK, EVENT_P2_ATTACK,
+                    EVENT_P1_WINS_ROUND, EVENT_P2_WINS_ROUND,
+                    EVENT_MATCH_OVER, FixedTimestep, GameState,
+                    frame_counts, interpolate, started_commands, step
+                    )
+from frame_provider import FrameCache, ScaledFrames
+from input_buffer import InputBuffer
+from profiler import NullProfiler
+from renderer import Renderer
+from scenes import (
+                    SCENE_TITLE, SCENE_FIGHT, SCENE_ROUND_OVER,
+                    SCENE_MATCH_OVER, SCENE_GOODBYE, SceneManager
+                    )
 
 SCREEN_WIDTH = 1300
 SCREEN_HEIGHT = 600
@@ -18,107 +41,171 @@ GREEN = (0, 255, 0)
 RED = (255, 0, 0)
 BLUE = (0, 0, 255)
 BLACK = (0, 0, 0)
-PLAYER_WIDTH = 100
-PLAYER_HIGHT = 200
-player1 = pygame.Rect(200, 330, PLAYER_WIDTH, PLAYER_HIGHT)
-player2 = pygame.Rect(900, 330, PLAYER_WIDTH, PLAYER_HIGHT)
-JUMP_HEIGHT = 200
-p1_is_jumping = False
-p1_is_falling = False
-p2_is_jumping = False
-p2_is_falling = False
-p1_is_attacking = False
-p2_is_attacking = False
-p1_jump_count = 0
-p2_jump_count = 0
-p1_got_hit = False
-p2_got_hit = False
-jump_timer = 0
-GRAVITY = 10
-PLAYERSPEED = 3
-ATTACK_DISTANCE = 170
-ATTACK_DAMAGE = 20
-JUMPSPEED = 10
+RENDER_FPS = 60
+BANNER_FPS = 30
+ATTACK_SOUND_PRIORITY = 1
+player1_keys = {
+                INPUT_LEFT: pygame.K_a,
+                INPUT_RIGHT: pygame.K_d,
+                INPUT_JUMP: pygame.K_w,
+                INPUT_ATTACK: pygame.K_x
+                }
+player2_keys = {
+                INPUT_LEFT: pygame.K_LEFT,
+                INPUT_RIGHT: pygame.K_RIGHT,
+                INPUT_JUMP: pygame.K_UP,
+                INPUT_ATTACK: pygame.K_SPACE
+                }
 actions = ['run', 'jump', 'attack', 'dead', 'fall', 'idle', 'take_hit']
-warrior_sheet_paths = ['warriorSprites/Run.png',
-                       'warriorSprites/Jump.png',
-                       'warriorSprites/Attack2.png',
-                       'warriorSprites/Death.png',
-                       'warriorSprites/Fall.png',
-                       'warriorSprites/Idle.png',
-                       'warriorSprites/Takehit.png'
-                       ]
-warrior_frames_per_action = [8, 3, 7, 7, 3, 10, 3]
-warrior_frame_size = (162, 162)
-warrior_scale = 5
-wizard_sheet_paths = ['wizardSprites/Run.png',
-                      'wizardSprites/Jump.png',
-                      'wizardSprites/Attack1.png',
-                      'wizardSprites/Death.png',
-                      'wizardSprites/Fall.png',
-                      'wizardSprites/Idle.png',
-                      'wizardSprites/Takehit.png'
-                      ]
-wizard_frames_per_action = [8, 2, 8, 7, 2, 8, 3]
-wizard_frame_size = (250, 250)
-wizard_scale = 3
-warrior_current_action = 'idle'
-wizard_current_action = 'idle'
-player1_health = 100
-player2_health = 100
-warrior_frame = 0
-wizard_frame = 0
-animation_cooldown = 60
-player1_rounds_won = 0
-player2_rounds_won = 0
-current_round = 0
-dead_animation_start_time = 0
-dead_animation_triggered = False
-loser = None
-dead_animation_frame_counter = 0
-dead_animation_duration = 2000
-pygame.mixer.init()
-background_music = pygame.mixer.Sound("background.mp3")
-warrior_attack_sound = pygame.mixer.Sound("sword.wav")
-wizard_attack_sound = pygame.mixer.Sound("magic.wav")
-background_music.play(-1)
-last_update = pygame.time.get_ticks()
-
-
-def get_frame(sheet_path, frame_index, frame_size, target_size):
-    """
-    Load and resize a specific frame from a sprite sheet.
+startup_actions = ['idle', 'run', 'jump', 'attack']
+likely_next_actions = {'jump': 'fall'}
+DEFAULT_FIGHTERS = ('warrior', 'wizard')
+character_registry = CharacterRegistry(actions)
+chosen_fighters = list(DEFAULT_FIGHTERS)
+TEXT_CACHE_SIZE = 64
+PROFILE_PHASES = [
+                  'wait', 'events', 'simulate', 'sound', 'prefetch',
+                  'background', 'fighters', 'scores', 'bars', 'overlay',
+                  'present', 'banners'
+                  ]
+round_banners = {
+                 EVENT_P1_WINS_ROUND: "Player 1 Wins The Round!",
+                 EVENT_P2_WINS_ROUND: "Player 2 Wins The Round!"
+                 }
+match_banners = {
+                 'player2': "Player 1 Wins the Game!",
+                 'player1': "Player 2 Wins the Game!"
+                 }
+font_registry = {}
+box_registry = {}
+text_cache = OrderedDict()
+background_music_path = "background.mp3"
+sound_registry = {}
+attack_sounds = {}
+sound_effects = None
+
+
+def init_audio(buffer=MIXER_BUFFER, measure_latency=False):
+    """
+    Initialize the mixer, load the sounds and start the background music.
+
+    Importing this module does not touch the audio device, so tools and
+    tests can use the game logic without it. The game calls this once
+    when it starts.
+
+    The background music is streamed from disk by pygame.mixer.music and
+    decoded in small chunks while it plays. The fighters' sound effects
+    are loaded once they are chosen, see choose_fighters.
 
     Args:
-        sheet_path (str): Path to the sprite sheet.
-        frame_index (int): Index of the frame to be loaded.
-        frame_size (tuple):
-        Size of each frame in the sprite sheet (width, height).
-        target_size (tuple):
-        Size to which the frame should be resized (width, height).
+        buffer (int): Samples per mixer buffer.
+        measure_latency (bool): Whether to record the latency of every
+        sound effect, see sound_latency_report.
+    """
+    global sound_effects
+    init_mixer(buffer)
+    sound_effects = SoundEffects(
+                                 ['player1', 'player2'], buffer,
+                                 measure_latency
+                                 )
+    pygame.mixer.music.load(background_music_path)
+    pygame.mixer.music.play(-1)
+
+
+def play_sound(player, sound, priority=0, input_time=None):
+    """
+    Play a sound effect on a player's channel if audio has been
+    initialized.
+
+    Args:
+        player (str): 'player1' or 'player2'.
+        sound (pygame.mixer.Sound): Sound to play, or None without audio.
+        priority (int): Priority of the sound, see audio.SoundEffects.
+        input_time (float): time.perf_counter() when the input causing the
+        sound was read.
+    """
+    if sound is not None:
+        sound_effects.play(player, sound, priority, input_time)
+
+
+def load_sound(sound_path):
+    """
+    Get a sound effect from the sound registry, loading it on first use.
+
+    Sounds are decoded up front, into the mixer's sample format, so they
+    start without delay.
+
+    Args:
+        sound_path (str): Path of the sound file.
 
     Returns:
-        pygame.Surface: Resized frame as a Pygame surface.
+        pygame.mixer.Sound: The shared sound.
     """
-    sheet = pygame.image.load(sheet_path).convert_alpha()
-    frame_x = frame_index * frame_size[0]
-    frame_y = 0
-    original_frame = sheet.subsurface(
-                                        pygame.Rect(
-                                                    frame_x, frame_y,
-                                                    frame_size[0],
-                                                    frame_size[1]))
-    resized_frame = pygame.Surface(target_size, pygame.SRCALPHA)
-    resized_frame.blit(pygame.transform.scale(
-                                              original_frame,
-                                              target_size), (0, 0))
+    sound = sound_registry.get(sound_path)
+    if sound is None:
+        sound = pygame.mixer.Sound(sound_path)
+        sound_registry[sound_path] = sound
+    return sound
 
-    return resized_frame
 
+def choose_fighters(player1, player2):
+    """
+    Choose the characters of both players.
+
+    Only the manifests of the chosen characters are read, and only their
+    sound effects are loaded, when audio has been initialized; their
+    sprites are loaded by initialize_game and their collision boxes on
+    first use.
 
-def load_frames(sheet_path, num_frames, frame_size, scale):
+    Args:
+        player1 (str): Name of Player 1's character.
+        player2 (str): Name of Player 2's character.
+
+    Raises:
+        ValueError: If there is no such character.
     """
-    Load and resize all frames from a sprite sheet.
+    characters = [
+                  character_registry.get(player1),
+                  character_registry.get(player2)
+                  ]
+    chosen_fighters[:] = [player1, player2]
+    attack_sounds.clear()
+    if sound_effects is None:
+        return
+    for player, character in zip(['player1', 'player2'], characters):
+        sound_path = character.sounds.get('attack')
+        if sound_path is not None:
+            attack_sounds[player] = load_sound(sound_path)
+
+
+def fighter_characters():
+    """
+    Returns:
+        list: Character of Player 1 and of Player 2.
+    """
+    return [character_registry.get(name) for name in chosen_fighters]
+
+
+def sound_latency_report():
+    """
+    Returns:
+        str: Summary of the measured sound effect latencies, or None when
+        they are not measured.
+    """
+    if sound_effects is None or not sound_effects.measure:
+        return None
+    return sound_effects.latency_report()
+
+
+def load_frames(sheet_path, num_frames, frame_size, scale, draw_offset):
+    """
+    Load, resize and trim all frames from a sprite sheet.
+
+    The sheet is decoded once, every frame is cut from that surface and
+    mirrored, and the frames facing both ways are packed into one atlas
+    page. The page is kept in the
+    on-disk frame cache, so later launches skip decoding, scaling and
+    packing for sheets that have not changed.
 
     Args:
         sheet_path (str): Path to the sprite sheet.
@@ -126,26 +213,228 @@ def load_frames(sheet_path, num_frames, frame_size, scale):
         frame_size (tuple):
         Size of each frame in the sprite sheet (width, height).
         scale (int): Scaling factor for resizing frames.
+        draw_offset (tuple): Offset (x, y) of the full-size frame
+        relative to the top-left corner of the player rectangle.
 
     Returns:
-        list: List of Pygame surfaces representing frames.
-    """
-    frames = [get_frame(sheet_path,
-              i, frame_size,
-              (
-               frame_size[0]*scale,
-               frame_size[1]*scale)
-               )for i in range(num_frames)]
+        list: List of (page, anchor, area) frames sharing one atlas page,
+        those facing right followed by those facing left.
+    """
+    (frames,), _, _ = asset_pipeline.load_assets(
+                                              [(
+                                                sheet_path, num_frames,
+                                                frame_size, scale, draw_offset
+                                                )],
+                                              workers=1
+                                              )
     return frames
 
 
+def draw_frame(window, frame, player):
+    """
+    Draw a frame at its anchor relative to the player rectangle.
+
+    Args:
+        window (pygame.Surface): Pygame window.
+        frame (tuple): (surface, anchor, area) frame from the action map,
+        area being the part of the surface to draw, or None for all of it.
+        player (engine.FighterState): State of the player to draw.
+
+    Returns:
+        pygame.Rect: Area of the window that was drawn.
+    """
+    surface, (anchor_x, anchor_y), area = frame
+    return window.blit(
+                       surface, (player.x + anchor_x, player.y + anchor_y),
+                       area
+                       )
+
+
+class LazyActionMap(dict):
+    """
+    Dictionary of action frames that loads each action on first access.
+
+    Looking up an action that is not loaded yet loads it on the spot.
+    prefetch loads an action on a background thread instead, so it is
+    usually ready by the time the game asks for it.
+    """
+
+    def __init__(
+                 self, actions, sheet_paths_list,
+                 frames_per_action, frame_size, scale, draw_offset
+                 ):
+        super().__init__()
+        self.sources = {
+                        action: (sheet_path, num_frames)
+                        for action, sheet_path, num_frames in zip(
+                            actions, sheet_paths_list, frames_per_action)
+                        }
+        self.frame_size = frame_size
+        self.scale = scale
+        self.draw_offset = draw_offset
+        self.lock = threading.Lock()
+        self.prefetching = set()
+
+    def __missing__(self, action):
+        return self.load(action)
+
+    def sheet(self, action):
+        """
+        Describe the sprite sheet of an action.
+
+        Args:
+            action (str): Name of the action.
+
+        Returns:
+            tuple: (sheet_path, num_frames, frame_size, scale, draw_offset)
+            as taken by load_frames.
+        """
+        sheet_path, num_frames = self.sources[action]
+        return sheet_path, num_frames, self.frame_size, self.scale, \
+            self.draw_offset
+
+    def add(self, action, frames):
+        """
+        Store the frames of an action by direction.
+
+        Args:
+            action (str): Name of the action.
+            frames (list): List of (page, anchor, area) frames facing
+            right followed by those facing left, as returned by
+            load_frames.
+        """
+        facing = len(frames) // 2
+        self[action] = {1: frames[:facing], -1: frames[facing:]}
+
+    def load(self, action):
+        """
+        Load an action unless it is already loaded.
+
+        Args:
+            action (str): Name of the action.
+
+        Returns:
+            dict: Dictionary mapping direction to list of frames.
+        """
+        with self.lock:
+            if action not in self:
+                self.add(action, load_frames(*self.sheet(action)))
+            self.prefetching.discard(action)
+            return dict.__getitem__(self, action)
+
+    def prefetch(self, action):
+        """
+        Start loading an action on a background thread.
+
+        Args:
+            action (str): Name of the action, or None to do nothing.
+        """
+        if action is None or action in self or action in self.prefetching:
+            return
+        self.prefetching.add(action)
+        threading.Thread(target=self.load, args=(action,), daemon=True).start()
+
+
+class ScalingActionMap(LazyActionMap):
+    """
+    Action map that keeps only the unscaled frames of each action resident.
+
+    Every action is loaded trimmed but at its original size, facing both
+    ways; the scaled frames the game draws are built on first use and kept in
+    a FrameCache with a byte budget, which can be shared by several maps.
+    """
+
+    def __init__(self, frame_cache, *args):
+        """
+        Args:
+            frame_cache (FrameCache): Cache of scaled frames.
+            args: Arguments of LazyActionMap.
+        """
+        super().__init__(*args)
+        self.frame_cache = frame_cache
+
+    def sheet(self, action):
+        """
+        Describe the sprite sheet of an action, loaded without scaling.
+
+        Args:
+            action (str): Name of the action.
+
+        Returns:
+            tuple: (sheet_path, num_frames, frame_size, scale, draw_offset)
+            as taken by load_frames.
+        """
+        sheet_path, num_frames = self.sources[action]
+        return sheet_path, num_frames, self.frame_size, 1, (0, 0)
+
+    def add(self, action, frames):
+        """
+        Store the unscaled frames of an action for both directions.
+
+        Args:
+            action (str): Name of the action.
+            frames (list): List of unscaled (page, anchor, area) frames
+            facing right followed by those facing left.
+        """
+        sheet_path = self.sources[action][0]
+        facing = len(frames) // 2
+        self[action] = {
+            direction: ScaledFrames(
+                                    self.frame_cache,
+                                    (sheet_path, direction), sources,
+                                    self.scale, self.draw_offset
+                                    )
+            for direction, sources in (
+                (1, frames[:facing]), (-1, frames[facing:]))
+            }
+
+
+def preload_actions(
+                    action_maps, actions, image_paths=(), workers=None,
+                    profile_sheets=()
+                    ):
+    """
+    Load actions of several action maps and images in one parallel batch.
+
+    Args:
+        action_maps (list): List of LazyActionMap objects.
+        actions (list): Actions to load into every action map.
+        image_paths (list): Paths of opaque images to load alongside.
+        workers (int): Number of worker processes, one per core if None.
+        profile_sheets (list): Sheets to load only the frame profiles of
+        alongside, see asset_pipeline.load_assets.
+
+    Returns:
+        tuple: Image surfaces, one per image path, and frame profile
+        lists, one per profile sheet.
+    """
+    targets = [
+               (action_map, action)
+               for action_map in action_maps for action in actions
+               if action not in action_map
+               ]
+    sheet_frames, images, profiles = asset_pipeline.load_assets(
+        [action_map.sheet(action) for action_map, action in targets],
+        image_paths, workers, profile_sheets
+        )
+    for (action_map, action), frames in zip(targets, sheet_frames):
+        action_map.add(action, frames)
+    return images, profiles
+
+
 def create_action_map(
                       actions, sheet_paths_list,
-                      frames_per_action, frame_size, scale
+                      frames_per_action, frame_size, scale, draw_offset,
+                      preload=None, workers=None, frame_cache=None
                       ):
     """
     Create a dictionary mapping actions to their corresponding frames.
 
+    Every action holds one frame list per facing direction, keyed the
+    same way as calculate_direction (1 for right, -1 for left), so the
+    frames never have to be flipped while the game is running.
+    Actions that are not preloaded are loaded on first access.
+
     Args:
         actions (list): List of action names.
         sheet_paths_list (list): List of paths to sprite sheets for each action.
@@ -153,30 +442,121 @@ def create_action_map(
         frame_size (tuple):
         Size of each frame in the sprite sheet (width, height).
         scale (int): Scaling factor for resizing frames.
+        draw_offset (tuple): Offset (x, y) of the full-size frame
+        relative to the top-left corner of the player rectangle.
+        preload (list): Actions to load right away, all of them if None.
+        workers (int): Number of worker processes, one per core if None.
+        frame_cache (FrameCache): Cache to build scaled frames into on
+        demand, or None to keep every frame resident at its drawn size.
 
     Returns:
-        dict: Dictionary mapping actions to lists of frames.
-    """
-    action_map = {}
-    for action, sheet_path, num_frames in zip(
-                                              actions,
-                                              sheet_paths_list,
-                                              frames_per_action
-                                              ):
-        frames = load_frames(sheet_path, num_frames, frame_size, scale)
-        action_map[action] = frames
+        LazyActionMap: Dictionary mapping actions to a dictionary of
+        direction to list of (surface, anchor, area) frames.
+    """
+    if frame_cache is None:
+        action_map = LazyActionMap(
+                                   actions, sheet_paths_list,
+                                   frames_per_action, frame_size, scale,
+                                   draw_offset
+                                   )
+    else:
+        action_map = ScalingActionMap(
+                                      frame_cache, actions,
+                                      sheet_paths_list, frames_per_action,
+                                      frame_size, scale, draw_offset
+                                      )
+    preload_actions(
+                    [action_map], actions if preload is None else preload,
+                    workers=workers
+                    )
     return action_map
 
 
+def prefetch_likely_actions(
+                            player1ActionFramesMap, player2ActionFramesMap,
+                            player1_current_action, player2_current_action,
+                            current_round
+                            ):
+    """
+    Prefetch the actions the fighters are likely to need next.
+
+    A jump is followed by a fall, an attack by the opponent taking a hit,
+    and the last round by one of the fighters dying.
+
+    Args:
+        player1ActionFramesMap (LazyActionMap): Player 1's action frames.
+        player2ActionFramesMap (LazyActionMap): Player 2's action frames.
+        player1_current_action (str): Current action of Player 1.
+        player2_current_action (str): Current action of Player 2.
+        current_round (int): Current game round.
+    """
+    player1ActionFramesMap.prefetch(
+        likely_next_actions.get(player1_current_action))
+    player2ActionFramesMap.prefetch(
+        likely_next_actions.get(player2_current_action))
+    if player1_current_action == 'attack':
+        player2ActionFramesMap.prefetch('take_hit')
+    if player2_current_action == 'attack':
+        player1ActionFramesMap.prefetch('take_hit')
+    if current_round >= 2:
+        player1ActionFramesMap.prefetch('dead')
+        player2ActionFramesMap.prefetch('dead')
+
+
+def get_font(font_name, size):
+    """
+    Get a font from the font registry, loading it on first use.
+
+    Args:
+        font_name (str): Path of the font file, or None for the default font.
+        size (int): Font size.
+
+    Returns:
+        pygame.font.Font: The shared font object.
+    """
+    key = (font_name, size)
+    font = font_registry.get(key)
+    if font is None:
+        font = pygame.font.Font(font_name, size)
+        font_registry[key] = font
+    return font
+
+
+def render_text(font_name, size, text, colour):
+    """
+    Render antialiased text, reusing earlier renders of the same text.
+
+    Rendered surfaces are kept in a cache of TEXT_CACHE_SIZE entries that
+    drops the least recently used one when it is full.
+
+    Args:
+        font_name (str): Path of the font file, or None for the default font.
+        size (int): Font size.
+        text (str): Text to render.
+        colour (tuple): Text colour (r, g, b).
+
+    Returns:
+        pygame.Surface: Rendered text.
+    """
+    key = (font_name, size, text, colour)
+    text_surface = text_cache.get(key)
+    if text_surface is None:
+        text_surface = get_font(font_name, size).render(text, True, colour)
+        text_cache[key] = text_surface
+        if len(text_cache) > TEXT_CACHE_SIZE:
+            text_cache.popitem(last=False)
+    else:
+        text_cache.move_to_end(key)
+    return text_surface
+
+
 def calculate_direction(player1, player2):
     """
     Calculate the direction (left or right) between two players.
 
     Args:
-        player1 (pygame.Rect):
-        Rectangle representing the position of the first player.
-        player2 (pygame.Rect):
-        Rectangle representing the position of the second player.
+        player1 (engine.FighterState): State of the first player.
+        player2 (engine.FighterState): State of the second player.
 
     Returns:
         int: Direction (1 for right, -1 for left).
@@ -186,44 +566,154 @@ def calculate_direction(player1, player2):
 
 def welcome_screen(screen, screen_rectangle):
     """
-    Display the welcome screen.
+    Draw the welcome screen.
 
     Args:
         screen: Pygame window surface.
         screen_rectangle: Rectangle representing the screen dimensions.
     """
     screen.fill(BLACK)
-    welcome_font = pygame.font.Font('freesansbold.ttf', 48)
-    welcome_text = welcome_font.render(
-                                        "Welcome to Street Fighter game!",
-                                        True, WHITE
-                                        )
+    welcome_text = render_text(
+                               'freesansbold.ttf', 48,
+                               "Welcome to Street Fighter game!", WHITE
+                               )
     welcome_box = welcome_text.get_rect()
     welcome_box.center = screen_rectangle.center
     screen.blit(welcome_text, welcome_box)
 
-    pygame.display.flip()
-    pygame.time.wait(2000)
-
 
 def goodbye_screen(screen, screen_rectangle):
     """
-    Display the goodbye screen.
+    Draw the goodbye screen.
 
     Args:
         screen: Pygame window surface.
         screen_rectangle: Rectangle representing the screen dimensions.
     """
     screen.fill(BLACK)
-    goodbye_font = pygame.font.Font('freesansbold.ttf', 48)
-    goodbye_text = goodbye_font.render(
-        "Goodbye! Thanks for playing!", True, WHITE)
+    goodbye_text = render_text(
+        'freesansbold.ttf', 48, "Goodbye! Thanks for playing!", WHITE)
     goodbye_box = goodbye_text.get_rect()
     goodbye_box.center = screen_rectangle.center
     screen.blit(goodbye_text, goodbye_box)
 
-    pygame.display.flip()
-    pygame.time.wait(2000)
+
+def character_select_screen(screen, screen_rectangle, names, cursors, ready):
+    """
+    Draw the character select screen.
+
+    Each player's half of the screen shows the character under that
+    player's cursor, in green once the player is ready.
+
+    Args:
+        screen: Pygame window surface.
+        screen_rectangle: Rectangle representing the screen dimensions.
+        names (list): Names of the characters to choose from.
+        cursors (list): Index in names of each player's cursor.
+        ready (list): Whether each player has confirmed the choice.
+    """
+    screen.fill(BLACK)
+    title_text = render_text(
+        'freesansbold.ttf', 48, "Choose your fighters", WHITE)
+    title_box = title_text.get_rect()
+    title_box.center = (screen_rectangle.centerx, 100)
+    screen.blit(title_text, title_box)
+    for player, keys in enumerate((player1_keys, player2_keys)):
+        centerx = screen_rectangle.width * (2 * player + 1) // 4
+        character = character_registry.get(names[cursors[player]])
+        hint = "{} / {}: choose, {}: ready".format(*(
+            pygame.key.name(keys[flag]).upper()
+            for flag in (INPUT_LEFT, INPUT_RIGHT, INPUT_ATTACK)))
+        lines = [
+                 ("Player {}".format(player + 1), 36, WHITE, 250),
+                 ("< {} >".format(character.display_name), 74,
+                  GREEN if ready[player] else WHITE, 330),
+                 (hint, 24, WHITE, 420)
+                 ]
+        for text, size, colour, centery in lines:
+            text_surface = render_text(None, size, text, colour)
+            text_box = text_surface.get_rect()
+            text_box.center = (centerx, centery)
+            screen.blit(text_surface, text_box)
+
+
+def select_fighters(screen, screen_rectangle, names):
+    """
+    Let both players choose their characters on the character select
+    screen.
+
+    Each player moves through the characters with the left and right keys
+    and confirms with the attack key, which unconfirms when pressed again.
+    The screen is only drawn again when a choice changed. Closing the
+    window quits the game.
+
+    Args:
+        screen: Pygame window surface.
+        screen_rectangle: Rectangle representing the screen dimensions.
+        names (list): Names of the characters to choose from.
+
+    Returns:
+        list: Names of Player 1's and Player 2's characters.
+    """
+    fpsClock = pygame.time.Clock()
+    cursors = [
+               names.index(name) if name in names else 0
+               for name in DEFAULT_FIGHTERS
+               ]
+    ready = [False, False]
+    changed = True
+    while not all(ready):
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                pygame.quit()
+                sys.exit()
+            if event.type != pygame.KEYDOWN:
+                continue
+            for player, keys in enumerate((player1_keys, player2_keys)):
+                if event.key == keys[INPUT_ATTACK]:
+                    ready[player] = not ready[player]
+                elif ready[player]:
+                    continue
+                elif event.key == keys[INPUT_LEFT]:
+                    cursors[player] = (cursors[player] - 1) % len(names)
+                elif event.key == keys[INPUT_RIGHT]:
+                    cursors[player] = (cursors[player] + 1) % len(names)
+                else:
+                    continue
+                changed = True
+        if changed:
+            character_select_screen(
+                                    screen, screen_rectangle, names,
+                                    cursors, ready
+                                    )
+            pygame.display.flip()
+            changed = False
+        fpsClock.tick(BANNER_FPS)
+    return [names[cursor] for cursor in cursors]
+
+
+def draw_score_labels(window):
+    """
+    Draw the fixed part of the round and score labels.
+
+    The labels are drawn once into the static layer, display_scores then
+    only draws the numbers next to them.
+
+    Args:
+        window: Pygame surface to draw on.
+    """
+    digit_width = get_font(None, 36).size("0")[0]
+    player2_label = render_text(None, 36, "Player 2 Score: ", WHITE)
+
+    window.blit(render_text(None, 36, "Round ", WHITE), (10, 10))
+    window.blit(render_text(None, 36, "Player 1 Score: ", WHITE), (10, 70))
+    window.blit(
+                player2_label,
+                (
+                 SCREEN_WIDTH - player2_label.get_width() - digit_width - 10,
+                 70
+                 )
+                )
 
 
 def display_scores(
@@ -233,103 +723,110 @@ def display_scores(
     """
     Display current round and player scores.
 
+    Only the numbers are drawn, the labels are part of the static layer.
+    The numbers come from the text cache, so they are rendered again only
+    when the round or a score actually changes.
+
     Args:
         window: Pygame window surface.
         current_round (int): Current game round.
         player1_rounds_won (int): Number of rounds won by Player 1.
         player2_rounds_won (int): Number of rounds won by Player 2.
+
+    Returns:
+        list: Areas of the window that were drawn.
     """
-    font = pygame.font.Font(None, 36)
+    font = get_font(None, 36)
 
-    round_text = font.render(f"Round {current_round+1}", True, WHITE)
-    player1_score_text = font.render(
-                                     f"Player 1 Score: {player1_rounds_won}",
-                                     True, WHITE
+    round_text = render_text(None, 36, f"{current_round+1}", WHITE)
+    player1_score_text = render_text(
+                                     None, 36, f"{player1_rounds_won}", WHITE
                                      )
-    player2_score_text = font.render(
-                                     f"Player 2 Score: {player2_rounds_won}",
-                                     True, WHITE
+    player2_score_text = render_text(
+                                     None, 36, f"{player2_rounds_won}", WHITE
                                      )
 
-    window.blit(round_text, (10, 10))
-    window.blit(player1_score_text, (10, 70))
-    window.blit(
-                player2_score_text,
-                (SCREEN_WIDTH - player2_score_text.get_width() - 10, 70)
-                )
-
-
-def handle_events(window, arena):
+    return [
+            window.blit(round_text, (10 + font.size("Round ")[0], 10)),
+            window.blit(
+                        player1_score_text,
+                        (10 + font.size("Player 1 Score: ")[0], 70)
+                        ),
+            window.blit(
+                        player2_score_text,
+                        (SCREEN_WIDTH - player2_score_text.get_width() - 10,
+                         70)
+                        )
+            ]
+
+
+def handle_events(input_buffers=(), tick=0):
     """
     Handle Pygame events.
 
+    Key presses and releases go to every player's input buffer, which
+    keeps those of its own keys.
+
     Args:
-        window: Pygame window surface.
-        arena: Rectangle representing the game area.
+        input_buffers (list): InputBuffer of each player.
+        tick (int): Next tick to be simulated.
+
+    Returns:
+        bool: Whether the player asked to close the window.
     """
+    quit_requested = False
+    now = time.perf_counter()
     for event in pygame.event.get():
         if event.type == pygame.QUIT:
-            goodbye_screen(window, arena)
-            sys.exit()
+            quit_requested = True
+        elif event.type in (pygame.KEYDOWN, pygame.KEYUP):
+            for input_buffer in input_buffers:
+                input_buffer.handle_event(event, tick, now)
+        elif event.type == pygame.WINDOWFOCUSLOST:
+            for input_buffer in input_buffers:
+                input_buffer.release_all()
+    return quit_requested
 
 
-def move_player(direction, player, PLAYERSPEED, arena):
+def health_bar_rects(bar_width=550, bar_height=20):
     """
-    Move the player based on the specified direction.
+    Get the rectangles of both health bars.
 
     Args:
-        direction (str): Direction of movement ('right' or 'left').
-        player (pygame.Rect): Rectangle representing the player's position.
-        PLAYERSPEED (int): Speed of player movement.
-        arena: Rectangle representing the game area.
+        bar_width (int): Width of the health bars.
+        bar_height (int): Height of the health bars.
 
     Returns:
-        pygame.Rect: Updated player rectangle after movement.
+        pygame.Rect, pygame.Rect: Health bars of Player 1 and Player 2.
     """
-    if direction == "right":
-        player = player.move(PLAYERSPEED, 0)
-    elif direction == "left":
-        player = player.move(-PLAYERSPEED, 0)
-    if player.right > arena.right:
-        player.right = arena.right
-    elif player.left < arena.left:
-        player.left = arena.left
-    return player
+    player1_bar_rect = pygame.Rect(50, 50, bar_width, bar_height)
+    player2_bar_rect = pygame.Rect(
+                                   SCREEN_WIDTH - bar_width - 50,
+                                   50, bar_width, bar_height
+                                   )
+    return player1_bar_rect, player2_bar_rect
 
 
-def jump(
-         is_jumping, is_falling, player, JUMP_HEIGHT,
-         JUMPSPEED, GRAVITY, jump_count
-         ):
+def draw_bar_frames(window, bar_width=550, bar_height=20):
     """
-    Handle player jumping and falling.
+    Draw the background and border of both health bars.
 
-    Args:
-        is_jumping (bool): Whether the player is currently jumping.
-        is_falling (bool): Whether the player is currently falling.
-        player (pygame.Rect): Rectangle representing the player's position.
-        JUMP_HEIGHT (int): Maximum height the player can jump.
-        JUMPSPEED (int): Speed at which the player jumps.
-        GRAVITY (int): Gravity affecting the player's fall.
-        jump_count (int): Counter for tracking jump progress.
+    The frames never change, so they are drawn once into the static layer.
 
-    Returns:
-        tuple: Updated state of jumping, falling, player, and jump count.
+    Args:
+        window: Pygame surface to draw on.
+        bar_width (int): Width of the health bars.
+        bar_height (int): Height of the health bars.
     """
-    if is_jumping:
-        if jump_count < JUMP_HEIGHT:
-            player.y -= JUMPSPEED
-            jump_count += JUMPSPEED
-        else:
-            is_jumping = False
-            is_falling = True
+    player1_bar_rect, player2_bar_rect = health_bar_rects(
+                                                          bar_width,
+                                                          bar_height
+                                                          )
+    pygame.draw.rect(window, RED, player1_bar_rect)
+    pygame.draw.rect(window, WHITE, player1_bar_rect, 2)
 
-    if not is_jumping and player.y < 330:
-        player.y += GRAVITY
-    elif not is_jumping and player.y >= 0:
-        jump_count = 0
-        is_falling = False
-    return is_jumping, is_falling, player, jump_count
+    pygame.draw.rect(window, BLUE, player2_bar_rect)
+    pygame.draw.rect(window, WHITE, player2_bar_rect, 2)
 
 
 def draw_bars(
@@ -337,7 +834,10 @@ def draw_bars(
               bar_width=550, bar_height=20
               ):
     """
-    Draw health bars for both players on the window.
+    Draw the health of both players on the window.
+
+    Only the green fills are drawn, the bar frames are part of the
+    static layer.
 
     Args:
         window: Pygame window surface.
@@ -345,18 +845,14 @@ def draw_bars(
         player2_health (int): Health of Player 2.
         bar_width (int): Width of the health bars.
         bar_height (int): Height of the health bars.
-    """
-    player1_bar_rect = pygame.Rect(50, 50, bar_width, bar_height)
-    player2_bar_rect = pygame.Rect(
-                                   SCREEN_WIDTH - bar_width - 50,
-                                   50, bar_width, bar_height
-                                   )
-    pygame.draw.rect(window, RED, player1_bar_rect)
-    pygame.draw.rect(window, WHITE, player1_bar_rect, 2)
-
-    pygame.draw.rect(window, BLUE, player2_bar_rect)
-    pygame.draw.rect(window, WHITE, player2_bar_rect, 2)
 
+    Returns:
+        pygame.Rect, pygame.Rect: Filled parts of both health bars.
+    """
+    player1_bar_rect, player2_bar_rect = health_bar_rects(
+                                                          bar_width,
+                                                          bar_height
+                                                          )
     player1_fill_rect = pygame.Rect(
                                     player1_bar_rect.left,
                                     player1_bar_rect.top,
@@ -373,557 +869,591 @@ def draw_bars(
 
     pygame.draw.rect(window, GREEN, player1_fill_rect)
     pygame.draw.rect(window, GREEN, player2_fill_rect)
+    return player1_fill_rect, player2_fill_rect
+
+
+def draw_profiler_overlay(window, profiler):
+    """
+    Draw the profiler summary in the bottom left corner of the window.
+
+    Args:
+        window (pygame.Surface): Pygame window.
+        profiler (profiler.FrameProfiler): Profiler to summarise.
+
+    Returns:
+        list: Areas of the window that were drawn.
+    """
+    lines = profiler.summary()
+    rects = []
+    for index, line in enumerate(lines):
+        text = render_text(None, 24, line, WHITE)
+        rects.append(window.blit(
+                                 text,
+                                 (10, SCREEN_HEIGHT - 10 -
+                                  (len(lines) - index) * text.get_height())
+                                 ))
+    return rects
+
+
+def draw_collision_boxes(window, state, player1_boxes, player2_boxes):
+    """
+    Outline the hurtboxes and hitboxes of both fighters' current frames.
+
+    Args:
+        window (pygame.Surface): Pygame window.
+        state (engine.GameState): Match being drawn.
+        player1_boxes (dict): Collision boxes of Player 1's frames.
+        player2_boxes (dict): Collision boxes of Player 2's frames.
+
+    Returns:
+        list: Areas of the window that were drawn.
+    """
+    rects = []
+    for fighter, opponent, boxes in (
+                                     (state.player1, state.player2,
+                                      player1_boxes),
+                                     (state.player2, state.player1,
+                                      player2_boxes)
+                                     ):
+        hurtbox, hitbox = boxes[fighter.action][
+            calculate_direction(fighter, opponent)][fighter.frame]
+        for box, colour in ((hurtbox, GREEN), (hitbox, RED)):
+            if box is not None:
+                rects.append(pygame.draw.rect(
+                                              window, colour,
+                                              pygame.Rect(box).move(
+                                                  fighter.x, fighter.y),
+                                              2
+                                              ))
+    return rects
+
+
+def create_static_layer(backGround):
+    """
+    Build the layer of everything on screen that never changes.
+
+    The stage is scaled to the screen, converted to the display pixel
+    format and the health bar frames and score labels are drawn on it,
+    so the game loop draws all of it with a single cheap blit.
+
+    Args:
+        backGround (pygame.Surface): Stage background image.
+
+    Returns:
+        pygame.Surface: Static layer in the display pixel format.
+    """
+    if backGround.get_size() != (SCREEN_WIDTH, SCREEN_HEIGHT):
+        backGround = pygame.transform.smoothscale(
+                                                  backGround,
+                                                  (SCREEN_WIDTH, SCREEN_HEIGHT)
+                                                  )
+    static_layer = backGround.convert()
+    draw_bar_frames(static_layer)
+    draw_score_labels(static_layer)
+    return static_layer
 
 
 def display_winning_screen(message, window):
     """
-    Display the winning screen with the specified message.
+    Draw the winning message over the last frame of the fight.
 
     Args:
         message (str): Message to be displayed on the winning screen.
         window: Pygame window surface.
     """
-    font = pygame.font.Font(None, 74)
-    text = font.render(message, True, (255, 255, 255))
+    text = render_text(None, 74, message, WHITE)
     text_rect = text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2))
 
     window.blit(text, text_rect)
-    pygame.display.flip()
-    pygame.time.wait(2000)
 
 
-def reset_game(
-               current_round, player1_x, player2_x,
-               warrior_current_action, wizard_current_action,
-               p1_got_hit, p2_got_hit
-               ):
+def transition_jobs(player1ActionFramesMap, player2ActionFramesMap, state):
     """
-    Reset game-related variables for a new round.
+    List work worth doing while a banner is shown instead of during the
+    fight.
+
+    The actions not loaded at startup are loaded, the first frames the
+    fight draws are built, and the texts of the coming scores and banners
+    are rendered into the text cache.
 
     Args:
-        current_round (int): Current game round.
-        player1_x (int): Initial x-coordinate for Player 1.
-        player2_x (int): Initial x-coordinate for Player 2.
-        warrior_current_action (str): Current action for the warrior.
-        wizard_current_action (str): Current action for the wizard.
-        p1_got_hit (bool): Whether Player 1 got hit in the previous round.
-        p2_got_hit (bool): Whether Player 2 got hit in the previous round.
+        player1ActionFramesMap (LazyActionMap): Player 1's action frames.
+        player2ActionFramesMap (LazyActionMap): Player 2's action frames.
+        state (engine.GameState): Match being played.
 
     Returns:
-        tuple:
-        Updated values for player health, current round,
-        player positions, and action states.
-    """
-    player1_x = 200
-    player2_x = 900
-    player1_health = 100
-    player2_health = 100
-    current_round += 1
-    warrior_current_action = 'idle'
-    wizard_current_action = 'idle'
-    p1_got_hit = False
-    p2_got_hit = False
-    return player1_health, player2_health, current_round, player1_x, \
-        player2_x, warrior_current_action, wizard_current_action, \
-        p1_got_hit, p2_got_hit
-
-
-def handle_player1_input(
-                         arena, warriorActionFramesMap, player2_health,
-                         p1_is_jumping, player1, p1_is_falling,
-                         p1_is_attacking, p2_is_jumping, p2_is_falling,
-                         player2, warrior_current_action
-                         ):
-    """
-    Handle player input and update game state for Player 1.
-
-    Args:
-        arena (pygame.Rect): The game arena rectangle.
-        warriorActionFramesMap (dict):
-        Dictionary mapping warrior actions to corresponding frames.
-        player2_health (int): Health of Player 2.
-        p1_is_jumping (bool): Whether Player 1 is currently jumping.
-        player1 (pygame.Rect): Player 1 rectangle.
-        p1_is_falling (bool): Whether Player 1 is currently falling.
-        p1_is_attacking (bool): Whether Player 1 is currently attacking.
-        p2_is_jumping (bool): Whether Player 2 is currently jumping.
-        p2_is_falling (bool): Whether Player 2 is currently falling.
-        player2 (pygame.Rect): Player 2 rectangle.
-        warrior_current_action (str): Current action for the warrior.
+        collections.deque: Callables to run one per banner frame.
+    """
+    jobs = deque()
+    for action_map in (player1ActionFramesMap, player2ActionFramesMap):
+        for action in action_map.sources:
+            if action not in action_map:
+                jobs.append(partial(action_map.load, action))
+        for frames in action_map['idle'].values():
+            jobs.append(partial(frames.__getitem__, 0))
+    texts = [(36, f"{state.current_round + 2}")] + [
+             (36, f"{rounds_won + 1}")
+             for rounds_won in {state.player1.rounds_won,
+                                state.player2.rounds_won}
+             ] + [
+             (74, message) for banners in (round_banners, match_banners)
+             for message in banners.values()
+             ]
+    for size, text in texts:
+        jobs.append(partial(render_text, None, size, text, WHITE))
+    return jobs
+
+
+def initialize_game(
+                    workers=None, frame_budget=None,
+                    audio_buffer=MIXER_BUFFER, measure_audio_latency=False,
+                    fighters=None
+                    ):
+    """
+    Initialize the Pygame window, background music, and character action frames.
 
-    Returns:
-        tuple: Updated values for warrior action, hit status,
-        Player 2 health, jumping/falling states, and player positions.
-    """
-    keys = pygame.key.get_pressed()
-    global p2_got_hit, warrior_frame, last_update, wizard_frame
-    if keys[pygame.K_a] and not p1_is_attacking:
-        player1 = move_player("left", player1, PLAYERSPEED, arena)
-        warrior_current_action = 'run'
-    elif keys[pygame.K_d] and not p1_is_attacking:
-        player1 = move_player("right", player1, PLAYERSPEED, arena)
-        warrior_current_action = 'run'
-    elif keys[pygame.K_w] and not p1_is_jumping and not p1_is_attacking:
-        p1_is_jumping = True
-        warrior_current_action = 'jump'
-    elif keys[pygame.K_x] and not p1_is_attacking and \
-            not p1_is_falling and not p1_is_jumping:
-        warrior_attack_sound.play()
-        p1_is_attacking = True
-        warrior_frame = 0
-        warrior_current_action = 'attack'
-        if abs(player1.x-player2.x) < ATTACK_DISTANCE and \
-                not p2_is_jumping and not p2_is_falling:
-            p2_got_hit = True
-            player2_health -= ATTACK_DAMAGE
-    elif p1_got_hit:
-        warrior_current_action = 'take_hit'
-    elif not keys[pygame.K_w] and p1_is_falling and not p1_is_attacking:
-        warrior_current_action = 'fall'
-    elif not keys[pygame.K_w] and not keys[pygame.K_x] and \
-            not p1_is_jumping and not p1_is_attacking:
-        p1_is_jumping = False
-        warrior_current_action = 'idle'
-    elif p1_is_attacking and \
-            warrior_frame >= len(warriorActionFramesMap['attack'])-1:
-        p1_is_attacking = False
-        warrior_current_action = 'idle'
-        p2_got_hit = False
-    current_time = pygame.time.get_ticks()
-    if current_time - last_update >= animation_cooldown:
-        warrior_frame += 1
-        wizard_frame += 1
-        last_update = current_time
-    if warrior_frame >= len(warriorActionFramesMap[warrior_current_action]):
-        warrior_frame = 0
-    return warrior_current_action, p2_got_hit, player2_health, \
-        p1_is_jumping, p1_is_falling, player1, p1_is_attacking, warrior_frame
-
-
-def handle_player2_input(
-                         arena, wizardActionFramesMap, player1_health,
-                         p2_is_jumping, player2, p2_is_falling,
-                         p2_is_attacking, p1_is_jumping, p1_is_falling,
-                         player1, wizard_current_action
-                         ):
-    """
-    Handle player input and update game state for Player 2.
-
-    Args:
-        arena (pygame.Rect): The game arena rectangle.
-        wizardActionFramesMap (dict):
-        Dictionary mapping wizard actions to corresponding frames.
-        player1_health (int): Health of Player 1.
-        p2_is_jumping (bool): Whether Player 2 is currently jumping.
-        player2 (pygame.Rect): Player 2 rectangle.
-        p2_is_falling (bool): Whether Player 2 is currently falling.
-        p2_is_attacking (bool): Whether Player 2 is currently attacking.
-        p1_is_jumping (bool): Whether Player 1 is currently jumping.
-        p1_is_falling (bool): Whether Player 1 is currently falling.
-        player1 (pygame.Rect): Player 1 rectangle.
-        wizard_current_action (str): Current action for the wizard.
+    Only the sprites of the two chosen characters are loaded, so the size
+    of the roster does not matter. The stage and the startup actions of
+    both fighters are decoded together in a worker pool; every other
+    action is loaded on first use. The collision boxes of both fighters
+    are made from the frame profiles of every action, which come from the
+    frame cache or, for sheets not cached yet, are decoded in the same
+    batch. When both players chose the same character they share one
+    action map.
+
+    Args:
+        workers (int): Number of worker processes, one per core if None.
+        frame_budget (int): Bytes of scaled frames to keep, shared by both
+        fighters, with only the unscaled frames kept resident and the
+        scaled ones built on demand; None keeps every frame resident at
+        its drawn size.
+        audio_buffer (int): Samples per mixer buffer.
+        measure_audio_latency (bool): Whether to record the latency of
+        every sound effect.
+        fighters (list): Names of Player 1's and Player 2's characters,
+        chosen on the character select screen if None.
 
     Returns:
-        tuple: Updated values for wizard action, hit status,
-        Player 1 health, jumping/falling states, and player positions.
-    """
-    keys = pygame.key.get_pressed()
-    global p1_got_hit, wizard_frame, last_update
-    if keys[pygame.K_LEFT] and not p2_is_attacking:
-        player2 = move_player("left", player2, PLAYERSPEED, arena)
-        wizard_current_action = 'run'
-    elif keys[pygame.K_RIGHT] and not p2_is_attacking:
-        player2 = move_player("right", player2, PLAYERSPEED, arena)
-        wizard_current_action = 'run'
-    elif keys[pygame.K_UP] and not p2_is_jumping and not p2_is_attacking:
-        p2_is_jumping = True
-        wizard_current_action = 'jump'
-    elif keys[pygame.K_SPACE] and not p2_is_attacking and \
-            not p2_is_falling and not p2_is_jumping:
-        wizard_attack_sound.play()
-        p2_is_attacking = True
-        wizard_frame = 0
-        wizard_current_action = 'attack'
-        if abs(player1.x-player2.x) < ATTACK_DISTANCE and \
-                not p1_is_jumping and not p1_is_falling:
-            p1_got_hit = True
-            player1_health -= ATTACK_DAMAGE
-    elif p2_got_hit:
-        wizard_current_action = 'take_hit'
-    elif not keys[pygame.K_UP] and p2_is_falling and not p2_is_attacking:
-        wizard_current_action = 'fall'
-    elif not keys[pygame.K_UP] and not keys[pygame.K_SPACE] and \
-            not p2_is_jumping and not p2_is_attacking:
-        p2_is_jumping = False
-        wizard_current_action = 'idle'
-    elif p2_is_attacking and \
-            wizard_frame >= len(wizardActionFramesMap['attack'])-1:
-        p1_got_hit = False
-        p2_is_attacking = False
-        wizard_current_action = 'idle'
-    current_time = pygame.time.get_ticks()
-    if current_time - last_update >= animation_cooldown:
-        wizard_frame += 1
-        last_update = current_time
-    if wizard_frame >= len(wizardActionFramesMap[wizard_current_action]):
-        wizard_frame = 0
-    return wizard_current_action, p1_got_hit, player1_health, \
-        p2_is_jumping, p2_is_falling, player2, p2_is_attacking, wizard_frame
-
-
-def handleDirection(
-                    warrior_frame_to_draw, wizard_frame_to_draw,
-                    player1, player2
-                    ):
+        Pygame window,
+               game arena rectangle, static background layer,
+               background rectangle,
+               Player 1's action frames map, and Player 2's action frames
+               map.
+    """
+    pygame.init()
+    init_audio(audio_buffer, measure_audio_latency)
+    window = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+    arena = window.get_rect()
+    if fighters is None:
+        fighters = select_fighters(
+                                   window, arena,
+                                   character_registry.names()
+                                   )
+    choose_fighters(*fighters)
+    frame_cache = None if frame_budget is None else FrameCache(frame_budget)
+
+    action_maps = {}
+    for character in fighter_characters():
+        if character.name in action_maps:
+            continue
+        action_maps[character.name] = create_action_map(
+            actions, character.sheet_paths, character.frames_per_action,
+            character.frame_size, character.scale, character.draw_offset,
+            [], frame_cache=frame_cache)
+    player1ActionFramesMap, player2ActionFramesMap = [
+        action_maps[name] for name in chosen_fighters]
+    box_characters = [
+                      character_registry.get(name) for name in action_maps
+                      if name not in box_registry
+                      ]
+    (stage,), profiles = preload_actions(
+        list(action_maps.values()), startup_actions, ["stage.jpg"],
+        workers, [
+                  action_maps[character.name].sheet(action)
+                  for character in box_characters for action in actions
+                  ]
+        )
+    add_fighter_boxes(box_characters, profiles)
+    backGround = create_static_layer(stage)
+    backGroundRec = backGround.get_rect()
+    return window, arena, \
+        backGround, backGroundRec, player1ActionFramesMap, \
+        player2ActionFramesMap
+
+
+def add_fighter_boxes(characters, profiles):
     """
-    Flip the player character frames based on their facing direction.
+    Make the collision boxes of characters and keep them in the box
+    registry.
 
     Args:
-        warrior_frame_to_draw (pygame.Surface):
-         Frame of the warrior character to be drawn.
-        wizard_frame_to_draw (pygame.Surface):
-         Frame of the wizard character to be drawn.
-        player1 (pygame.Rect): Player 1 rectangle.
-        player2 (pygame.Rect): Player 2 rectangle.
+        characters (list): Characters to make the boxes of.
+        profiles (list): Frame profiles of every action of each character
+        in turn, in the order of actions.
+    """
+    for index, character in enumerate(characters):
+        box_registry[character.name] = hitboxes.make_boxes(
+            actions,
+            profiles[index * len(actions):(index + 1) * len(actions)],
+            character.frame_size, character.scale, character.draw_offset)
 
-    Returns:
-        tuple: Updated frames of the warrior and wizard
-        characters based on their facing direction.
+
+def fighter_boxes():
     """
-    warrior_direction = calculate_direction(player1, player2)
-    wizard_direction = calculate_direction(player2, player1)
-    if warrior_direction == -1:
-        warrior_frame_to_draw = pygame.transform.flip(
-                                                      warrior_frame_to_draw,
-                                                      True, False
-                                                      )
+    Get the collision boxes of both fighters, making them on first use.
 
-    if wizard_direction == -1:
-        wizard_frame_to_draw = pygame.transform.flip(
-                                                     wizard_frame_to_draw,
-                                                     True, False
-                                                     )
-    return warrior_frame_to_draw, wizard_frame_to_draw
+    The boxes are made by initialize_game; tools that skip it have the
+    frame profiles loaded here, decoding the sheets not in the frame
+    cache.
+
+    Returns:
+        dict, dict: Collision boxes of Player 1's and of Player 2's
+        frames, see the hitboxes module.
+    """
+    box_characters = [
+                      character_registry.get(name)
+                      for name in dict.fromkeys(chosen_fighters)
+                      if name not in box_registry
+                      ]
+    if box_characters:
+        _, _, profiles = asset_pipeline.load_assets(
+            [], profile_sheets=[
+                                sheet for character in box_characters
+                                for sheet in character.sheets()
+                                ])
+        add_fighter_boxes(box_characters, profiles)
+    return tuple(box_registry[name] for name in chosen_fighters)
 
 
-def initialize_game():
+def match_frame_counts(collision_boxes=True):
     """
-    Initialize the Pygame window, background music, and character action frames.
+    Build the animation length tables the engine needs for both fighters.
+
+    Args:
+        collision_boxes (bool): Whether the tables carry the collision
+        boxes of every frame, so attacks hit by their hitboxes, or not, so
+        they hit by distance.
 
     Returns:
-        Pygame window,
-               game arena rectangle, background image, background rectangle,
-               warrior action frames map, and wizard action frames map.
+        FrameTable, FrameTable: Frame count of each of Player 1's actions
+        and of each of Player 2's actions.
     """
-    pygame.init()
-    window = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
-    arena = window.get_rect()
-    backGround = pygame.image.load("stage.jpg")
-    backGroundRec = backGround.get_rect()
+    boxes = fighter_boxes() if collision_boxes else (None, None)
+    return tuple(
+                 frame_counts(
+                              actions, character.frames_per_action,
+                              character_boxes
+                              )
+                 for character, character_boxes in zip(
+                     fighter_characters(), boxes)
+                 )
+
+
+def play_event_sounds(events, input_time=None):
+    """
+    Play the sound effects for the events of the last simulation tick.
 
-    warriorActionFramesMap = create_action_map(
-                                               actions,
-                                               warrior_sheet_paths,
-                                               warrior_frames_per_action,
-                                               warrior_frame_size,
-                                               warrior_scale
-                                               )
-    wizardActionFramesMap = create_action_map(
-                                              actions,
-                                              wizard_sheet_paths,
-                                              wizard_frames_per_action,
-                                              wizard_frame_size,
-                                              wizard_scale
-                                              )
-    return window, arena, \
-        backGround, backGroundRec, warriorActionFramesMap, wizardActionFramesMap
+    Args:
+        events (int): EVENT_* flags of the last tick.
+        input_time (float): time.perf_counter() when the inputs of the
+        tick were read.
+    """
+    if events & EVENT_P1_ATTACK:
+        play_sound(
+                   'player1', attack_sounds.get('player1'),
+                   ATTACK_SOUND_PRIORITY, input_time
+                   )
+    if events & EVENT_P2_ATTACK:
+        play_sound(
+                   'player2', attack_sounds.get('player2'),
+                   ATTACK_SOUND_PRIORITY, input_time
+                   )
+
+
+def draw_fighters(
+                  window, renderer, state,
+                  player1ActionFramesMap, player2ActionFramesMap
+                  ):
+    """
+    Draw both fighters, or the loser's dead animation once the match is
+    decided.
+
+    Args:
+        window (pygame.Surface): Pygame window.
+        renderer (Renderer): Renderer that records the drawn areas.
+        state (engine.GameState): Match to draw.
+        player1ActionFramesMap (dict): Dictionary mapping
+        Player 1's actions to frames.
+        player2ActionFramesMap (dict): Dictionary mapping
+        Player 2's actions to frames.
+    """
+    player1 = state.player1
+    player2 = state.player2
+    if not state.dead_animation_triggered:
+        player1_frame_to_draw, \
+            player2_frame_to_draw = \
+            get_player_frames_to_draw(
+                                     player1ActionFramesMap,
+                                     player2ActionFramesMap,
+                                     player1.action, player2.action,
+                                     player1.frame, player2.frame,
+                                     player1, player2
+                                     )
+        renderer.mark(
+                      draw_frame(window, player1_frame_to_draw, player1),
+                      draw_frame(window, player2_frame_to_draw, player2)
+                      )
+        return
+    if state.loser == 'player1':
+        dead_frames = player1ActionFramesMap['dead'][1]
+        loser = player1
+    else:
+        dead_frames = player2ActionFramesMap['dead'][1]
+        loser = player2
+    if state.dead_animation_frame_counter < len(dead_frames):
+        renderer.mark(draw_frame(
+                                 window,
+                                 dead_frames[
+                                     state.dead_animation_frame_counter],
+                                 loser
+                                 ))
 
 
 def gameLoop(
              window, arena, backGround, backGroundRec,
-             warriorActionFramesMap, wizardActionFramesMap,
-             player1_health, player2_health, p1_is_jumping,
-             p2_is_jumping, player1, player2, p1_is_falling,
-             p2_is_falling, p1_is_attacking, p2_is_attacking,
-             warrior_current_action, wizard_current_action,
-             p1_jump_count, p2_jump_count, dead_animation_triggered,
-             current_round, player1_rounds_won, player2_rounds_won,
-             loser, last_update, dead_animation_frame_counter,
-             dead_animation_start_time
+             player1ActionFramesMap, player2ActionFramesMap,
+             dirty_rects=False, render_fps=RENDER_FPS,
+             recording=None, playback=None, session=None, profiler=None,
+             input_buffers=None, show_boxes=False, max_frames=None
              ):
     """
     Main game loop.
 
+    Reads the key events, advances the engine by as many fixed ticks as the
+    last frame took and draws the state with the fighter positions
+    interpolated between the last two ticks. Gameplay speed is set by
+    engine.TICK_MS alone, so a slow frame rate no longer slows the game
+    down. All game rules live in the engine module.
+
+    The title, round and match banners and the goodbye screen are timed
+    scenes rather than waits: the loop keeps handling events at BANNER_FPS
+    while they are shown and spends their frames on transition_jobs.
+
     Args:
         window (pygame.Surface): Pygame window.
         arena (pygame.Rect): Rectangle representing the game area.
-        backGround (pygame.Surface): Background image.
+        backGround (pygame.Surface): Static background layer.
         backGroundRec (pygame.Rect): Rectangle representing
         the background image position.
-        warriorActionFramesMap (dict): Dictionary mapping
-        warrior actions to frames.
-        wizardActionFramesMap (dict): Dictionary mapping wizard
-        actions to frames.
-        player1_health (int): Player 1's health.
-        player2_health (int): Player 2's health.
-        p1_is_jumping (bool): Whether Player 1 is jumping.
-        p2_is_jumping (bool): Whether Player 2 is jumping.
-        player1 (pygame.Rect): Rectangle representing Player 1's position.
-        player2 (pygame.Rect): Rectangle representing Player 2's position.
-        p1_is_falling (bool): Whether Player 1 is falling.
-        p2_is_falling (bool): Whether Player 2 is falling.
-        p1_is_attacking (bool): Whether Player 1 is attacking.
-        p2_is_attacking (bool): Whether Player 2 is attacking.
-        warrior_current_action (str): Current action for the warrior.
-        wizard_current_action (str): Current action for the wizard.
-        p1_jump_count (int): Counter for Player 1's jump progress.
-        p2_jump_count (int): Counter for Player 2's jump progress.
-        dead_animation_triggered (bool): Whether the dead animation
-        is triggered.
-        current_round (int): Current game round.
-        player1_rounds_won (int): Number of rounds won by Player 1.
-        player2_rounds_won (int): Number of rounds won by Player 2.
-        loser (str): Player who lost the game.
-        last_update (int): Timestamp of the last animation update.
-        dead_animation_frame_counter (int): Counter for dead animation frames.
-        dead_animation_start_time (int): Timestamp when the dead
-        animation was triggered.
+        player1ActionFramesMap (dict): Dictionary mapping
+        Player 1's actions to frames.
+        player2ActionFramesMap (dict): Dictionary mapping
+        Player 2's actions to frames.
+        dirty_rects (bool): Whether to present only the screen areas
+        that changed instead of flipping the whole screen every frame.
+        render_fps (int): Frame rate cap for drawing, 0 for no cap.
+        recording (replay.Replay): Replay to record the inputs of every
+        tick into, or None. A network match records the ticks whose
+        inputs are confirmed, see netcode.RollbackSession.
+        playback (replay.Replay): Replay whose inputs to play instead of
+        the keyboard's, or None.
+        session (netcode.RollbackSession): Network match to play, with the
+        local player on the keys of the session's side, or None.
+        profiler (profiler.FrameProfiler): Profiler to time every phase of
+        the loop with and to show as an overlay, or None.
+        input_buffers (list): InputBuffer of Player 1 and of Player 2,
+        new ones with the default input-buffer window if None.
+        show_boxes (bool): Whether to outline the fighters' collision
+        boxes.
+        max_frames (int): Number of frames after which to return, None to
+        play until the match is over.
     """
     fpsClock = pygame.time.Clock()
+    timestep = FixedTimestep()
+    renderer = Renderer(window, backGround, backGroundRec, dirty_rects)
+    state = GameState() if session is None else session.state
+    if session is not None:
+        session.recording = recording
+    previous_state = state.copy()
+    player1_frames, player2_frames = match_frame_counts()
+    round_events = EVENT_P1_WINS_ROUND | EVENT_P2_WINS_ROUND | \
+        EVENT_MATCH_OVER
+    if profiler is None:
+        profiler = NullProfiler()
+    if input_buffers is None:
+        input_buffers = [InputBuffer(player1_keys), InputBuffer(player2_keys)]
+    frames_played = 0
+    scenes = SceneManager(SCENE_TITLE)
     welcome_screen(window, arena)
+    pygame.display.flip()
+    jobs = transition_jobs(
+                           player1ActionFramesMap, player2ActionFramesMap,
+                           state
+                           )
+    fpsClock.tick()
     while True:
-        handle_events(window, arena)
-        warrior_current_action, p2_got_hit, player2_health, \
-            p1_is_jumping, p1_is_falling, player1, p1_is_attacking, \
-            warrior_frame = handle_player1_input(
-                                                 arena,
-                                                 warriorActionFramesMap,
-                                                 player2_health, p1_is_jumping,
-                                                 player1, p1_is_falling,
-                                                 p1_is_attacking, p2_is_jumping,
-                                                 p2_is_falling, player2,
-                                                 warrior_current_action
-                                                 )
-        p1_is_jumping, p1_is_falling, \
-            player1, p1_jump_count = jump(
-                                          p1_is_jumping, p1_is_falling,
-                                          player1, JUMP_HEIGHT,
-                                          JUMPSPEED, GRAVITY,
-                                          p1_jump_count
-                                          )
-        wizard_current_action, p1_got_hit, \
-            player1_health, p2_is_jumping, p2_is_falling, \
-            player2, p2_is_attacking, \
-            wizard_frame = handle_player2_input(
-                                                arena,
-                                                wizardActionFramesMap,
-                                                player1_health,
-                                                p2_is_jumping, player2,
-                                                p2_is_falling, p2_is_attacking,
-                                                p1_is_jumping, p1_is_falling,
-                                                player1, wizard_current_action
-                                                )
-        p2_is_jumping, p2_is_falling, \
-            player2, p2_jump_count = jump(
-                                          p2_is_jumping, p2_is_falling,
-                                          player2, JUMP_HEIGHT,
-                                          JUMPSPEED, GRAVITY,
-                                          p2_jump_count
-                                          )
-        window.blit(backGround, backGroundRec)
-        warrior_frame_to_draw, \
-            wizard_frame_to_draw = \
-            get_player_frames_to_draw(
-                                     warriorActionFramesMap,
-                                     wizardActionFramesMap,
-                                     warrior_current_action,
-                                     wizard_current_action,
-                                     warrior_frame, wizard_frame,
-                                     player1, player2
-                                     )
-        if not dead_animation_triggered:
-            window.blit(warrior_frame_to_draw, (player1.x-350, player1.y-300))
-            window.blit(wizard_frame_to_draw, (player2.x-320, player2.y-300))
-        display_scores(
-                       window, current_round,
-                       player1_rounds_won, player2_rounds_won
-                       )
-        draw_bars(window, player1_health, player2_health)
-
-        player1_health, player2_health, player1_rounds_won, \
-            player2_rounds_won, current_round, \
-            warrior_current_action, wizard_current_action, \
-            p1_got_hit, \
-            p2_got_hit = handle_round_end(
-                                          window, player1_health,
-                                          player2_health, current_round,
-                                          player1, player2,
-                                          warrior_current_action,
-                                          wizard_current_action,
-                                          p1_got_hit, p2_got_hit,
-                                          player1_rounds_won,
-                                          player2_rounds_won
-                                          )
-
-        if current_round == 3 and not dead_animation_triggered:
-            if player1_rounds_won > player2_rounds_won:
-                loser = 'player2'
-            elif player2_rounds_won > player1_rounds_won:
-                loser = 'player1'
-            dead_animation_start_time = pygame.time.get_ticks()
-            dead_animation_triggered = True
-        if dead_animation_triggered:
-            dead_animation_current_time = \
-                    pygame.time.get_ticks() - dead_animation_start_time
-            if dead_animation_current_time < dead_animation_duration:
-                if pygame.time.get_ticks() - last_update >= animation_cooldown:
-                    dead_animation_frame_counter += 1
-                    last_update = pygame.time.get_ticks()
-                if loser == 'player1':
-                    if dead_animation_frame_counter < \
-                            len(wizardActionFramesMap['dead']):
-                        window.blit(
-                            warriorActionFramesMap['dead'][
-                                dead_animation_frame_counter
-                                ],
-                            (player1.x - 350, player1.y - 300)
-                            )
-                elif loser == 'player2':
-                    if dead_animation_frame_counter < \
-                            len(wizardActionFramesMap['dead']):
-                        window.blit(
-                            wizardActionFramesMap['dead'][
-                                dead_animation_frame_counter
-                                ],
-                            (player2.x - 320, player2.y - 300)
-                            )
-            else:
-                dead_animation_triggered = False
-                if loser == 'player2':
-                    display_winning_screen("Player 1 Wins the Game!", window)
-                elif loser == 'player1':
-                    display_winning_screen("Player 2 Wins the Game!", window)
-                goodbye_screen(window, arena)
+        profiler.begin_frame()
+        fighting = scenes.scene == SCENE_FIGHT
+        elapsed = fpsClock.tick(render_fps if fighting else BANNER_FPS)
+        profiler.mark('wait')
+        input_time = time.perf_counter()
+        quit_requested = handle_events(input_buffers, state.tick + 1)
+        profiler.mark('events')
+        if not fighting:
+            if jobs:
+                jobs.popleft()()
+            next_scene = scenes.update(elapsed)
+            if scenes.finished:
                 sys.exit()
+            if next_scene == SCENE_FIGHT:
+                scenes.switch(SCENE_FIGHT)
+                renderer.invalidate()
+                timestep.reset()
+                for input_buffer in input_buffers:
+                    input_buffer.drop_pending()
+            elif next_scene == SCENE_GOODBYE:
+                quit_requested = True
         else:
-            if loser == 'player1':
-                window.blit(
-                            warriorActionFramesMap[
-                                                   warrior_current_action
-                                                   ][warrior_frame],
-                            (player1.x - 350, player1.y - 300)
-                            )
-            elif loser == 'player2':
-                window.blit(
-                            wizardActionFramesMap[
-                                                  wizard_current_action
-                                                  ][wizard_frame],
-                            (player2.x - 320, player2.y - 300))
-        pygame.display.flip()
-        fpsClock.tick(100)
+            events = 0
+            for _ in range(timestep.advance(elapsed)):
+                previous_state = state.copy()
+                tick = state.tick + 1
+                player1_input = input_buffers[0].inputs(tick)
+                player2_input = input_buffers[1].inputs(tick)
+                if playback is not None:
+                    if state.tick == len(playback):
+                        quit_requested = True
+                        break
+                    playback.advance(state)
+                elif session is not None:
+                    played = session.advance(
+                                             player1_input
+                                             if session.side == 1
+                                             else player2_input
+                                             )
+                    events |= session.events
+                    if not played:
+                        break
+                else:
+                    step(
+                         state, player1_input, player2_input,
+                         player1_frames, player2_frames
+                         )
+                    if recording is not None:
+                        recording.record(state, player1_input, player2_input)
+                input_buffers[0].consume(started_commands(
+                    previous_state.player1, state.player1), tick)
+                input_buffers[1].consume(started_commands(
+                    previous_state.player2, state.player2), tick)
+                if session is None:
+                    events |= state.events
+                if events & round_events:
+                    break
+            profiler.mark('simulate')
+            play_event_sounds(events, input_time)
+            profiler.mark('sound')
+            prefetch_likely_actions(
+                                    player1ActionFramesMap,
+                                    player2ActionFramesMap,
+                                    state.player1.action,
+                                    state.player2.action,
+                                    state.current_round
+                                    )
+            profiler.mark('prefetch')
+            renderer.begin_frame()
+            profiler.mark('background')
+            drawn_state = interpolate(
+                                      previous_state, state, timestep.alpha
+                                      )
+            draw_fighters(
+                          window, renderer, drawn_state,
+                          player1ActionFramesMap, player2ActionFramesMap
+                          )
+            if show_boxes and player1_frames.boxes is not None and \
+                    not drawn_state.dead_animation_triggered:
+                renderer.mark(*draw_collision_boxes(
+                                                    window, drawn_state,
+                                                    player1_frames.boxes,
+                                                    player2_frames.boxes
+                                                    ))
+            profiler.mark('fighters')
+            renderer.mark(*display_scores(
+                                          window, state.current_round,
+                                          state.player1.rounds_won,
+                                          state.player2.rounds_won
+                                          ))
+            profiler.mark('scores')
+            renderer.mark(*draw_bars(
+                                     window, state.player1.health,
+                                     state.player2.health
+                                     ))
+            profiler.mark('bars')
+            if profiler.enabled:
+                renderer.mark(*draw_profiler_overlay(window, profiler))
+                profiler.mark('overlay')
+            renderer.present()
+            profiler.mark('present')
+
+            if events & EVENT_MATCH_OVER:
+                display_winning_screen(match_banners[state.loser], window)
+                scenes.switch(SCENE_MATCH_OVER)
+            elif events & round_events:
+                display_winning_screen(
+                                       round_banners[events & round_events],
+                                       window
+                                       )
+                scenes.switch(SCENE_ROUND_OVER)
+                jobs = transition_jobs(
+                                       player1ActionFramesMap,
+                                       player2ActionFramesMap, state
+                                       )
+            if scenes.scene != SCENE_FIGHT and not quit_requested:
+                pygame.display.flip()
+        if quit_requested and scenes.scene != SCENE_GOODBYE:
+            scenes.switch(SCENE_GOODBYE)
+            goodbye_screen(window, arena)
+            pygame.display.flip()
+        profiler.mark('banners')
+        profiler.end_frame()
+        frames_played += 1
+        if frames_played == max_frames:
+            return
 
 
 def get_player_frames_to_draw(
-                              warriorActionFramesMap, wizardActionFramesMap,
-                              warrior_current_action, wizard_current_action,
-                              warrior_frame, wizard_frame,
+                              player1ActionFramesMap, player2ActionFramesMap,
+                              player1_current_action, player2_current_action,
+                              player1_frame, player2_frame,
                               player1, player2
                               ):
     """
-    Get the frames to draw for the warrior and wizard players based on their
-    current actions and positions.
+    Get the frames to draw for both players based on their current actions
+    and positions.
 
     Args:
-        warriorActionFramesMap (dict): Dictionary mapping
-        warrior actions to frames.
-        wizardActionFramesMap (dict): Dictionary mapping wizard
-        actions to frames.
-        warrior_current_action (str): Current action for the warrior.
-        wizard_current_action (str): Current action for the wizard.
-        warrior_frame (int): Frame index for the warrior's current action.
-        wizard_frame (int): Frame index for the wizard's current action.
-        player1 (pygame.Rect): Rectangle representing Player 1's position.
-        player2 (pygame.Rect): Rectangle representing Player 2's position.
+        player1ActionFramesMap (dict): Dictionary mapping
+        Player 1's actions to frames.
+        player2ActionFramesMap (dict): Dictionary mapping
+        Player 2's actions to frames.
+        player1_current_action (str): Current action of Player 1.
+        player2_current_action (str): Current action of Player 2.
+        player1_frame (int): Frame index of Player 1's current action.
+        player2_frame (int): Frame index of Player 2's current action.
+        player1 (engine.FighterState): State of Player 1.
+        player2 (engine.FighterState): State of Player 2.
 
     Returns:
-        pygame.Surface, pygame.Surface: Two pygame.Surface objects representing
-        the frames to draw for the warrior and wizard players after
-        handling their directions.
-    """
-    warrior_frame_to_draw = warriorActionFramesMap[
-                                                       warrior_current_action
-                                                       ][warrior_frame]
-    wizard_frame_to_draw = wizardActionFramesMap[
-                                                    wizard_current_action
-                                                    ][wizard_frame]
-    warrior_frame_to_draw, \
-        wizard_frame_to_draw = handleDirection(
-                                                warrior_frame_to_draw,
-                                                wizard_frame_to_draw,
-                                                player1, player2
-                                                )
-    return warrior_frame_to_draw, wizard_frame_to_draw
-
-
-def handle_round_end(
-                    window, player1_health, player2_health,
-                    current_round, player1, player2,
-                    warrior_current_action, wizard_current_action,
-                    p1_got_hit, p2_got_hit, player1_rounds_won,
-                    player2_rounds_won
-                    ):
+        tuple, tuple: Two (surface, anchor, area) frames to draw for
+        Player 1 and Player 2, already facing each other.
     """
-    Check if the current round has ended and handle the consequences.
-
-    Args:
-        window: Pygame window.
-        player1_health (int): Player 1's health.
-        player2_health (int): Player 2's health.
-        current_round (int): Current game round.
-        player1 (pygame.Rect): Rectangle representing Player 1's position.
-        player2 (pygame.Rect): Rectangle representing Player 2's position.
-        warrior_current_action (str): Current action for the warrior.
-        wizard_current_action (str): Current action for the wizard.
-        p1_got_hit (bool): Whether Player 1 got hit in the current round.
-        p2_got_hit (bool): Whether Player 2 got hit in the current round.
-        player1_rounds_won (int): Number of rounds won by Player 1.
-        player2_rounds_won (int): Number of rounds won by Player 2.
-
-    Returns:
-        int, int, int, int, int, str, str, bool, bool: Updated health,
-        rounds won, current round, player positions, and action states
-        after handling the round end.
-    """
-    if player1_health <= 0:
-        player2_rounds_won += 1
-        player1_health, player2_health, \
-            current_round, player1.x, \
-            player2.x, warrior_current_action, \
-            wizard_current_action, \
-            p1_got_hit, p2_got_hit = reset_game(
-                                                current_round,
-                                                player1.x, player2.x,
-                                                warrior_current_action,
-                                                wizard_current_action,
-                                                p1_got_hit, p2_got_hit
-                                                )
-        display_winning_screen("Player 2 Wins The Round!", window)
-        print(warrior_current_action)
-    elif player2_health <= 0:
-        player1_rounds_won += 1
-        player1_health, player2_health, \
-            current_round, player1.x, \
-            player2.x, warrior_current_action, \
-            wizard_current_action, \
-            p1_got_hit, p2_got_hit = reset_game(
-                                                current_round,
-                                                player1.x, player2.x,
-                                                warrior_current_action,
-                                                wizard_current_action,
-                                                p1_got_hit, p2_got_hit
-                                                )
-        display_winning_screen("Player 1 Wins The Round!", window)
-
-    return player1_health, player2_health, player1_rounds_won, \
-        player2_rounds_won, current_round, warrior_current_action, \
-        wizard_current_action, p1_got_hit, p2_got_hit
+    player1_direction = calculate_direction(player1, player2)
+    player2_direction = calculate_direction(player2, player1)
+    player1_frame_to_draw = player1ActionFramesMap[
+                                                   player1_current_action
+                                                   ][player1_direction][
+                                                   player1_frame]
+    player2_frame_to_draw = player2ActionFramesMap[
+                                                   player2_current_action
+                                                   ][player2_direction][
+                                                   player2_frame]
+    return player1_frame_to_draw, player2_frame_to_draw
@@ -0,0 +1,207 @@
+"""
+Street Fighter Game
+
+Collision boxes of every fighter frame, made from the sprites' alpha masks.
+
+Each frame gets a hurtbox, the area where the fighter can be hit, and the
+attack frames that reach out in front of the fighter's body also get a
+hitbox, the area the attack hits. The body is the area covered by the
+idle frames; an attack frame is active when its opaque pixels reach at
+least HITBOX_MIN_REACH pixels past the front of the body, and its hitbox
+covers those pixels. Boxes are (x, y, width, height) tuples relative to
+the top-left corner of the player rectangle, for both facing directions,
+so the engine only compares rectangles.
+
+The boxes are made from frame profiles, the first and last opaque row of
+every column of each unscaled frame. The decode workers build the profiles
+while they cut up a sheet and the frame cache stores them with the frames,
+so the boxes come without decoding any sheet a second time.
+"""
+import pygame
+
+HITBOX_MIN_REACH = 40
+MASK_THRESHOLD = 127
+OPAQUE_ALPHA = bytes(alpha > MASK_THRESHOLD for alpha in range(256))
+
+
+def frame_profile(frame):
+    """
+    Find the opaque rows of every column of an unscaled frame.
+
+    A pixel is opaque when its alpha is above MASK_THRESHOLD, like in the
+    masks of pygame.mask.from_surface.
+
+    Args:
+        frame (pygame.Surface): Unscaled, untrimmed frame.
+
+    Returns:
+        tuple: (top, bottom) row of the first and last opaque pixel of
+        each column, (-1, -1) for a column without any.
+    """
+    width = frame.get_width()
+    opaque = pygame.image.tobytes(frame, 'RGBA')[3::4].translate(
+        OPAQUE_ALPHA)
+    columns = []
+    for column in range(width):
+        pixels = opaque[column::width]
+        columns.append((pixels.find(1), pixels.rfind(1)))
+    return tuple(columns)
+
+
+def profile_box(profile, scale, draw_offset, left=None, right=None):
+    """
+    Find the bounding box of the opaque pixels of a drawn frame between two
+    columns.
+
+    Args:
+        profile (tuple): Profile of the frame, see frame_profile.
+        scale (int): Scaling factor the frame is drawn at.
+        draw_offset (tuple): Offset (x, y) of the full-size frame
+        relative to the top-left corner of the player rectangle.
+        left (int): First column to look at, relative to the player
+        rectangle, the left edge of the frame if None.
+        right (int): Column after the last one to look at, the right edge
+        of the frame if None.
+
+    Returns:
+        tuple: (x, y, width, height) box relative to the player rectangle,
+        or None when no pixel is opaque there.
+    """
+    box_left = box_right = box_top = box_bottom = None
+    for column, (top, bottom) in enumerate(profile):
+        if top < 0:
+            continue
+        column_left = draw_offset[0] + column * scale
+        column_right = column_left + scale
+        if left is not None:
+            column_left = max(column_left, left)
+        if right is not None:
+            column_right = min(column_right, right)
+        if column_left >= column_right:
+            continue
+        if box_left is None:
+            box_left, box_top, box_bottom = column_left, top, bottom
+        else:
+            box_top = min(box_top, top)
+            box_bottom = max(box_bottom, bottom)
+        box_right = column_right
+    if box_left is None:
+        return None
+    return (
+            box_left, draw_offset[1] + box_top * scale,
+            box_right - box_left, (box_bottom + 1 - box_top) * scale
+            )
+
+
+def body_front(idle_profiles, scale, draw_offset):
+    """
+    Find the front edge of a fighter's body facing right.
+
+    Args:
+        idle_profiles (list): Profiles of the idle frames.
+        scale (int): Scaling factor the frames are drawn at.
+        draw_offset (tuple): Offset (x, y) of the full-size frame
+        relative to the top-left corner of the player rectangle.
+
+    Returns:
+        int: Rightmost opaque column of the idle frames, relative to the
+        player rectangle.
+    """
+    front = None
+    for profile in idle_profiles:
+        box = profile_box(profile, scale, draw_offset)
+        if box is not None:
+            right = box[0] + box[2]
+            front = right if front is None else max(front, right)
+    return front
+
+
+def frame_boxes(profile, scale, draw_offset, front, attack):
+    """
+    Make the boxes of one frame facing right.
+
+    Args:
+        profile (tuple): Profile of the frame, see frame_profile.
+        scale (int): Scaling factor the frame is drawn at.
+        draw_offset (tuple): Offset (x, y) of the full-size frame
+        relative to the top-left corner of the player rectangle.
+        front (int): Front edge of the body, see body_front.
+        attack (bool): Whether the frame belongs to the attack.
+
+    Returns:
+        tuple: Hurtbox and hitbox, each an (x, y, width, height) tuple or
+        None.
+    """
+    hitbox = None
+    if attack:
+        reach = profile_box(profile, scale, draw_offset, front)
+        if reach is not None and \
+                reach[0] + reach[2] - front >= HITBOX_MIN_REACH:
+            hitbox = reach
+    if hitbox is None:
+        hurtbox = profile_box(profile, scale, draw_offset)
+    else:
+        hurtbox = profile_box(profile, scale, draw_offset, None, front)
+    return hurtbox, hitbox
+
+
+def mirror_box(box, frame_width, draw_offset):
+    """
+    Mirror a box to the fighter facing left, like the frames facing left
+    are mirrored.
+
+    Args:
+        box (tuple): (x, y, width, height) box facing right, or None.
+        frame_width (int): Width of the full-size scaled frame.
+        draw_offset (tuple): Offset (x, y) of the full-size frame
+        relative to the top-left corner of the player rectangle.
+
+    Returns:
+        tuple: The box facing left, or None.
+    """
+    if box is None:
+        return None
+    x, y, width, height = box
+    return (2 * draw_offset[0] + frame_width - x - width, y, width, height)
+
+
+def make_boxes(actions, profiles, frame_size, scale, draw_offset):
+    """
+    Make the boxes of every frame of a fighter from its frame profiles.
+
+    Args:
+        actions (list): Names of the actions, 'idle' and 'attack' among
+        them.
+        profiles (list): Profiles of the frames of each action, see
+        frame_profile.
+        frame_size (tuple): Size (width, height) of a frame in the sheets.
+        scale (int): Scaling factor the frames are drawn at.
+        draw_offset (tuple): Offset (x, y) of the full-size frame
+        relative to the top-left corner of the player rectangle.
+
+    Returns:
+        dict: Dictionary mapping action to direction to list of (hurtbox,
+        hitbox) pairs, one per frame.
+    """
+    profiles = dict(zip(actions, profiles))
+    front = body_front(profiles['idle'], scale, draw_offset)
+    boxes = {}
+    for action in actions:
+        right = [
+                 frame_boxes(
+                             profile, scale, draw_offset, front,
+                             action == 'attack'
+                             )
+                 for profile in profiles[action]
+                 ]
+        boxes[action] = {
+            1: right,
+            -1: [
+                 tuple(
+                       mirror_box(box, frame_size[0] * scale, draw_offset)
+                       for box in pair
+                       )
+                 for pair in right
+                 ]
+            }
+    return boxes
@@ -0,0 +1,165 @@
+"""
+Street Fighter Game
+
+Event-driven player input with buffered commands.
+
+Key presses and releases are read from the event queue into a fixed-size
+ring buffer per player, each with the time it was read and the tick it
+first applies to. The keys a player holds come from those events instead
+of polling the keyboard once per frame, so a tap shorter than a frame is
+not lost. A jump or attack pressed while the fighter cannot act on it yet,
+like an attack pressed at the end of a jump, stays in the inputs of the
+following ticks for the input-buffer window, until the fighter starts it.
+
+Every command started records its latency, the time from reading the key
+press to the tick that acted on it.
+"""
+import time
+
+import pygame
+
+from engine import INPUT_JUMP, INPUT_ATTACK
+from profiler import latency_summary
+
+INPUT_BUFFER_SIZE = 64
+INPUT_BUFFER_TICKS = 10
+COMMAND_INPUTS = (INPUT_JUMP, INPUT_ATTACK)
+
+
+class InputBuffer:
+    """
+    Ring buffer of one player's key events.
+
+    Attributes:
+        held (int): INPUT_* flags of the keys held down.
+        window (int): Ticks a command press stays buffered.
+        latencies (list): Input-to-action latencies in ms.
+    """
+
+    def __init__(
+                 self, key_bindings, size=INPUT_BUFFER_SIZE,
+                 window=INPUT_BUFFER_TICKS
+                 ):
+        """
+        Args:
+            key_bindings (dict): Dictionary mapping INPUT_* flags to keys.
+            size (int): Number of key events kept.
+            window (int): Ticks a command press stays buffered, 0 to only
+            apply it to the tick it was pressed for.
+        """
+        self.flags = {key: flag for flag, key in key_bindings.items()}
+        self.entries = [None] * size
+        self.written = 0
+        self.consumed = {flag: 0 for flag in COMMAND_INPUTS}
+        self.held = 0
+        self.window = window
+        self.latencies = []
+
+    def handle_event(self, event, tick, timestamp=None):
+        """
+        Record a key press or release of one of the player's keys.
+
+        Args:
+            event (pygame.event.Event): KEYDOWN or KEYUP event.
+            tick (int): First tick the event applies to.
+            timestamp (float): time.perf_counter() when the event was
+            read, now if None.
+        """
+        flag = self.flags.get(event.key)
+        if flag is None:
+            return
+        pressed = event.type == pygame.KEYDOWN
+        if timestamp is None:
+            timestamp = time.perf_counter()
+        self.entries[self.written % len(self.entries)] = (
+            timestamp, tick, flag, pressed)
+        self.written += 1
+        if pressed:
+            self.held |= flag
+        else:
+            self.held &= ~flag
+
+    def release_all(self):
+        """
+        Let go of every key, for when the window loses the keyboard and
+        will not report the releases.
+        """
+        self.held = 0
+
+    def drop_pending(self):
+        """
+        Forget the buffered command presses, for when a round starts, so
+        presses made during the banner before it do not act on its first
+        tick.
+        """
+        for flag in COMMAND_INPUTS:
+            self.consumed[flag] = self.written
+
+    def pending_presses(self, tick):
+        """
+        Find the command presses still buffered at a tick.
+
+        Args:
+            tick (int): Tick to be simulated.
+
+        Returns:
+            dict: Newest unconsumed (timestamp, tick, flag, pressed) press
+            of each buffered command flag.
+        """
+        presses = {}
+        first = max(0, self.written - len(self.entries))
+        for index in range(self.written - 1, first - 1, -1):
+            entry = self.entries[index % len(self.entries)]
+            if entry[1] > tick:
+                continue
+            if tick - entry[1] > self.window:
+                break
+            flag = entry[2]
+            if entry[3] and flag in self.consumed and \
+                    index >= self.consumed[flag] and flag not in presses:
+                presses[flag] = entry
+        return presses
+
+    def inputs(self, tick):
+        """
+        Args:
+            tick (int): Tick to be simulated.
+
+        Returns:
+            int: INPUT_* flags of the held keys and the buffered commands.
+        """
+        flags = self.held
+        for flag in self.pending_presses(tick):
+            flags |= flag
+        return flags
+
+    def consume(self, flags, tick, now=None):
+        """
+        Mark commands as acted on, so their presses stop being buffered.
+
+        Args:
+            flags (int): INPUT_* flags of the commands the fighter started.
+            tick (int): Tick that started them.
+            now (float): time.perf_counter() when they started, now if
+            None.
+        """
+        if not flags:
+            return
+        if now is None:
+            now = time.perf_counter()
+        presses = self.pending_presses(tick)
+        for flag in COMMAND_INPUTS:
+            if not flags & flag:
+                continue
+            press = presses.get(flag)
+            if press is not None:
+                self.latencies.append((now - press[0]) * 1000)
+            self.consumed[flag] = self.written
+
+    def latency_report(self):
+        """
+        Returns:
+            str: Number of commands and their p50, p99 and largest
+            input-to-action latency.
+        """
+        return latency_summary(self.latencies, 'commands')
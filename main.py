@@ -19,11 +19,48 @@ Controls:
         - Jump: Up Arrow Key
         - Attack: Spacebar
 
+Options:
+    --fighters NAME NAME: Skip the character select screen and play the
+    characters NAME as Player 1 and Player 2, named after their manifest
+    files in the characters directory. A replay only plays back with the
+    characters it was recorded with.
+    --dirty-rects: Present only the screen areas that changed each frame.
+    --fps N: Cap drawing at N frames per second, 0 for no cap. Gameplay
+    speed does not depend on it.
+    --record PATH: Record the inputs of the match to a replay file.
+    --replay PATH: Play a recorded match instead of reading the keyboard.
+    --netplay SIDE PORT HOST:PORT: Play against another machine with
+    rollback, as Player SIDE (1 or 2) on that player's keys, receiving on
+    UDP port PORT and sending to HOST:PORT. Needs --fighters, with the
+    same characters on both machines, as the select screens of the two
+    sides are not synchronized. The fight starts once the other machine
+    answers, and is refused if it plays with different characters or game
+    constants.
+    --frame-budget MB: Keep sprites unscaled and scale them on demand into
+    a cache of at most MB megabytes, for machines short on memory.
+    --audio-buffer N: Mix sound in buffers of N samples, a power of two.
+    Smaller buffers make sound effects start sooner but may crackle on
+    slow machines.
+    --audio-latency: Measure the delay from reading an attack input to its
+    sound effect starting and print a summary on exit.
+    --input-window TICKS: Keep a jump or attack pressed while the fighter
+    cannot start it for TICKS ticks of 10 ms, until it can.
+    --input-latency: Measure the delay from reading a jump or attack key
+    press to the tick that started it and print a summary on exit.
+    --hitboxes: Outline the fighters' hurtboxes in green and the hitboxes
+    of their attacks in red.
+    --profile PATH: Time every phase of the game loop, show frame time
+    percentiles on screen and write the last frames to a CSV file on exit.
+
 """
 
 import pygame
 import sys
 from functions import *
+from input_buffer import INPUT_BUFFER_TICKS, InputBuffer
+from netcode import RollbackSession, UdpTransport
+from profiler import FrameProfiler
+from replay import Replay, load_replay, save_replay
 
 
 def main():
@@ -35,20 +72,88 @@ def main():
     and enters the game loop to handle player input,
     character animations, and game state
     """
+    frame_budget = None
+    if "--frame-budget" in sys.argv:
+        frame_budget = int(float(
+            sys.argv[sys.argv.index("--frame-budget") + 1]) * 1024 * 1024)
+    audio_buffer = MIXER_BUFFER
+    if "--audio-buffer" in sys.argv:
+        audio_buffer = int(sys.argv[sys.argv.index("--audio-buffer") + 1])
+    fighters = None
+    if "--fighters" in sys.argv:
+        option = sys.argv.index("--fighters")
+        fighters = sys.argv[option + 1:option + 3]
+    elif "--netplay" in sys.argv:
+        sys.exit("--netplay needs --fighters NAME NAME, the same on both "
+                 "machines")
     window, \
-        arena, backGround, backGroundRec, warriorActionFramesMap, \
-        wizardActionFramesMap = initialize_game()
-    gameLoop(
-            window, arena, backGround, backGroundRec,
-            warriorActionFramesMap, wizardActionFramesMap,
-            player1_health, player2_health, p1_is_jumping,
-            p2_is_jumping, player1, player2, p1_is_falling,
-            p2_is_falling, p1_is_attacking, p2_is_attacking,
-            warrior_current_action, wizard_current_action,
-            p1_jump_count, p2_jump_count, dead_animation_triggered,
-            current_round, player1_rounds_won, player2_rounds_won,
-            loser, last_update, dead_animation_frame_counter,
-            dead_animation_start_time)
+        arena, backGround, backGroundRec, player1ActionFramesMap, \
+        player2ActionFramesMap = initialize_game(
+            frame_budget=frame_budget, audio_buffer=audio_buffer,
+            measure_audio_latency="--audio-latency" in sys.argv,
+            fighters=fighters)
+    render_fps = RENDER_FPS
+    if "--fps" in sys.argv:
+        render_fps = int(sys.argv[sys.argv.index("--fps") + 1])
+    recording = None
+    playback = None
+    if "--record" in sys.argv:
+        recording = Replay(*match_frame_counts())
+    if "--replay" in sys.argv:
+        playback = load_replay(
+                               sys.argv[sys.argv.index("--replay") + 1],
+                               *match_frame_counts()
+                               )
+    session = None
+    if "--netplay" in sys.argv:
+        option = sys.argv.index("--netplay")
+        host, port = sys.argv[option + 3].rsplit(":", 1)
+        session = RollbackSession(
+                                  int(sys.argv[option + 1]),
+                                  UdpTransport(
+                                               int(sys.argv[option + 2]),
+                                               (host, int(port))
+                                               ),
+                                  *match_frame_counts()
+                                  )
+    input_window = INPUT_BUFFER_TICKS
+    if "--input-window" in sys.argv:
+        input_window = int(sys.argv[sys.argv.index("--input-window") + 1])
+    input_buffers = [
+                     InputBuffer(player1_keys, window=input_window),
+                     InputBuffer(player2_keys, window=input_window)
+                     ]
+    profiler = None
+    if "--profile" in sys.argv:
+        profiler = FrameProfiler(PROFILE_PHASES, idle_phase='wait')
+    try:
+        gameLoop(
+                window, arena, backGround, backGroundRec,
+                player1ActionFramesMap, player2ActionFramesMap,
+                dirty_rects="--dirty-rects" in sys.argv,
+                render_fps=render_fps, recording=recording,
+                playback=playback, session=session, profiler=profiler,
+                input_buffers=input_buffers,
+                show_boxes="--hitboxes" in sys.argv)
+    finally:
+        if "--input-latency" in sys.argv:
+            for player, input_buffer in enumerate(input_buffers, 1):
+                print("Player {} input latency: {}".format(
+                    player, input_buffer.latency_report()))
+        if "--audio-latency" in sys.argv:
+            print(sound_latency_report())
+        if frame_budget is not None:
+            print("frame cache: {hits} hits, {misses} misses, "
+                  "{evictions} evictions, {entries} frames in {size} "
+                  "bytes".format(
+                      **player1ActionFramesMap.frame_cache.stats()))
+        if profiler is not None:
+            profiler.write_csv(sys.argv[sys.argv.index("--profile") + 1])
+        if recording is not None:
+            save_replay(
+                        sys.argv[sys.argv.index("--record") + 1],
+                        recording
+                        )
 
 
 if __name__ == "__main__":
@@ -0,0 +1,513 @@
+"""
+Street Fighter Game
+
+Peer-to-peer versus play with rollback.
+
+Each peer applies its own input at once and predicts that the remote
+player keeps holding the keys last received from them. Every tick's state
+is snapshotted; when the real remote input for an already simulated tick
+turns out different from the prediction, the session restores the
+snapshot before that tick and simulates forward again with the corrected
+input. A peer only runs ahead of the last confirmed remote tick by
+max_rollback ticks, and waits for its opponent beyond that.
+
+Events that only change how a tick looks or sounds, like an attack, are
+reported as soon as a tick raises them, including ticks simulated again
+after a rollback, but never twice for the same tick. Round and match
+events are only reported once both inputs of their tick are known, so
+both peers announce exactly the rounds the match really had.
+
+Before the first tick each peer sends hello packets with a digest of the
+constants the match depends on, its fighters' frame counts and collision
+boxes among them, until it hears from its opponent; peers that disagree
+refuse to play instead of drifting apart. Every input packet carries all
+local inputs the opponent has not acknowledged yet, so lost packets are
+covered by the next one. Transports only need
+send and receive: UdpTransport for play over a network and a pair of
+LoopbackTransport endpoints, with injected latency, jitter and packet loss,
+for testing both peers in one process.
+"""
+import heapq
+import random
+import socket
+import struct
+import time
+
+from engine import (
+                    EVENT_P1_WINS_ROUND, EVENT_P2_WINS_ROUND,
+                    EVENT_MATCH_DECIDED, EVENT_MATCH_OVER, GameState, step
+                    )
+from replay import constants_digest
+
+MAX_ROLLBACK_TICKS = 8
+CONFIRMED_EVENTS = EVENT_P1_WINS_ROUND | EVENT_P2_WINS_ROUND | \
+    EVENT_MATCH_DECIDED | EVENT_MATCH_OVER
+INPUT_PACKET = 0
+HELLO_PACKET = 1
+PACKET_FORMAT = '<BIIH'
+HELLO_FORMAT = '<B20s'
+
+
+def encode_hello(digest):
+    """
+    Build a hello packet.
+
+    Args:
+        digest (bytes): Digest of the match constants, see
+        replay.constants_digest.
+
+    Returns:
+        bytes: The packet.
+    """
+    return struct.pack(HELLO_FORMAT, HELLO_PACKET, digest)
+
+
+def decode_hello(packet):
+    """
+    Read a hello packet.
+
+    Args:
+        packet (bytes): Packet built by encode_hello.
+
+    Returns:
+        bytes: Digest of the opponent's match constants, or None if the
+        packet is not a hello packet.
+    """
+    if len(packet) != struct.calcsize(HELLO_FORMAT) or \
+            packet[0] != HELLO_PACKET:
+        return None
+    return struct.unpack(HELLO_FORMAT, packet)[1]
+
+
+def encode_packet(ack, first_tick, inputs):
+    """
+    Build an input packet.
+
+    Args:
+        ack (int): Last tick up to which all remote inputs were received.
+        first_tick (int): Tick of the first input in the packet.
+        inputs (bytes): INPUT_* flags of consecutive ticks.
+
+    Returns:
+        bytes: The packet.
+    """
+    return struct.pack(
+                       PACKET_FORMAT, INPUT_PACKET, ack, first_tick,
+                       len(inputs)
+                       ) + bytes(inputs)
+
+
+def decode_packet(packet):
+    """
+    Read an input packet.
+
+    Args:
+        packet (bytes): Packet built by encode_packet.
+
+    Returns:
+        tuple: Acknowledged tick, tick of the first input and the inputs,
+        or None if the packet is malformed or not an input packet.
+    """
+    header_size = struct.calcsize(PACKET_FORMAT)
+    try:
+        kind, ack, first_tick, count = struct.unpack_from(
+            PACKET_FORMAT, packet)
+    except struct.error:
+        return None
+    if kind != INPUT_PACKET:
+        return None
+    inputs = packet[header_size:header_size + count]
+    if len(inputs) != count:
+        return None
+    return ack, first_tick, inputs
+
+
+class RollbackSession:
+    """
+    One peer of a rollback match.
+
+    Attributes:
+        side (int): 1 if the local player is Player 1, 2 for Player 2.
+        state (GameState): Current, possibly predicted, state of the match.
+        events (int): EVENT_* flags to report for the last advance call.
+        recording (replay.Replay): Replay to record the inputs of every
+        tick into once they are confirmed, or None.
+        connected (bool): Whether the opponent was heard from and plays
+        with the same match constants.
+        rollbacks (int): Number of mispredictions corrected.
+        resimulated_ticks (int): Ticks simulated again after rollbacks.
+        stalls (int): Ticks spent waiting for the opponent.
+    """
+
+    def __init__(
+                 self, side, transport, player1_frames, player2_frames,
+                 max_rollback=MAX_ROLLBACK_TICKS
+                 ):
+        """
+        Args:
+            side (int): 1 if the local player is Player 1, 2 for Player 2.
+            transport: Object with send(packet) and receive() methods.
+            player1_frames (dict): Frame count of each action of Player 1's
+            character.
+            player2_frames (dict): Frame count of each action of Player 2's
+            character.
+            max_rollback (int): Most ticks to run ahead of the last
+            confirmed remote input.
+        """
+        self.side = side
+        self.transport = transport
+        self.player1_frames = player1_frames
+        self.player2_frames = player2_frames
+        self.max_rollback = max_rollback
+        self.digest = constants_digest(player1_frames, player2_frames)
+        self.connected = False
+        self.state = GameState()
+        self.snapshots = {0: self.state.copy()}
+        self.local_inputs = {}
+        self.remote_inputs = {0: 0}
+        self.predictions = {}
+        self.reported_events = {}
+        self.reported_tick = 0
+        self.events = 0
+        self.recording = None
+        self.confirmed_tick = 0
+        self.acknowledged_tick = 0
+        self.rollbacks = 0
+        self.resimulated_ticks = 0
+        self.stalls = 0
+
+    def remote_input(self, tick):
+        """
+        Get the remote input of a tick, predicting it if not received.
+
+        Args:
+            tick (int): Tick to be simulated.
+
+        Returns:
+            int: INPUT_* flags of the remote player.
+        """
+        if tick in self.remote_inputs:
+            self.predictions.pop(tick, None)
+            return self.remote_inputs[tick]
+        prediction = self.remote_inputs[self.confirmed_tick]
+        self.predictions[tick] = prediction
+        return prediction
+
+    def simulate_tick(self):
+        """
+        Simulate the next tick, snapshot the result and report the events
+        of the tick not reported for it yet, except the round and match
+        events.
+        """
+        tick = self.state.tick + 1
+        local_input = self.local_inputs[tick]
+        remote_input = self.remote_input(tick)
+        if self.side == 1:
+            player1_input, player2_input = local_input, remote_input
+        else:
+            player1_input, player2_input = remote_input, local_input
+        step(
+             self.state, player1_input, player2_input,
+             self.player1_frames, self.player2_frames
+             )
+        self.snapshots[tick] = self.state.copy()
+        reported = self.reported_events.get(tick, 0)
+        new_events = self.state.events & ~CONFIRMED_EVENTS & ~reported
+        self.events |= new_events
+        self.reported_events[tick] = reported | new_events
+
+    def report_confirmed_events(self):
+        """
+        Report the round and match events of the ticks confirmed since the
+        last call, and record their inputs.
+        """
+        settled_tick = min(self.confirmed_tick, self.state.tick)
+        for tick in range(self.reported_tick + 1, settled_tick + 1):
+            self.events |= self.snapshots[tick].events & CONFIRMED_EVENTS
+            if self.recording is not None:
+                local_input = self.local_inputs[tick]
+                remote_input = self.remote_inputs[tick]
+                if self.side == 1:
+                    self.recording.record(
+                                          self.snapshots[tick],
+                                          local_input, remote_input
+                                          )
+                else:
+                    self.recording.record(
+                                          self.snapshots[tick],
+                                          remote_input, local_input
+                                          )
+        self.reported_tick = max(self.reported_tick, settled_tick)
+
+    def rollback(self, tick):
+        """
+        Go back to just before a mispredicted tick and simulate up to the
+        current tick again.
+
+        Args:
+            tick (int): First mispredicted tick.
+        """
+        current_tick = self.state.tick
+        self.state.restore(self.snapshots[tick - 1])
+        while self.state.tick < current_tick:
+            self.simulate_tick()
+        self.rollbacks += 1
+        self.resimulated_ticks += current_tick - tick + 1
+
+    def poll(self):
+        """
+        Take in the packets that arrived and correct any misprediction.
+
+        An input packet also tells that the opponent checked the match
+        constants, so it connects the session like a hello packet does.
+
+        Raises:
+            ValueError: If the opponent plays with different match
+            constants.
+        """
+        for packet in self.transport.receive():
+            digest = decode_hello(packet)
+            if digest is not None:
+                if digest != self.digest:
+                    self.transport.send(encode_hello(self.digest))
+                    raise ValueError(
+                        "the opponent plays with different fighters or "
+                        "game constants")
+                self.connected = True
+                continue
+            decoded = decode_packet(packet)
+            if decoded is None:
+                continue
+            self.connected = True
+            ack, first_tick, inputs = decoded
+            self.acknowledged_tick = max(self.acknowledged_tick, ack)
+            for offset, remote_input in enumerate(inputs):
+                tick = first_tick + offset
+                if tick > self.confirmed_tick:
+                    self.remote_inputs[tick] = remote_input
+        while self.confirmed_tick + 1 in self.remote_inputs:
+            self.confirmed_tick += 1
+
+        mispredicted = None
+        for tick in sorted(self.predictions):
+            if tick > self.confirmed_tick:
+                break
+            if self.predictions.pop(tick) != self.remote_inputs[tick] and \
+                    mispredicted is None:
+                mispredicted = tick
+        if mispredicted is not None:
+            self.rollback(mispredicted)
+
+    def send(self):
+        """
+        Send every local input the opponent has not acknowledged.
+        """
+        first_tick = self.acknowledged_tick + 1
+        inputs = bytes(
+                       self.local_inputs[tick]
+                       for tick in range(first_tick, self.state.tick + 1)
+                       )
+        self.transport.send(encode_packet(
+                                          self.confirmed_tick, first_tick,
+                                          inputs
+                                          ))
+
+    def prune(self):
+        """
+        Forget snapshots and inputs that can no longer be needed.
+        """
+        settled_tick = min(self.confirmed_tick, self.state.tick)
+        for tick in [tick for tick in self.snapshots if tick < settled_tick]:
+            del self.snapshots[tick]
+        for tick in [tick for tick in self.remote_inputs
+                     if tick < settled_tick]:
+            del self.remote_inputs[tick]
+        for tick in [tick for tick in self.reported_events
+                     if tick < settled_tick]:
+            del self.reported_events[tick]
+        for tick in [tick for tick in self.local_inputs
+                     if tick <= min(self.acknowledged_tick, settled_tick)]:
+            del self.local_inputs[tick]
+
+    def advance(self, local_input):
+        """
+        Play one tick with the local player's input.
+
+        The events to report are left in events rather than
+        state.events, which only holds those of the newest tick, possibly
+        predicted wrongly.
+
+        Args:
+            local_input (int): INPUT_* flags the local player holds.
+
+        Returns:
+            bool: Whether the tick was played; False while waiting for the
+            opponent to connect or to catch up.
+
+        Raises:
+            ValueError: If the opponent plays with different match
+            constants.
+        """
+        self.events = 0
+        self.poll()
+        if not self.connected:
+            self.transport.send(encode_hello(self.digest))
+            return False
+        if self.state.tick - self.confirmed_tick >= self.max_rollback:
+            self.stalls += 1
+            self.report_confirmed_events()
+            self.send()
+            return False
+        self.local_inputs[self.state.tick + 1] = local_input
+        self.simulate_tick()
+        self.report_confirmed_events()
+        self.send()
+        self.prune()
+        return True
+
+    def confirmed_state(self):
+        """
+        Returns:
+            GameState: Snapshot of the last tick both inputs are known for.
+        """
+        return self.snapshots[min(self.confirmed_tick, self.state.tick)]
+
+
+class LoopbackTransport:
+    """
+    In-process endpoint of a simulated network link.
+
+    Packets are delivered to the peer endpoint after the configured latency
+    plus a random jitter, possibly out of order, or dropped.
+
+    Attributes:
+        peer (LoopbackTransport): Endpoint receiving the packets sent here.
+        sent (int): Number of packets sent.
+        lost (int): Number of packets dropped.
+    """
+
+    def __init__(
+                 self, latency_ms=0, jitter_ms=0, loss=0.0, seed=None,
+                 clock=None
+                 ):
+        """
+        Args:
+            latency_ms (float): Average one-way delay in ms.
+            jitter_ms (float): Largest random deviation from the latency.
+            loss (float): Chance that a packet is dropped.
+            seed (int): Seed of the random delays and losses.
+            clock (callable): Returns the current time in ms, the
+            process's monotonic clock if None.
+        """
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.loss = loss
+        self.random = random.Random(seed)
+        self.clock = clock or (lambda: time.perf_counter() * 1000)
+        self.peer = None
+        self.queue = []
+        self.sent = 0
+        self.lost = 0
+
+    def send(self, packet):
+        """
+        Send a packet to the peer endpoint.
+
+        Args:
+            packet (bytes): Packet to send.
+        """
+        self.sent += 1
+        if self.random.random() < self.loss:
+            self.lost += 1
+            return
+        delay = max(0, self.latency_ms + self.random.uniform(
+            -self.jitter_ms, self.jitter_ms))
+        heapq.heappush(
+                       self.peer.queue,
+                       (self.clock() + delay, self.sent, packet)
+                       )
+
+    def receive(self):
+        """
+        Returns:
+            list: Packets that have arrived since the last call.
+        """
+        now = self.clock()
+        packets = []
+        while self.queue and self.queue[0][0] <= now:
+            packets.append(heapq.heappop(self.queue)[2])
+        return packets
+
+
+def loopback_pair(latency_ms=0, jitter_ms=0, loss=0.0, seed=None, clock=None):
+    """
+    Create two connected loopback endpoints.
+
+    Args:
+        latency_ms (float): Average one-way delay in ms.
+        jitter_ms (float): Largest random deviation from the latency.
+        loss (float): Chance that a packet is dropped.
+        seed (int): Seed of the random delays and losses.
+        clock (callable): Returns the current time in ms.
+
+    Returns:
+        tuple: The two LoopbackTransport endpoints.
+    """
+    first = LoopbackTransport(latency_ms, jitter_ms, loss, seed, clock)
+    second = LoopbackTransport(
+                               latency_ms, jitter_ms, loss,
+                               None if seed is None else seed + 1, clock
+                               )
+    first.peer = second
+    second.peer = first
+    return first, second
+
+
+class UdpTransport:
+    """
+    Non-blocking UDP link to the opponent's machine.
+    """
+
+    def __init__(self, local_port, remote_address):
+        """
+        Args:
+            local_port (int): UDP port to receive on.
+            remote_address (tuple): Host and port of the opponent.
+        """
+        self.remote_address = remote_address
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.socket.bind(('', local_port))
+        self.socket.setblocking(False)
+
+    def send(self, packet):
+        """
+        Send a packet to the opponent; failures count as packet loss.
+
+        Args:
+            packet (bytes): Packet to send.
+        """
+        try:
+            self.socket.sendto(packet, self.remote_address)
+        except OSError:
+            pass
+
+    def receive(self):
+        """
+        Returns:
+            list: Packets from the opponent that have arrived.
+        """
+        packets = []
+        while True:
+            try:
+                packet, _ = self.socket.recvfrom(65536)
+            except BlockingIOError:
+                return packets
+            except ConnectionError:
+                continue
+            packets.append(packet)
+
+    def close(self):
+        """
+        Close the socket.
+        """
+        self.socket.close()
@@ -0,0 +1,228 @@
+"""
+Street Fighter Game
+
+Per-phase frame profiler for the game loop.
+
+The game loop calls begin_frame at the top of every frame and mark after
+each phase; the time since the previous mark is charged to that phase.
+The last frames are kept in a ring buffer, from which percentiles are
+computed for the on-screen overlay and which is written out as CSV.
+When profiling is off the loop talks to a NullProfiler instead, whose
+methods do nothing.
+
+The latency measurements of sound effects and of buffered commands are
+summarised the same way, with latency_summary.
+"""
+import csv
+import time
+
+PROFILE_FRAMES = 600
+SUMMARY_INTERVAL = 60
+
+
+def percentile(times, percent):
+    """
+    Pick a percentile out of sorted times.
+
+    Args:
+        times (list): Times in increasing order, at least one.
+        percent (int): Percentile to pick.
+
+    Returns:
+        float: The time at that percentile.
+    """
+    return times[min(len(times) - 1, len(times) * percent // 100)]
+
+
+def latency_summary(latencies, what):
+    """
+    Summarise measured latencies in one line of text.
+
+    Args:
+        latencies (list): Latencies in ms.
+        what (str): What was measured, in the plural, like 'commands'.
+
+    Returns:
+        str: Number of latencies and their p50, p99 and largest value.
+    """
+    if not latencies:
+        return "no {}".format(what)
+    latencies = sorted(latencies)
+    return "{} {}, p50 {:.1f} ms, p99 {:.1f} ms, max {:.1f} ms".format(
+        len(latencies), what, percentile(latencies, 50),
+        percentile(latencies, 99), latencies[-1])
+
+
+class NullProfiler:
+    """
+    Profiler that records nothing, used when profiling is off.
+    """
+
+    enabled = False
+
+    def begin_frame(self):
+        """
+        Start timing a frame.
+        """
+
+    def mark(self, phase):
+        """
+        Charge the time since the last mark to a phase.
+
+        Args:
+            phase (str): Name of the phase that just ended.
+        """
+
+    def end_frame(self):
+        """
+        Store the timings of the frame.
+        """
+
+
+class FrameProfiler(NullProfiler):
+    """
+    Times each phase of the game loop over the last frames.
+
+    Attributes:
+        phases (list): Names of the phases, in loop order.
+        idle_phase (str): Phase spent waiting for the next frame, left out
+        when looking for the slowest phase.
+        samples (list): Ring buffer of per-frame phase times in seconds,
+        one list per frame.
+        frames (int): Number of frames recorded so far.
+    """
+
+    enabled = True
+
+    def __init__(self, phases, size=PROFILE_FRAMES, idle_phase=None):
+        """
+        Args:
+            phases (list): Names of the phases, in loop order.
+            size (int): Number of frames kept in the ring buffer.
+            idle_phase (str): Phase spent waiting for the next frame.
+        """
+        self.phases = list(phases)
+        self.idle_phase = idle_phase
+        self.index = {phase: index for index, phase in enumerate(phases)}
+        self.samples = [[0.0] * len(phases) for _ in range(size)]
+        self.frames = 0
+        self.current = self.samples[0]
+        self.last_mark = 0.0
+        self.summary_lines = []
+        self.summary_frame = -1
+
+    def begin_frame(self):
+        """
+        Start timing a frame.
+        """
+        self.current = self.samples[self.frames % len(self.samples)]
+        for index in range(len(self.current)):
+            self.current[index] = 0.0
+        self.last_mark = time.perf_counter()
+
+    def mark(self, phase):
+        """
+        Charge the time since the last mark to a phase.
+
+        Args:
+            phase (str): Name of the phase that just ended.
+        """
+        now = time.perf_counter()
+        self.current[self.index[phase]] += now - self.last_mark
+        self.last_mark = now
+
+    def end_frame(self):
+        """
+        Store the timings of the frame.
+        """
+        self.frames += 1
+
+    def recorded(self):
+        """
+        Returns:
+            list: Phase times of the frames in the ring buffer, oldest
+            first.
+        """
+        size = len(self.samples)
+        if self.frames <= size:
+            return self.samples[:self.frames]
+        start = self.frames % size
+        return self.samples[start:] + self.samples[:start]
+
+    def percentiles(self, phase=None, percents=(50, 99)):
+        """
+        Compute percentiles of a phase, or of whole frames.
+
+        Args:
+            phase (str): Name of the phase, whole frame times if None.
+            percents (tuple): Percentiles to compute.
+
+        Returns:
+            list: Times in ms, one per percentile, zero with no frames.
+        """
+        if phase is None:
+            times = sorted(sum(sample) for sample in self.recorded())
+        else:
+            index = self.index[phase]
+            times = sorted(sample[index] for sample in self.recorded())
+        if not times:
+            return [0.0 for _ in percents]
+        return [percentile(times, percent) * 1000 for percent in percents]
+
+    def slowest_phase(self, percent=99):
+        """
+        Find the working phase with the highest percentile time.
+
+        Args:
+            percent (int): Percentile to compare.
+
+        Returns:
+            tuple: Name of the phase and its time in ms.
+        """
+        return max(
+                   ((phase, self.percentiles(phase, (percent,))[0])
+                    for phase in self.phases if phase != self.idle_phase),
+                   key=lambda item: item[1]
+                   )
+
+    def summary(self):
+        """
+        Describe the recent frame times in a few lines of text.
+
+        The percentiles are only recomputed every SUMMARY_INTERVAL frames,
+        so showing the summary every frame stays cheap.
+
+        Returns:
+            list: Lines of text.
+        """
+        if self.summary_frame < 0 or \
+                self.frames - self.summary_frame >= SUMMARY_INTERVAL:
+            p50, p99 = self.percentiles()
+            phase, phase_p99 = self.slowest_phase()
+            self.summary_lines = [
+                                  "frame p50 {:.2f} ms  p99 {:.2f} ms".format(
+                                      p50, p99),
+                                  "slowest p99: {} {:.2f} ms".format(
+                                      phase, phase_p99)
+                                  ]
+            self.summary_frame = self.frames
+        return self.summary_lines
+
+    def write_csv(self, path):
+        """
+        Write the frames in the ring buffer to a CSV file, in ms.
+
+        Args:
+            path (str): Path of the CSV file.
+        """
+        first_frame = max(0, self.frames - len(self.samples))
+        with open(path, 'w', newline='') as csv_file:
+            writer = csv.writer(csv_file)
+            writer.writerow(['frame'] + self.phases + ['total'])
+            for frame, sample in enumerate(self.recorded(), first_frame):
+                writer.writerow(
+                                [frame] +
+                                ['{:.3f}'.format(seconds * 1000)
+                                 for seconds in sample] +
+                                ['{:.3f}'.format(sum(sample) * 1000)]
+                                )
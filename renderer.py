@@ -0,0 +1,95 @@
+"""
+Street Fighter Game
+
+Frame presentation for the game loop.
+
+The renderer either redraws and flips the whole screen every frame or, in
+dirty rectangle mode, only restores and presents the screen areas that
+changed: the areas drawn in the previous frame are restored from the
+static layer, and only those plus the areas drawn in the current frame are
+pushed to the display with pygame.display.update.
+"""
+import pygame
+
+
+class Renderer:
+    """
+    Presents frames either in full or as dirty rectangles.
+
+    Attributes:
+        pixels_pushed (int): Pixels sent to the display by the last frame.
+        total_pixels_pushed (int): Pixels sent since the renderer was made.
+        frames (int): Number of frames presented.
+    """
+
+    def __init__(self, window, backGround, backGroundRec, dirty_rects=False):
+        """
+        Args:
+            window (pygame.Surface): Pygame window.
+            backGround (pygame.Surface): Static background layer.
+            backGroundRec (pygame.Rect): Position of the static layer.
+            dirty_rects (bool): Whether to present only changed areas.
+        """
+        self.window = window
+        self.backGround = backGround
+        self.backGroundRec = backGroundRec
+        self.dirty_rects = dirty_rects
+        self.screen_rect = window.get_rect()
+        self.previous_rects = []
+        self.current_rects = []
+        self.full_redraw = True
+        self.pixels_pushed = 0
+        self.total_pixels_pushed = 0
+        self.frames = 0
+
+    def invalidate(self):
+        """
+        Redraw and present the whole screen in the next frame.
+
+        Needed after something else, like a banner screen, drew over the
+        window.
+        """
+        self.full_redraw = True
+
+    def begin_frame(self):
+        """
+        Restore the background under everything drawn in the last frame.
+        """
+        if self.full_redraw or not self.dirty_rects:
+            self.window.blit(self.backGround, self.backGroundRec)
+            return
+        for rect in self.previous_rects:
+            self.window.blit(self.backGround, rect, rect)
+
+    def mark(self, *rects):
+        """
+        Record screen areas drawn in the current frame.
+
+        Args:
+            rects (pygame.Rect): Areas that were drawn.
+        """
+        for rect in rects:
+            rect = rect.clip(self.screen_rect)
+            if rect.width and rect.height:
+                self.current_rects.append(rect)
+
+    def present(self):
+        """
+        Push the frame to the display.
+        """
+        if self.full_redraw or not self.dirty_rects:
+            pygame.display.flip()
+            self.pixels_pushed = self.screen_rect.width * \
+                self.screen_rect.height
+            self.full_redraw = False
+        else:
+            rects = self.previous_rects + self.current_rects
+            pygame.display.update(rects)
+            self.pixels_pushed = sum(
+                                     rect.width * rect.height
+                                     for rect in rects
+                                     )
+        self.total_pixels_pushed += self.pixels_pushed
+        self.frames += 1
+        self.previous_rects = self.current_rects
+        self.current_rects = []
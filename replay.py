@@ -0,0 +1,365 @@
+"""
+Street Fighter Game
+
+Recording and playback of matches.
+
+A match is fully determined by the input flags both players hold on every
+tick, so a replay stores just those: one byte per tick, Player 1 in the low
+and Player 2 in the high four bits, run-length encoded because keys are
+held for many ticks at a time. The header keeps a seed for callers that
+drive matches from a random generator and the game constants the match
+was played with, so a replay of different rules is rejected instead of
+silently playing out differently.
+
+Seeking steps the engine forward from the closest keyframe, a snapshot of
+the state taken every KEYFRAME_INTERVAL ticks the first time the replay
+passes it.
+
+Usage:
+    python replay.py PATH [TICK]
+"""
+import hashlib
+import json
+import struct
+import sys
+from itertools import groupby
+
+from engine import (
+                    PLAYER_WIDTH, ARENA_LEFT, ARENA_RIGHT, GROUND_Y,
+                    PLAYER1_START_X, PLAYER2_START_X, JUMP_HEIGHT, GRAVITY,
+                    PLAYERSPEED, ATTACK_DISTANCE, ATTACK_DAMAGE, JUMPSPEED,
+                    MAX_HEALTH, MATCH_ROUNDS, animation_cooldown,
+                    dead_animation_duration, TICK_MS, GameState, step
+                    )
+
+REPLAY_MAGIC = b'SFRP'
+REPLAY_VERSION = 2
+HEADER_FORMAT = '<4sHII'
+RUN_FORMAT = '<HB'
+MAX_RUN = 0xFFFF
+KEYFRAME_INTERVAL = 500
+
+
+def pack_inputs(player1_input, player2_input):
+    """
+    Pack the input flags of both players into one byte.
+
+    Args:
+        player1_input (int): INPUT_* flags held by Player 1.
+        player2_input (int): INPUT_* flags held by Player 2.
+
+    Returns:
+        int: Packed inputs.
+    """
+    return player1_input | player2_input << 4
+
+
+def unpack_inputs(packed):
+    """
+    Split a packed input byte into the flags of both players.
+
+    Args:
+        packed (int): Byte returned by pack_inputs.
+
+    Returns:
+        tuple: INPUT_* flags of Player 1 and Player 2.
+    """
+    return packed & 0xF, packed >> 4
+
+
+def boxes_digest(frames):
+    """
+    Args:
+        frames (engine.FrameTable): Frame counts of a fighter.
+
+    Returns:
+        str: Hexadecimal digest of the fighter's collision boxes, or None
+        if the table has none.
+    """
+    if frames.boxes is None:
+        return None
+    return hashlib.sha1(
+                        json.dumps(frames.boxes, sort_keys=True).encode()
+                        ).hexdigest()
+
+
+def match_constants(player1_frames, player2_frames):
+    """
+    Collect every constant the outcome of a match depends on.
+
+    Collision boxes are included as a digest, which is enough to tell
+    whether a replay was recorded with the same ones.
+
+    Args:
+        player1_frames (engine.FrameTable): Frame count of each action of
+        Player 1's character.
+        player2_frames (engine.FrameTable): Frame count of each action of
+        Player 2's character.
+
+    Returns:
+        dict: Constants by name.
+    """
+    return {
+            'PLAYER_WIDTH': PLAYER_WIDTH, 'ARENA_LEFT': ARENA_LEFT,
+            'ARENA_RIGHT': ARENA_RIGHT, 'GROUND_Y': GROUND_Y,
+            'PLAYER1_START_X': PLAYER1_START_X,
+            'PLAYER2_START_X': PLAYER2_START_X,
+            'JUMP_HEIGHT': JUMP_HEIGHT, 'GRAVITY': GRAVITY,
+            'PLAYERSPEED': PLAYERSPEED, 'ATTACK_DISTANCE': ATTACK_DISTANCE,
+            'ATTACK_DAMAGE': ATTACK_DAMAGE, 'JUMPSPEED': JUMPSPEED,
+            'MAX_HEALTH': MAX_HEALTH, 'MATCH_ROUNDS': MATCH_ROUNDS,
+            'animation_cooldown': animation_cooldown,
+            'dead_animation_duration': dead_animation_duration,
+            'TICK_MS': TICK_MS,
+            'player1_frames': dict(player1_frames),
+            'player2_frames': dict(player2_frames),
+            'player1_boxes': boxes_digest(player1_frames),
+            'player2_boxes': boxes_digest(player2_frames)
+            }
+
+
+def constants_digest(player1_frames, player2_frames):
+    """
+    Digest the constants a match depends on, for peers of a network match
+    to check they play the same one.
+
+    Args:
+        player1_frames (engine.FrameTable): Frame count of each action of
+        Player 1's character.
+        player2_frames (engine.FrameTable): Frame count of each action of
+        Player 2's character.
+
+    Returns:
+        bytes: SHA-1 digest of match_constants.
+    """
+    return hashlib.sha1(json.dumps(
+                                   match_constants(
+                                                   player1_frames,
+                                                   player2_frames
+                                                   ),
+                                   sort_keys=True
+                                   ).encode()).digest()
+
+
+class Replay:
+    """
+    Inputs of a match and the keyframes used to seek in it.
+
+    Attributes:
+        player1_frames (dict): Frame count of each action of Player 1's
+        character.
+        player2_frames (dict): Frame count of each action of Player 2's
+        character.
+        seed (int): Seed of whatever random generator drove the inputs.
+        inputs (bytearray): Packed inputs, the byte at index i was applied
+        by the step that produced tick i + 1.
+        keyframe_interval (int): Ticks between keyframes.
+        keyframes (list): Snapshots at ticks 0, keyframe_interval,
+        2 * keyframe_interval and so on, as far as the replay has been
+        simulated.
+    """
+
+    def __init__(
+                 self, player1_frames, player2_frames, seed=0, inputs=b'',
+                 keyframe_interval=KEYFRAME_INTERVAL
+                 ):
+        """
+        Args:
+            player1_frames (dict): Frame count of each action of Player 1's
+            character.
+            player2_frames (dict): Frame count of each action of Player 2's
+            character.
+            seed (int): Seed of whatever random generator drove the inputs.
+            inputs (bytes): Packed inputs of the ticks played so far.
+            keyframe_interval (int): Ticks between keyframes.
+        """
+        self.player1_frames = player1_frames
+        self.player2_frames = player2_frames
+        self.seed = seed
+        self.inputs = bytearray(inputs)
+        self.keyframe_interval = keyframe_interval
+        self.keyframes = [GameState()]
+
+    def __len__(self):
+        return len(self.inputs)
+
+    def record(self, state, player1_input, player2_input):
+        """
+        Add the inputs of a tick that was just played.
+
+        Args:
+            state (GameState): State after the tick.
+            player1_input (int): INPUT_* flags Player 1 held.
+            player2_input (int): INPUT_* flags Player 2 held.
+        """
+        self.inputs.append(pack_inputs(player1_input, player2_input))
+        self.keep_keyframe(state)
+
+    def keep_keyframe(self, state):
+        """
+        Snapshot the state if it is the next keyframe.
+
+        Args:
+            state (GameState): State of the replayed match.
+        """
+        if state.tick == len(self.keyframes) * self.keyframe_interval:
+            self.keyframes.append(state.copy())
+
+    def inputs_at(self, tick):
+        """
+        Args:
+            tick (int): Tick to be produced, from 1 to len(self).
+
+        Returns:
+            tuple: INPUT_* flags of Player 1 and Player 2 for that tick.
+        """
+        return unpack_inputs(self.inputs[tick - 1])
+
+    def advance(self, state):
+        """
+        Play the next recorded tick on a state.
+
+        Args:
+            state (GameState): State of the replayed match.
+
+        Returns:
+            GameState: The updated state.
+        """
+        player1_input, player2_input = self.inputs_at(state.tick + 1)
+        step(
+             state, player1_input, player2_input,
+             self.player1_frames, self.player2_frames
+             )
+        self.keep_keyframe(state)
+        return state
+
+    def state_at(self, tick):
+        """
+        Rebuild the state of the match at any tick.
+
+        Starts from the closest keyframe at or before the tick, so at most
+        keyframe_interval ticks are simulated once the replay has been
+        played through.
+
+        Args:
+            tick (int): Tick to seek to, from 0 to len(self).
+
+        Returns:
+            GameState: Independent state at that tick.
+        """
+        if not 0 <= tick <= len(self):
+            raise ValueError("tick {} is outside the replay".format(tick))
+        keyframe = min(tick // self.keyframe_interval, len(self.keyframes) - 1)
+        state = self.keyframes[keyframe].copy()
+        while state.tick < tick:
+            self.advance(state)
+        return state
+
+
+def encode_runs(inputs):
+    """
+    Run-length encode packed inputs.
+
+    Args:
+        inputs (bytes): Packed inputs.
+
+    Returns:
+        bytes: (run length, packed inputs) pairs in RUN_FORMAT.
+    """
+    runs = bytearray()
+    for packed, group in groupby(inputs):
+        length = sum(1 for _ in group)
+        while length:
+            run = min(length, MAX_RUN)
+            runs += struct.pack(RUN_FORMAT, run, packed)
+            length -= run
+    return bytes(runs)
+
+
+def decode_runs(data):
+    """
+    Expand run-length encoded inputs.
+
+    Args:
+        data (bytes): Output of encode_runs.
+
+    Returns:
+        bytearray: Packed inputs.
+    """
+    inputs = bytearray()
+    for run, packed in struct.iter_unpack(RUN_FORMAT, data):
+        inputs += bytes((packed,)) * run
+    return inputs
+
+
+def save_replay(path, replay):
+    """
+    Write a replay to a file.
+
+    Args:
+        path (str): Path of the replay file.
+        replay (Replay): Replay to write.
+    """
+    constants = json.dumps(
+                           match_constants(
+                                           replay.player1_frames,
+                                           replay.player2_frames
+                                           ),
+                           sort_keys=True
+                           ).encode()
+    with open(path, 'wb') as replay_file:
+        replay_file.write(struct.pack(
+                                      HEADER_FORMAT, REPLAY_MAGIC,
+                                      REPLAY_VERSION, replay.seed,
+                                      len(constants)
+                                      ))
+        replay_file.write(constants)
+        replay_file.write(encode_runs(replay.inputs))
+
+
+def load_replay(path, player1_frames, player2_frames):
+    """
+    Read a replay from a file.
+
+    Args:
+        path (str): Path of the replay file.
+        player1_frames (dict): Frame count of each action of Player 1's
+        character.
+        player2_frames (dict): Frame count of each action of Player 2's
+        character.
+
+    Returns:
+        Replay: The loaded replay.
+
+    Raises:
+        ValueError: If the file is not a replay or was recorded with
+        different game constants.
+    """
+    with open(path, 'rb') as replay_file:
+        data = replay_file.read()
+    try:
+        magic, version, seed, constants_size = struct.unpack_from(
+            HEADER_FORMAT, data)
+    except struct.error:
+        raise ValueError("{} is not a replay".format(path))
+    if magic != REPLAY_MAGIC or version != REPLAY_VERSION:
+        raise ValueError("{} is not a replay".format(path))
+    offset = struct.calcsize(HEADER_FORMAT)
+    constants = json.loads(data[offset:offset + constants_size])
+    if constants != match_constants(player1_frames, player2_frames):
+        raise ValueError(
+            "{} was recorded with different game constants".format(path))
+    inputs = decode_runs(data[offset + constants_size:])
+    return Replay(player1_frames, player2_frames, seed, inputs)
+
+
+if __name__ == "__main__":
+    import functions
+
+    replay = load_replay(sys.argv[1], *functions.match_frame_counts())
+    tick = int(sys.argv[2]) if len(sys.argv) > 2 else len(replay)
+    state = replay.state_at(tick)
+    print("tick {} of {}: round {}, rounds won {}-{}, health {}-{}".format(
+        state.tick, len(replay), state.current_round,
+        state.player1.rounds_won, state.player2.rounds_won,
+        state.player1.health, state.player2.health))
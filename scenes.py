@@ -0,0 +1,89 @@
+"""
+Street Fighter Game
+
+Scenes of the game and the state machine that moves between them.
+
+The game loop keeps running in every scene: the title, round and match
+banners and the goodbye screen are timed scenes that end after their
+duration instead of blocking the process, so events are still handled and
+the frame clock keeps ticking while they are shown.
+"""
+SCENE_TITLE = 'title'
+SCENE_FIGHT = 'fight'
+SCENE_ROUND_OVER = 'round_over'
+SCENE_MATCH_OVER = 'match_over'
+SCENE_GOODBYE = 'goodbye'
+SCENE_DURATIONS = {
+                   SCENE_TITLE: 2000,
+                   SCENE_ROUND_OVER: 2000,
+                   SCENE_MATCH_OVER: 2000,
+                   SCENE_GOODBYE: 2000
+                   }
+NEXT_SCENES = {
+               SCENE_TITLE: SCENE_FIGHT,
+               SCENE_ROUND_OVER: SCENE_FIGHT,
+               SCENE_MATCH_OVER: SCENE_GOODBYE,
+               SCENE_GOODBYE: None
+               }
+
+
+class SceneManager:
+    """
+    Tracks the current scene and how long it has been shown.
+
+    Attributes:
+        scene (str): Current scene.
+        elapsed (int): Time spent in the current scene in ms.
+    """
+
+    def __init__(self, scene=SCENE_TITLE):
+        """
+        Args:
+            scene (str): Scene to start in.
+        """
+        self.scene = scene
+        self.elapsed = 0
+
+    @property
+    def timed(self):
+        """
+        bool: Whether the current scene ends by itself.
+        """
+        return self.scene in SCENE_DURATIONS
+
+    def switch(self, scene):
+        """
+        Enter a scene.
+
+        Args:
+            scene (str): Scene to enter.
+        """
+        self.scene = scene
+        self.elapsed = 0
+
+    def update(self, elapsed_ms):
+        """
+        Advance the clock of a timed scene.
+
+        Args:
+            elapsed_ms (int): Time since the last frame in ms.
+
+        Returns:
+            str: Scene to enter next once the current scene is over, None
+            while it is still running or when it is not timed. The game
+            ends when the goodbye scene is over.
+        """
+        if not self.timed:
+            return None
+        self.elapsed += elapsed_ms
+        if self.elapsed < SCENE_DURATIONS[self.scene]:
+            return None
+        return NEXT_SCENES[self.scene]
+
+    @property
+    def finished(self):
+        """
+        bool: Whether the last scene, the goodbye screen, is over.
+        """
+        return self.scene == SCENE_GOODBYE and \
+            self.elapsed >= SCENE_DURATIONS[SCENE_GOODBYE]